@@ -1,10 +1,27 @@
-import os, json
-from supabase import create_client
+import os, json, threading, time, base64, heapq, itertools, asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+import httpx
+
+from app.tracing import traced
+
+try:
+    from flet import context as _flet_context
+except ImportError:  # scripts/benchmarks without Flet
+    _flet_context = None
 
 SESSION_FILE = os.path.join("config", "session.json")
 SUPABASE_CONFIG_FILE = os.path.join("config", "supabase_config.json")
 
-_current_user = None  # {"id": "...", "email": "..."}
+# Key used for the AuthContext in page.session and for the tokens in
+# page.client_storage (web)
+SESSION_KEY = "task_manager.auth"
+
+# Refresh access tokens this many seconds before they expire
+REFRESH_MARGIN = 120
+# Sessions refreshed at the same time (each is one round-trip to Supabase)
+REFRESH_CONCURRENCY = 8
 
 
 def _load_supabase_credentials():
@@ -29,94 +46,443 @@ def _load_supabase_credentials():
     )
 
 
-# ONE shared client for the entire app
-_supabase_url, _supabase_key = _load_supabase_credentials()
-supabase = create_client(_supabase_url, _supabase_key)
+# ----------------- SHARED TRANSPORT -----------------
 
+# ONE pooled HTTP transport for the entire process; every session's client
+# sends its own auth headers over it.
+_http = None
+_http_lock = threading.Lock()
 
-def get_supabase():
-    return supabase
 
+def _shared_http() -> httpx.Client:
+    global _http
+    with _http_lock:
+        if _http is None:
+            _http = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+            )
+        return _http
 
-def get_current_user():
-    return _current_user
 
+# ----------------- BACKENDS -----------------
 
-def _set_current_user(user):
-    global _current_user
-    if user:
-        _current_user = {"id": user.id, "email": user.email}
-    else:
-        _current_user = None
+# get_supabase() returns whatever the selected backend's factory builds. A
+# backend only needs the part of the supabase-py client this app calls:
+# table() queries, auth and (optionally) storage. TASK_BACKEND=local runs
+# everything in-process, see app/local_backend.py.
+_backends = {}
 
 
-def save_session(session):
-    os.makedirs("config", exist_ok=True)
-    with open(SESSION_FILE, "w", encoding="utf-8") as f:
-        json.dump(
-            {"access_token": session.access_token, "refresh_token": session.refresh_token},
-            f,
-        )
+def register_backend(name: str, factory):
+    """factory(access_token: str | None) -> client"""
+    _backends[name] = factory
 
 
-def load_session():
-    if not os.path.exists(SESSION_FILE):
-        return None
+def backend_name() -> str:
+    return (os.getenv("TASK_BACKEND") or "supabase").strip().lower()
+
+
+def _new_client(access_token: str | None = None):
+    name = backend_name()
+    if name == "local" and name not in _backends:
+        from app.local_backend import new_client
+
+        register_backend("local", new_client)
+    factory = _backends.get(name)
+    if factory is None:
+        # Never fall back to Supabase: a typo must not reach production data
+        raise RuntimeError(f"Unknown TASK_BACKEND {name!r}; expected one of: {', '.join(sorted({*_backends, 'local'}))}")
+    return factory(access_token)
+
+
+def _new_supabase_client(access_token: str | None = None):
+    # Imported on first use: supabase pulls in postgrest, gotrue and storage
+    # (~0.3 s), which the login screen does not need
+    from supabase import create_client
+    from supabase.lib.client_options import SyncClientOptions
+
+    url, key = _load_supabase_credentials()
+    headers = {"Authorization": f"Bearer {access_token}"} if access_token else None
+    # Token refresh is driven by the shared scheduler below, not by one
+    # gotrue Timer thread per client.
+    options = SyncClientOptions(httpx_client=_shared_http(), auto_refresh_token=False)
+    if headers:
+        options = options.replace(headers={**options.headers, **headers})
+    return create_client(url, key, options=options)
+
+
+register_backend("supabase", _new_supabase_client)
+
+
+def _jwt_claims(token: str) -> dict:
+    """Decode a JWT payload locally (no signature check, expiry only)."""
     try:
-        with open(SESSION_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if data.get("access_token") and data.get("refresh_token"):
-            return data
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
     except Exception:
-        pass
-    return None
+        return {}
 
 
-def restore_session_if_any() -> bool:
-    data = load_session()
-    if not data:
-        return False
-    try:
-        supabase.auth.set_session(data["access_token"], data["refresh_token"])
-        u = supabase.auth.get_user()
-        if u and u.user:
-            _set_current_user(u.user)
+def _seconds_left(token: str) -> float:
+    exp = _jwt_claims(token).get("exp")
+    return (float(exp) - time.time()) if exp else 0.0
+
+
+# ----------------- BACKGROUND REFRESH -----------------
+
+class _RefreshScheduler:
+    """One daemon thread timing token refreshes for every session; the
+    refreshes themselves run on a small pool, so a slow one does not hold
+    up the others."""
+
+    def __init__(self, workers: int = REFRESH_CONCURRENCY):
+        self._heap = []  # (due, seq, ctx)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth-refresh")
+
+    def schedule(self, ctx, due: float):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), ctx))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="auth-refresh", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, ctx):
+        """Drop every pending entry for `ctx`, so a closed session is not
+        kept alive (or refreshed) by the heap."""
+        with self._cond:
+            kept = [entry for entry in self._heap if entry[2] is not ctx]
+            if len(kept) != len(self._heap):
+                heapq.heapify(kept)
+                self._heap = kept
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    timeout = (self._heap[0][0] - time.time()) if self._heap else None
+                    self._cond.wait(timeout)
+                due, _, ctx = heapq.heappop(self._heap)
+            self._pool.submit(ctx._refresh_if_due, due)
+
+
+_scheduler = _RefreshScheduler()
+
+
+# ----------------- SESSION STORES -----------------
+
+class FileSessionStore:
+    """Desktop: tokens in config/session.json."""
+
+    def __init__(self, path: str = SESSION_FILE):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def save(self, data: dict):
+        # Write to a temp file and rename, so a crash mid-write never
+        # leaves a truncated session file behind
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except Exception:
+                pass
+
+
+class ClientStorageSessionStore:
+    """Web: tokens in the browser's local storage, one per visitor."""
+
+    def __init__(self, page):
+        self.page = page
+
+    def load(self):
+        try:
+            raw = self.page.client_storage.get(SESSION_KEY)
+            return json.loads(raw) if raw else None
+        except Exception:
+            return None
+
+    async def load_async(self):
+        # The sync get() parks a Flet executor thread until the browser
+        # answers; with many sessions starting at once that starves the pool
+        try:
+            raw = await self.page.client_storage.get_async(SESSION_KEY)
+            return json.loads(raw) if raw else None
+        except Exception:
+            return None
+
+    def save(self, data: dict):
+        try:
+            self.page.client_storage.set(SESSION_KEY, json.dumps(data))
+        except Exception as e:
+            print("⚠️ saving session failed:", repr(e))
+
+    def clear(self):
+        try:
+            self.page.client_storage.remove(SESSION_KEY)
+        except Exception:
+            pass
+
+
+# ----------------- AUTH CONTEXT -----------------
+
+class AuthContext:
+    """Supabase client + signed-in user of one Flet session."""
+
+    def __init__(self, store=None):
+        self.store = store or FileSessionStore()
+        self.user = None  # {"id": "...", "email": "..."}
+        self._client = None
+        self._tokens = None  # {"access_token", "refresh_token"}
+        self._refresh_due = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self.session_id = None  # Flet session this belongs to (for traces)
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = _new_client()
+            return self._client
+
+    def set_user(self, user):
+        self.user = {"id": user.id, "email": user.email} if user else None
+
+    def save_session(self, session):
+        self._tokens = {"access_token": session.access_token, "refresh_token": session.refresh_token}
+        self.store.save(self._tokens)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if not self._tokens or self._closed:
+            return
+        due = time.time() + max(_seconds_left(self._tokens["access_token"]) - REFRESH_MARGIN, 0)
+        self._refresh_due = due
+        _scheduler.schedule(self, due)
+
+    def _adopt(self, data: dict) -> bool:
+        """Use stored tokens whose access token is still valid, no round-trip."""
+        claims = _jwt_claims(data["access_token"])
+        if not claims.get("sub") or _seconds_left(data["access_token"]) <= REFRESH_MARGIN:
+            return False
+        with self._lock:
+            self._client = _new_client(data["access_token"])
+        self.user = {"id": claims["sub"], "email": claims.get("email")}
+        self._tokens = {"access_token": data["access_token"], "refresh_token": data["refresh_token"]}
+        self._schedule_refresh()
+        return True
+
+    def _adopt_newer_stored(self) -> bool:
+        # Tabs of one browser share the stored session, and refresh tokens
+        # rotate: if another tab refreshed first, ours is already spent.
+        data = self.load_session()
+        if not data or not self._tokens or data["refresh_token"] == self._tokens["refresh_token"]:
+            return False
+        if self._adopt(data):
             return True
-    except Exception as e:
-        print("⚠️ restore_session_if_any failed:", repr(e))
+        self._tokens = {"access_token": data["access_token"], "refresh_token": data["refresh_token"]}
+        return False
 
-    sign_out()
-    return False
+    @traced("auth.refresh_session")
+    def _refresh_if_due(self, due: float):
+        # Stale entries (signed out, or rescheduled since) are skipped
+        if self._refresh_due != due or not self._tokens:
+            return
+        if self._adopt_newer_stored():
+            return
+        try:
+            res = self.client.auth.refresh_session(self._tokens["refresh_token"])
+            if res and res.session:
+                self.set_user(res.user or res.session.user)
+                self.save_session(res.session)
+                return
+        except Exception as e:
+            # Rejected because another tab rotated the token meanwhile?
+            if self._adopt_newer_stored():
+                return
+            print("⚠️ token refresh failed:", repr(e))
+        # Retry shortly while the access token is still usable
+        if _seconds_left(self._tokens["access_token"]) > 5 and not self._closed:
+            self._refresh_due = time.time() + 30
+            _scheduler.schedule(self, self._refresh_due)
 
+    def load_session(self, data=None):
+        data = self.store.load() if data is None else data
+        if data and data.get("access_token") and data.get("refresh_token"):
+            return data
+        return None
 
-def sign_in(email: str, password: str):
-    res = supabase.auth.sign_in_with_password({"email": email, "password": password})
-    if res and res.user and res.session:
-        save_session(res.session)
-        _set_current_user(res.user)
-        return get_current_user(), res.session
-    return None, None
+    @traced("auth.restore")
+    def restore(self, data=None) -> bool:
+        data = self.load_session(data)
+        if not data:
+            return False
+        try:
+            # Cached token still valid: no get_user() round-trip before the
+            # first render; the server still checks it on every call.
+            if self._adopt(data):
+                return True
 
+            # Expired (or about to): one refresh call instead of set_session + get_user
+            res = self.client.auth.refresh_session(data["refresh_token"])
+            if res and res.session:
+                self.set_user(res.user or res.session.user)
+                self.save_session(res.session)
+                return True
+        except Exception as e:
+            print("⚠️ restore_session_if_any failed:", repr(e))
 
-def sign_up(email: str, password: str, full_name: str | None = None):
-    payload = {"email": email, "password": password}
-    if full_name:
-        payload["options"] = {"data": {"full_name": full_name}}
-    return supabase.auth.sign_up(payload)
+        self.sign_out()
+        return False
 
+    async def restore_async(self) -> bool:
+        """restore() for async callers (the web session start)."""
+        load = getattr(self.store, "load_async", None)
+        data = await load() if load else self.store.load()
+        if not data:
+            return False
+        return await asyncio.to_thread(self.restore, data)
 
-def sign_out():
-    global _current_user
-    try:
-        supabase.auth.sign_out()
-    except Exception:
-        pass
+    @traced("auth.sign_in", rows=lambda result, *args: int(bool(result[0])))
+    def sign_in(self, email: str, password: str):
+        res = self.client.auth.sign_in_with_password({"email": email, "password": password})
+        if res and res.user and res.session:
+            self.save_session(res.session)
+            self.set_user(res.user)
+            return self.user, res.session
+        return None, None
+
+    @traced("auth.sign_up")
+    def sign_up(self, email: str, password: str, full_name: str | None = None):
+        payload = {"email": email, "password": password}
+        if full_name:
+            payload["options"] = {"data": {"full_name": full_name}}
+        return self.client.auth.sign_up(payload)
 
-    if os.path.exists(SESSION_FILE):
+    @traced("auth.sign_out")
+    def sign_out(self):
+        tokens, self._tokens, self._refresh_due = self._tokens, None, None
+        _scheduler.cancel(self)
         try:
-            os.remove(SESSION_FILE)
+            if self.client.auth.get_session() is None and tokens:
+                # Restored from cache without set_session: revoke by token
+                self.client.auth.admin.sign_out(tokens["access_token"])
+            self.client.auth.sign_out()
         except Exception:
             pass
+        self.store.clear()
+        self.user = None
+        return True
+
+    def close(self):
+        """Session ended: stop background refresh for it."""
+        self._closed = True
+        self._refresh_due = None
+        _scheduler.cancel(self)
+
+
+# Process-wide context for desktop runs and scripts without a Flet session
+_default_ctx = None
+_default_lock = threading.Lock()
+
+# Set inside async tasks, where Flet's own page context is not reliable
+_task_ctx: ContextVar = ContextVar("auth_ctx", default=None)
+
+
+def _default_auth() -> AuthContext:
+    global _default_ctx
+    with _default_lock:
+        if _default_ctx is None:
+            _default_ctx = AuthContext()
+        return _default_ctx
+
+
+def attach_auth(page) -> AuthContext:
+    """Get (or create) the AuthContext stored on this page's session."""
+    if page.session.contains_key(SESSION_KEY):
+        return page.session.get(SESSION_KEY)
+    store = ClientStorageSessionStore(page) if getattr(page, "web", False) else FileSessionStore()
+    ctx = AuthContext(store)
+    ctx.session_id = getattr(page, "session_id", None)
+    page.session.set(SESSION_KEY, ctx)
+    return ctx
+
+
+def use_auth(page) -> AuthContext:
+    """Bind the page's auth to the current async task (call at task start)."""
+    ctx = attach_auth(page)
+    _task_ctx.set(ctx)
+    return ctx
+
+
+def get_auth(page=None) -> AuthContext:
+    if page is not None:
+        return attach_auth(page)
+    ctx = _task_ctx.get()
+    if ctx is not None:
+        return ctx
+    # Flet sets this for every event handler thread of a session
+    current = _flet_context.page if _flet_context is not None else None
+    if current is not None:
+        return attach_auth(current)
+    return _default_auth()
+
+
+# ----------------- MODULE API -----------------
+
+def get_supabase(page=None):
+    return get_auth(page).client
+
+
+def get_current_user(page=None):
+    return get_auth(page).user
+
+
+def save_session(session, page=None):
+    get_auth(page).save_session(session)
+
+
+def load_session(page=None):
+    return get_auth(page).load_session()
+
+
+def restore_session_if_any(page=None) -> bool:
+    return get_auth(page).restore()
+
+
+def sign_in(email: str, password: str, page=None):
+    return get_auth(page).sign_in(email, password)
+
+
+def sign_up(email: str, password: str, full_name: str | None = None, page=None):
+    return get_auth(page).sign_up(email, password, full_name)
+
 
-    _current_user = None
-    return True
+def sign_out(page=None):
+    return get_auth(page).sign_out()
@@ -1,15 +1,119 @@
+import copy
+import functools
+import json
+import threading
+import time
 import uuid
 from datetime import datetime, timezone
 from app.auth import get_supabase, get_current_user
+from app.local_mirror import get_local_mirror
+from app.metrics import record_query_error, timed_query
+from app.models import Task, execute_patch
+from app.tracing import record_error, traced
 
 
 def utc_now_iso():
     return datetime.now(timezone.utc).isoformat()
 
 
+def _instrumented(name: str):
+    """Span (TRACE_FILE) and latency histogram (METRICS_PORT) for a call."""
+
+    def decorator(fn):
+        return traced(f"db.{name}")(timed_query(name)(fn))
+
+    return decorator
+
+
+def _mirror():
+    """The on-device mirror (LOCAL_MIRROR=1) for the signed-in user, or None."""
+    mirror = get_local_mirror()
+    if mirror is None:
+        return None
+    user = get_current_user()
+    if not user:
+        return None
+    # Until the first sync (in the background) is done, use the server
+    if not mirror.ensure_ready(get_supabase(), user["id"]):
+        return None
+    return mirror
+
+
+# ----------------- SINGLE-FLIGHT -----------------
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "expires", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+        self.expires = 0.0
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+single_flight_stats = {"calls": 0, "shared": 0}
+
+
+def single_flight(ttl: float = 0.0):
+    """Concurrent identical reads (same args, same signed-in user) share one
+    request. With `ttl`, the result is also reused for that many seconds.
+    Callers get their own copy, since pages mutate the returned objects."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            user = get_current_user()
+            key = (fn.__name__, user["id"] if user else None, args, tuple(sorted(kwargs.items())))
+            with _flights_lock:
+                single_flight_stats["calls"] += 1
+                flight = _flights.get(key)
+                if flight is not None and flight.done.is_set() and flight.expires <= time.monotonic():
+                    flight = None
+                leader = flight is None
+                if leader:
+                    flight = _flights[key] = _Flight()
+                else:
+                    flight.waiters += 1
+                    single_flight_stats["shared"] += 1
+
+            if not leader:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return copy.deepcopy(flight.result)
+
+            try:
+                flight.result = fn(*args, **kwargs)
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                flight.expires = time.monotonic() + ttl
+                with _flights_lock:
+                    if not ttl or flight.error is not None:
+                        _flights.pop(key, None)
+                    shared = bool(ttl or flight.waiters)
+                flight.done.set()
+            # The stored result stays pristine for the others
+            return copy.deepcopy(flight.result) if shared else flight.result
+
+        return wrapper
+
+    return decorator
+
+
 # ----------------- MULTI ASSIGNEES -----------------
 
+@_instrumented("set_task_assignees")
 def set_task_assignees(task_id: str, assignees: list[str]) -> bool:
+    mirror = _mirror()
+    if mirror is not None:
+        mirror.update("tasks", task_id, {"assignees": assignees, "updated_at": utc_now_iso()})
+        return True
+
     supabase = get_supabase()
     return (
         supabase.table("tasks")
@@ -21,6 +125,7 @@ def set_task_assignees(task_id: str, assignees: list[str]) -> bool:
 
 # ----------------- TASK CRUD -----------------
 
+@_instrumented("add_task")
 def add_task(title: str, description: str = "") -> bool:
     supabase = get_supabase()
     user = get_current_user()
@@ -40,10 +145,16 @@ def add_task(title: str, description: str = "") -> bool:
         "updated_at": utc_now_iso(),
     }
 
+    mirror = _mirror()
+    if mirror is not None:
+        mirror.insert("tasks", payload)
+        return True
+
     supabase.table("tasks").insert(payload).execute()
     return True
 
 
+@_instrumented("update_task")
 def update_task(task_id: str, patch: dict) -> bool:
     supabase = get_supabase()
     user = get_current_user()
@@ -53,13 +164,84 @@ def update_task(task_id: str, patch: dict) -> bool:
     patch = dict(patch)
     patch["updated_at"] = utc_now_iso()
 
-    supabase.table("tasks").update(patch).eq("id", task_id).execute()
+    mirror = _mirror()
+    if mirror is not None:
+        mirror.update("tasks", task_id, patch)
+        return True
+
+    execute_patch(lambda p: supabase.table("tasks").update(p).eq("id", task_id), patch)
     return True
 
 
-import json
+# ----------------- BULK -----------------
+
+# ids per `in.(...)` filter; keeps the request URL well under proxy limits
+IN_CHUNK = 300
+
+
+def _chunks(ids: list[str]):
+    for i in range(0, len(ids), IN_CHUNK):
+        yield ids[i : i + IN_CHUNK]
+
+
+@_instrumented("update_tasks")
+def update_tasks(task_ids: list[str], patch: dict) -> bool:
+    """Apply the same patch to many tasks in one request."""
+    ids = list(dict.fromkeys(task_ids))
+    if not ids or not get_current_user():
+        return False
+    patch = dict(patch)
+    patch["updated_at"] = utc_now_iso()
+
+    mirror = _mirror()
+    if mirror is not None:
+        for tid in ids:
+            mirror.update("tasks", tid, patch)
+        return True
+
+    supabase = get_supabase()
+    for chunk in _chunks(ids):
+        supabase.table("tasks").update(patch).in_("id", chunk).execute()
+    return True
+
+
+@_instrumented("delete_tasks")
+def delete_tasks(task_ids: list[str]) -> bool:
+    ids = list(dict.fromkeys(task_ids))
+    if not ids:
+        return False
+
+    mirror = _mirror()
+    if mirror is not None:
+        for tid in ids:
+            mirror.delete("tasks", tid)
+        return True
 
-def fetch_tasks_for_user():
+    supabase = get_supabase()
+    for chunk in _chunks(ids):
+        supabase.table("tasks").delete().in_("id", chunk).execute()
+    return True
+
+
+@_instrumented("set_assignees_bulk")
+def set_assignees_bulk(assignments: dict[str, list[str]]) -> int:
+    """Set assignees of many tasks: {task_id: [user_id, ...]}.
+
+    Tasks ending up with the same list share one request, so assigning
+    the same people to N tasks is a single call. Returns requests made.
+    """
+    groups = {}
+    for tid, assignees in assignments.items():
+        key = tuple(dict.fromkeys(a for a in assignees if a))
+        groups.setdefault(key, []).append(tid)
+    for assignees, ids in groups.items():
+        update_tasks(ids, {"assignees": list(assignees)})
+    return len(groups)
+
+
+@_instrumented("fetch_tasks_for_user")
+@single_flight()
+def fetch_tasks_for_user() -> list[Task]:
     supabase = get_supabase()
     user = get_current_user()
     if not user:
@@ -67,6 +249,10 @@ def fetch_tasks_for_user():
 
     uid = user["id"]
 
+    mirror = _mirror()
+    if mirror is not None:
+        return [Task.from_row(r) for r in mirror.tasks_for_user(uid)]
+
     try:
         owned_res = (
             supabase.table("tasks")
@@ -84,48 +270,145 @@ def fetch_tasks_for_user():
         )
         assigned_tasks = assigned_res.data or []
 
-        return list({t["id"]: t for t in owned_tasks + assigned_tasks}.values())
+        rows = {t["id"]: t for t in owned_tasks + assigned_tasks}
+        return [Task.from_row(r) for r in rows.values()]
 
     except Exception as e:
-        print(f"[DEBUG] fetch_tasks_for_user error: {repr(e)}")
+        record_error(e)
+        record_query_error()
+        print("⚠️ fetch_tasks_for_user failed:", repr(e))
         return []
 
 
 
-def fetch_task(task_id: str):
+# Not single-flight: it is the read of read-modify-write paths, and joining
+# a read that started before the previous writer finished loses its update.
+@_instrumented("fetch_task")
+def fetch_task(task_id: str) -> Task | None:
+    mirror = _mirror()
+    if mirror is not None:
+        row = mirror.get("tasks", task_id)
+        return Task.from_row(row) if row else None
+
     supabase = get_supabase()
     res = supabase.table("tasks").select("*").eq("id", task_id).single().execute()
-    return res.data if res.data else {}
+    return Task.from_row(res.data) if res.data else None
 
 
+@_instrumented("delete_task")
 def delete_task(task_id: str) -> bool:
+    mirror = _mirror()
+    if mirror is not None:
+        mirror.delete("tasks", task_id)
+        return True
+
     supabase = get_supabase()
     supabase.table("tasks").delete().eq("id", task_id).execute()
     return True
 
 
+@_instrumented("fetch_clients")
+@single_flight()
 def fetch_clients():
+    mirror = _mirror()
+    if mirror is not None:
+        return mirror.rows("clients")
+
     sb = get_supabase()
     return sb.table("clients").select("*").execute().data or []
 
 
+@_instrumented("add_client")
 def add_client(payload: dict):
     sb = get_supabase()
     user = get_current_user()
     payload["owner"] = user["id"]
+
+    mirror = _mirror()
+    if mirror is not None:
+        payload.setdefault("id", str(uuid.uuid4()))
+        mirror.insert("clients", payload)
+        return payload
+
     res = sb.table("clients").insert(payload).execute()
     return res.data[0] if res.data else None
 
 
+@_instrumented("update_client")
 def update_client(client_id: str, payload: dict):
+    mirror = _mirror()
+    if mirror is not None:
+        mirror.update("clients", client_id, payload)
+        return
+
     sb = get_supabase()
     sb.table("clients").update(payload).eq("id", client_id).execute()
 
 
+@_instrumented("delete_client")
 def delete_client(client_id: str):
+    mirror = _mirror()
+    if mirror is not None:
+        mirror.delete("clients", client_id)
+        return
+
     sb = get_supabase()
     sb.table("clients").delete().eq("id", client_id).execute()
 
+
+PROFILE_PAGE_SIZE = 20
+
+
+def _profile_prefix(query: str) -> str:
+    # Characters that would change a PostgREST or=() filter; * is its wildcard
+    return "".join(ch for ch in (query or "").strip() if ch not in ',()"*')
+
+
+def _like_literal(text: str) -> str:
+    """`text` matched literally by LIKE/ILIKE: escape \\, % and _."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Assignee pickers: one page of matches per keystroke, never the whole
+# profiles table. The ilike prefix match can use trigram indexes on
+# full_name and email (see README).
+@_instrumented("search_profiles")
+@single_flight()
+def search_profiles(query: str = "", offset: int = 0, limit: int = PROFILE_PAGE_SIZE) -> list[dict]:
+    """Profiles whose name or email starts with `query`, ordered by name."""
+    prefix = _profile_prefix(query)
+    mirror = _mirror()
+    if mirror is not None:
+        p = prefix.lower()
+        rows = [
+            r for r in mirror.rows("profiles")
+            if (r.get("full_name") or "").lower().startswith(p) or (r.get("email") or "").lower().startswith(p)
+        ]
+        rows.sort(key=lambda r: (r.get("full_name") is None, r.get("full_name") or "", r.get("email") or ""))
+        return rows[offset : offset + limit]
+
+    q = get_supabase().table("profiles").select("id,email,full_name")
+    if prefix:
+        pattern = _like_literal(prefix)
+        q = q.or_(f"full_name.ilike.{pattern}*,email.ilike.{pattern}*")
+    return q.order("full_name").order("email").range(offset, offset + limit - 1).execute().data or []
+
+
+@_instrumented("fetch_profiles_by_ids")
+def fetch_profiles_by_ids(ids: list[str]) -> list[dict]:
+    ids = [i for i in dict.fromkeys(ids) if i]
+    if not ids:
+        return []
+    mirror = _mirror()
+    if mirror is not None:
+        wanted = set(ids)
+        return [r for r in mirror.rows("profiles") if r.get("id") in wanted]
+    sb = get_supabase()
+    rows: list[dict] = []
+    for chunk in _chunks(ids):
+        rows.extend(sb.table("profiles").select("id,email,full_name").in_("id", chunk).execute().data or [])
+    return rows
+
 # ----------------- BACKWARD COMPAT (optional) -----------------
 
 def set_task_assignee(task_id: str, assignee_id: str | None) -> bool:
@@ -141,5 +424,10 @@ def set_task_comments(task_id: str, comments: list) -> bool:
     return update_task(task_id, {"comments": comments})
 
 
-def set_task_pdf(task_id: str, pdf_url: str | None, status: str) -> bool:
-    return update_task(task_id, {"pdf_url": pdf_url, "status": status})
+def set_task_pdf(task_id: str, pdf_url: str | None, status: str, pdf_meta: dict | None = None) -> bool:
+    patch = {"pdf_url": pdf_url, "status": status}
+    # pdf_meta is optional in the schema (see README): update_task drops it
+    # again if the table has no such column
+    if pdf_meta:
+        patch["pdf_meta"] = pdf_meta
+    return update_task(task_id, patch)
@@ -0,0 +1,88 @@
+# app/dialogs.py
+# One dialog manager per Flet session. Pages ask it for a dialog by kind
+# ("dashboard.edit", "clients.delete", ...) instead of appending a new
+# AlertDialog to page.overlay on every click: each kind has one pooled
+# instance that is refilled and reopened, so the overlay (which is sent
+# with the page and kept for the whole session) stays the same size however
+# many dialogs are opened. The session's FilePicker is pooled the same way,
+# since every DashboardPage used to add its own.
+import flet as ft
+
+from app.metrics import Histogram, registry
+
+SESSION_KEY = "task_manager.dialogs"
+
+OVERLAY_CONTROLS = registry.register(Histogram(
+    "task_manager_overlay_controls", "Controls in page.overlay when a dialog opens.", (),
+    (1, 2, 5, 10, 20, 50, 100, 500, 1000)))
+
+
+class DialogManager:
+    def __init__(self, page: ft.Page):
+        self.page = page
+        self._pool = {}  # kind -> AlertDialog
+        self._props = {}  # kind -> props set on its last show()
+        self._picker = None
+        self.opened = 0
+        self.swept = 0  # closed dialogs removed from the overlay
+
+    @property
+    def overlay_size(self) -> int:
+        return len(self.page.overlay)
+
+    def show(self, kind: str, **props) -> ft.AlertDialog:
+        """Open the pooled dialog of this kind with `props` (title, content, actions...)."""
+        dlg = self._pool.get(kind)
+        if dlg is None:
+            dlg = self._pool[kind] = ft.AlertDialog()
+        # Props of the previous use that this one leaves out go back to default
+        for name in self._props.get(kind, ()):
+            if name not in props:
+                setattr(dlg, name, None)
+        for name, value in props.items():
+            setattr(dlg, name, value)
+        self._props[kind] = tuple(props)
+
+        swept = self.sweep()
+        # page.open() only sends the overlay and the dialog, not a diff of the whole page
+        self.page.open(dlg)
+        if swept:
+            self.page.update()
+        self.opened += 1
+        OVERLAY_CONTROLS.observe(self.overlay_size)
+        return dlg
+
+    def close(self, dlg: ft.AlertDialog):
+        self.page.close(dlg)
+
+    def sweep(self) -> int:
+        """Drop closed dialogs the pool does not own (added by other code)."""
+        pooled = set(map(id, self._pool.values()))
+        keep = [
+            c for c in self.page.overlay
+            if id(c) in pooled or not isinstance(c, (ft.AlertDialog, ft.BottomSheet)) or c.open
+        ]
+        removed = len(self.page.overlay) - len(keep)
+        if removed:
+            self.page.overlay[:] = keep
+            self.swept += removed
+        return removed
+
+    def file_picker(self, on_result=None, on_upload=None) -> ft.FilePicker:
+        """The session's FilePicker, with its handlers pointed at the caller."""
+        if self._picker is None:
+            self._picker = ft.FilePicker()
+        self._picker.on_result = on_result
+        self._picker.on_upload = on_upload
+        if self._picker not in self.page.overlay:
+            self.page.overlay.append(self._picker)
+        return self._picker
+
+
+def get_dialogs(page: ft.Page) -> DialogManager:
+    """The dialog manager shared by all pages of one Flet session."""
+    if page.session.contains_key(SESSION_KEY):
+        return page.session.get(SESSION_KEY)
+    manager = DialogManager(page)
+    page.session.set(SESSION_KEY, manager)
+    return manager
@@ -0,0 +1,514 @@
+# app/local_backend.py
+# In-process stand-in for the Supabase project (tables, auth, storage), so
+# the app, scripts and benchmarks run offline and reproducibly:
+#
+#   TASK_BACKEND=local python main.py
+#
+# It implements the subset of the supabase-py client this app calls. Rows
+# live in memory, written through to SQLite when LOCAL_BACKEND_DB is set.
+# LOCAL_BACKEND_LATENCY_MS / _JITTER_MS / _FAILURE_RATE / _SEED inject a
+# per-request delay and random network failures. No row-level security.
+import base64
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import httpx
+
+DEMO_EMAIL = "demo@example.com"
+DEMO_PASSWORD = "demo1234"
+TOKEN_TTL = 3600
+
+
+class BackendError(Exception):
+    """Raised like postgrest's APIError: has `.code` and `.message`."""
+
+    def __init__(self, message: str, code: str = "local"):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def _make_token(user: dict) -> str:
+    # JWT-shaped (unsigned) so app.auth can read sub/email/exp locally
+    claims = {"sub": user["id"], "email": user["email"], "exp": int(time.time()) + TOKEN_TTL}
+    return f"{_b64({'alg': 'none', 'typ': 'JWT'})}.{_b64(claims)}.local"
+
+
+def _hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+# ---------------- STORE ----------------
+
+class LocalStore:
+    """One fake project: every client created by new_client() shares it."""
+
+    def __init__(self, db_path: str | None = None):
+        self.tables = {}  # name -> {id: row}
+        self.users = {}  # email -> {"id", "email", "password", "full_name"}
+        self.refresh_tokens = {}  # token -> email
+        self.revoked = set()
+        self.lock = threading.RLock()
+        self.latency = 0.0
+        self.jitter = 0.0
+        self.failure_rate = 0.0
+        self.rng = random.Random()
+        self.requests = {}  # (table, op) -> count
+        self.storage_root = os.getenv("LOCAL_BACKEND_STORAGE") or os.path.join(
+            tempfile.gettempdir(), "task_manager_local_storage"
+        )
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rows (tbl TEXT, id TEXT, data TEXT NOT NULL, PRIMARY KEY (tbl, id))"
+            )
+            for tbl, row_id, data in self._db.execute("SELECT tbl, id, data FROM rows"):
+                if tbl == "auth.users":
+                    self.users[row_id] = json.loads(data)
+                else:
+                    self.tables.setdefault(tbl, {})[row_id] = json.loads(data)
+
+    def configure(self, latency_ms: float = 0, jitter_ms: float = 0, failure_rate: float = 0, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+
+    def network(self, table: str, op: str):
+        """Every request passes here: count it, delay it, maybe fail it."""
+        with self.lock:
+            self.requests[(table, op)] = self.requests.get((table, op), 0) + 1
+            delay = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+            fail = self.failure_rate and self.rng.random() < self.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise httpx.ConnectError(f"injected failure ({table} {op})")
+
+    def request_count(self) -> int:
+        with self.lock:
+            return sum(self.requests.values())
+
+    def _persist(self, tbl: str, row_id: str, row: dict | None):
+        if self._db is None:
+            return
+        if row is None:
+            self._db.execute("DELETE FROM rows WHERE tbl = ? AND id = ?", (tbl, row_id))
+        else:
+            self._db.execute(
+                "INSERT OR REPLACE INTO rows (tbl, id, data) VALUES (?, ?, ?)", (tbl, row_id, json.dumps(row, default=str))
+            )
+
+    def table(self, name: str) -> dict:
+        return self.tables.setdefault(name, {})
+
+    def put(self, tbl: str, row: dict):
+        with self.lock:
+            self.table(tbl)[row["id"]] = row
+            self._persist(tbl, row["id"], row)
+
+    def remove(self, tbl: str, row_id: str):
+        with self.lock:
+            self.table(tbl).pop(row_id, None)
+            self._persist(tbl, row_id, None)
+
+    def add_user(self, email: str, password: str, full_name: str | None = None) -> dict:
+        with self.lock:
+            email = email.strip().lower()
+            if email in self.users:
+                raise BackendError("User already registered", "user_already_exists")
+            user = {"id": str(uuid.uuid4()), "email": email, "password": _hash_password(password), "full_name": full_name}
+            self.users[email] = user
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO rows (tbl, id, data) VALUES ('auth.users', ?, ?)", (email, json.dumps(user))
+                )
+            return user
+
+
+# ---------------- QUERIES ----------------
+
+def _parse_json(val):
+    if isinstance(val, str):
+        try:
+            return json.loads(val)
+        except ValueError:
+            return val
+    return val
+
+
+def _contains(have, want) -> bool:
+    """Postgres jsonb @>: every element of `want` is matched in `have`."""
+    have, want = _parse_json(have), _parse_json(want)
+    if isinstance(want, list):
+        return isinstance(have, list) and all(any(_contains(h, w) for h in have) for w in want)
+    if isinstance(want, dict):
+        return isinstance(have, dict) and all(k in have and _contains(have[k], v) for k, v in want.items())
+    return have == want
+
+
+def _like(pattern: str) -> re.Pattern:
+    # As in Postgres: % any run, _ any one character, backslash escapes
+    out, chars = [], iter(pattern)
+    for ch in chars:
+        if ch == "\\":
+            out.append(re.escape(next(chars, "\\")))
+        elif ch == "%":
+            out.append(".*")
+        elif ch == "_":
+            out.append(".")
+        else:
+            out.append(re.escape(ch))
+    return re.compile("^" + "".join(out) + "$", re.IGNORECASE | re.DOTALL)
+
+
+class QueryBuilder:
+    def __init__(self, store: LocalStore, table: str):
+        self.store = store
+        self.name = table
+        self.op = "select"
+        self.columns = None
+        self.payload = None
+        self.filters = []
+        self.ordering = []
+        self.bounds = None
+        self.one = False
+        self.want_count = False
+
+    # -- verbs --
+    def select(self, columns: str = "*", count=None):
+        self.op = "select"
+        cols = [c.strip() for c in columns.split(",") if c.strip()]
+        self.columns = None if "*" in cols else cols
+        self.want_count = bool(count)
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, **_):
+        self.op, self.payload = "upsert", payload
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    # -- filters --
+    def _filter(self, fn):
+        self.filters.append(fn)
+        return self
+
+    def eq(self, col, val):
+        return self._filter(lambda r: r.get(col) == val or (r.get(col) is not None and str(r.get(col)) == str(val)))
+
+    def neq(self, col, val):
+        return self._filter(lambda r: str(r.get(col)) != str(val))
+
+    def gt(self, col, val):
+        return self._filter(lambda r: r.get(col) is not None and str(r.get(col)) > str(val))
+
+    def gte(self, col, val):
+        return self._filter(lambda r: r.get(col) is not None and str(r.get(col)) >= str(val))
+
+    def lt(self, col, val):
+        return self._filter(lambda r: r.get(col) is not None and str(r.get(col)) < str(val))
+
+    def lte(self, col, val):
+        return self._filter(lambda r: r.get(col) is not None and str(r.get(col)) <= str(val))
+
+    def in_(self, col, values):
+        wanted = {str(v) for v in values}
+        return self._filter(lambda r: str(r.get(col)) in wanted)
+
+    def is_(self, col, val):
+        target = None if val in (None, "null") else val
+        return self._filter(lambda r: r.get(col) is target or r.get(col) == target)
+
+    def contains(self, col, val):
+        return self._filter(lambda r: _contains(r.get(col), val))
+
+    def ilike(self, col, pattern):
+        rx = _like(pattern)
+        return self._filter(lambda r: r.get(col) is not None and bool(rx.match(str(r.get(col)))))
+
+    def or_(self, expr: str):
+        # "col.ilike.pat,col2.ilike.pat" -- the only form this app uses
+        tests = []
+        for part in expr.split(","):
+            col, op, val = part.split(".", 2)
+            if op != "ilike":
+                raise BackendError(f"or_ operator not supported: {op}")
+            tests.append((col, _like(val.replace("*", "%"))))
+        return self._filter(lambda r: any(r.get(c) is not None and rx.match(str(r.get(c))) for c, rx in tests))
+
+    # -- shaping --
+    def order(self, col, desc: bool = False, **_):
+        self.ordering.append((col, desc))
+        return self
+
+    def range(self, start: int, end: int):
+        self.bounds = (start, end + 1)
+        return self
+
+    def limit(self, n: int):
+        self.bounds = (0, n)
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def maybe_single(self):
+        return self.single()
+
+    # -- execution --
+    def _matching(self) -> list[dict]:
+        rows = [r for r in self.store.table(self.name).values() if all(f(r) for f in self.filters)]
+        for col, desc in reversed(self.ordering):
+            rows.sort(key=lambda r: (r.get(col) is None, str(r.get(col) or "")), reverse=desc)
+        return rows
+
+    def _project(self, row: dict) -> dict:
+        row = copy.deepcopy(row)
+        return row if self.columns is None else {c: row.get(c) for c in self.columns}
+
+    def execute(self):
+        self.store.network(self.name, self.op)
+        with self.store.lock:
+            if self.op == "select":
+                rows = self._matching()
+                count = len(rows)
+                if self.bounds:
+                    rows = rows[self.bounds[0] : self.bounds[1]]
+                data = [self._project(r) for r in rows]
+            elif self.op in ("insert", "upsert"):
+                items = self.payload if isinstance(self.payload, list) else [self.payload]
+                data = []
+                for item in items:
+                    row = copy.deepcopy(item)
+                    row.setdefault("id", str(uuid.uuid4()))
+                    row.setdefault("created_at", _now_iso())
+                    existing = self.store.table(self.name).get(row["id"])
+                    if existing is not None:
+                        if self.op == "insert":
+                            raise BackendError("duplicate key value violates unique constraint", "23505")
+                        row = {**existing, **row}
+                    self.store.put(self.name, row)
+                    data.append(copy.deepcopy(row))
+                count = len(data)
+            elif self.op == "update":
+                data = []
+                for row in self._matching():
+                    row = {**row, **copy.deepcopy(self.payload)}
+                    self.store.put(self.name, row)
+                    data.append(copy.deepcopy(row))
+                count = len(data)
+            else:
+                data = []
+                for row in self._matching():
+                    self.store.remove(self.name, row["id"])
+                    data.append(copy.deepcopy(row))
+                count = len(data)
+
+        if self.one:
+            if len(data) != 1:
+                raise BackendError("JSON object requested, multiple (or no) rows returned", "PGRST116")
+            data = data[0]
+        return SimpleNamespace(data=data, count=count if self.want_count else None)
+
+
+# ---------------- AUTH ----------------
+
+class LocalAuth:
+    def __init__(self, store: LocalStore, access_token: str | None = None):
+        self.store = store
+        self._session = None
+        self.admin = SimpleNamespace(sign_out=self._admin_sign_out)
+        self._preset = access_token  # like the Authorization header preset
+
+    def _user_obj(self, user: dict):
+        return SimpleNamespace(id=user["id"], email=user["email"], user_metadata={"full_name": user.get("full_name")})
+
+    def _new_session(self, user: dict):
+        refresh = uuid.uuid4().hex
+        with self.store.lock:
+            self.store.refresh_tokens[refresh] = user["email"]
+        self._session = SimpleNamespace(
+            access_token=_make_token(user),
+            refresh_token=refresh,
+            expires_in=TOKEN_TTL,
+            user=self._user_obj(user),
+        )
+        return SimpleNamespace(user=self._session.user, session=self._session)
+
+    def sign_in_with_password(self, credentials: dict):
+        self.store.network("auth", "token")
+        user = self.store.users.get((credentials.get("email") or "").strip().lower())
+        if not user or user["password"] != _hash_password(credentials.get("password") or ""):
+            raise BackendError("Invalid login credentials", "invalid_credentials")
+        return self._new_session(user)
+
+    def sign_up(self, payload: dict):
+        self.store.network("auth", "signup")
+        full_name = ((payload.get("options") or {}).get("data") or {}).get("full_name")
+        user = self.store.add_user(payload["email"].strip().lower(), payload["password"], full_name)
+        return self._new_session(user)
+
+    def refresh_session(self, refresh_token: str | None = None):
+        self.store.network("auth", "refresh")
+        with self.store.lock:
+            email = self.store.refresh_tokens.pop(refresh_token or "", None)
+        user = self.store.users.get(email) if email else None
+        if not user:
+            raise BackendError("Invalid Refresh Token", "refresh_token_not_found")
+        return self._new_session(user)
+
+    def get_session(self):
+        return self._session
+
+    def get_user(self, jwt: str | None = None):
+        self.store.network("auth", "user")
+        token = jwt or (self._session.access_token if self._session else self._preset)
+        if not token or token in self.store.revoked:
+            return None
+        try:
+            payload = token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        except Exception:
+            return None
+        user = next((u for u in self.store.users.values() if u["id"] == claims.get("sub")), None)
+        return SimpleNamespace(user=self._user_obj(user)) if user else None
+
+    def _admin_sign_out(self, jwt: str, scope: str = "global"):
+        self.store.network("auth", "logout")
+        with self.store.lock:
+            self.store.revoked.add(jwt)
+
+    def sign_out(self, options=None):
+        if self._session is not None:
+            self._admin_sign_out(self._session.access_token)
+        self._session = None
+
+
+# ---------------- CLIENT ----------------
+
+class LocalClient:
+    """Duck-typed replacement for supabase.Client."""
+
+    def __init__(self, store: LocalStore, access_token: str | None = None):
+        self.store = store
+        self.auth = LocalAuth(store, access_token)
+        # app.storage.get_pdf_storage() serves the bucket from this folder
+        self.storage_root = store.storage_root
+
+    def table(self, name: str) -> QueryBuilder:
+        return QueryBuilder(self.store, name)
+
+    from_ = table
+
+
+def seed(store: LocalStore, tasks: int = 100, users: int = 20, subtasks: int = 5, comments: int = 3,
+         clients: int = 20, seed_value: int = 1) -> dict:
+    """Fill the store with a demo account plus realistic tasks/clients.
+
+    The demo user owns half of the tasks and is assigned to a quarter of
+    the rest. Returns the demo user row.
+    """
+    rng = random.Random(seed_value)
+    demo = store.users.get(DEMO_EMAIL) or store.add_user(DEMO_EMAIL, DEMO_PASSWORD, "Demo User")
+    people = [demo] + [
+        store.users.get(f"user{i}@example.com") or store.add_user(f"user{i}@example.com", "password", f"User {i}")
+        for i in range(1, users)
+    ]
+    for p in people:
+        store.put("profiles", {"id": p["id"], "email": p["email"], "full_name": p["full_name"]})
+    client_ids = []
+    for i in range(clients):
+        cid = str(uuid.uuid4())
+        client_ids.append(cid)
+        store.put("clients", {
+            "id": cid, "owner": demo["id"], "branch_name": f"Branch {i}", "person_email": f"client{i}@example.com",
+            "person_phone": f"+92 300 {i:07d}", "city": rng.choice(["Lahore", "Karachi", "Islamabad"]),
+            "area": f"Block {rng.randint(1, 20)}", "created_at": _now_iso(),
+        })
+    words = "inspect replace calibrate verify install repair survey report check clean".split()
+    for i in range(tasks):
+        owner = demo if i % 2 == 0 else rng.choice(people[1:] or [demo])
+        assignees = rng.sample([p["id"] for p in people], k=min(2, len(people)))
+        if i % 2 and i % 4 == 1:
+            assignees = list(dict.fromkeys([demo["id"], *assignees]))
+        stamp = datetime.fromtimestamp(1_700_000_000 + i * 60, timezone.utc).isoformat()
+        store.put("tasks", {
+            "id": str(uuid.uuid4()),
+            "owner": owner["id"],
+            "title": f"{rng.choice(words).title()} site {i}",
+            "description": " ".join(rng.choice(words) for _ in range(20)),
+            "status": rng.choice(["open", "open", "in_progress", "closed"]),
+            "client_id": rng.choice(client_ids) if client_ids else None,
+            "pdf_url": None,
+            "pdf_meta": None,
+            "assignees": assignees,
+            "subtasks": [
+                {"id": str(uuid.uuid4()), "title": f"{rng.choice(words)} step {j}", "done": rng.random() < 0.4}
+                for j in range(subtasks)
+            ],
+            "comments": [
+                {"author": rng.choice(people)["email"], "text": " ".join(rng.choice(words) for _ in range(12)),
+                 "timestamp": "2024-01-01 10:00"}
+                for _ in range(comments)
+            ],
+            "created_at": stamp,
+            "updated_at": stamp,
+        })
+    return demo
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> LocalStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocalStore(os.getenv("LOCAL_BACKEND_DB") or None)
+            _store.configure(
+                latency_ms=float(os.getenv("LOCAL_BACKEND_LATENCY_MS") or 0),
+                jitter_ms=float(os.getenv("LOCAL_BACKEND_JITTER_MS") or 0),
+                failure_rate=float(os.getenv("LOCAL_BACKEND_FAILURE_RATE") or 0),
+                seed=os.getenv("LOCAL_BACKEND_SEED") or None,
+            )
+            n = int(os.getenv("LOCAL_BACKEND_SEED_TASKS") or 0)
+            if n and not _store.table("tasks"):
+                seed(_store, tasks=n)
+        return _store
+
+
+def new_client(access_token: str | None = None) -> LocalClient:
+    return LocalClient(get_store(), access_token)
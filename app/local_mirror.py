@@ -0,0 +1,472 @@
+# app/local_mirror.py
+# Optional on-device mirror of tasks, clients and profiles for the desktop
+# and mobile builds. Reads are served from SQLite; writes are applied
+# locally and queued in a durable outbox that is replayed to Supabase in
+# order, with a per-field conflict check against the server row.
+#
+# Enable with LOCAL_MIRROR=1. One signed-in user per process: not meant
+# for the multi-user web server.
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from app.models import as_list, execute_patch
+
+MIRROR_TABLES = ("tasks", "clients", "profiles")
+SYNC_INTERVAL = int(os.getenv("LOCAL_MIRROR_SYNC_INTERVAL", "30"))
+# Deleted rows are invisible to an updated_at cursor; compare ids this often
+RECONCILE_INTERVAL = 300
+PAGE_SIZE = 1000
+# Give up on an outbox entry the server keeps rejecting after this many tries
+MAX_ATTEMPTS = 5
+UPDATE_RETRIES = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY, owner TEXT, status TEXT, client_id TEXT, updated_at TEXT, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_owner ON tasks(owner);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status);
+CREATE INDEX IF NOT EXISTS tasks_client ON tasks(client_id);
+CREATE TABLE IF NOT EXISTS task_assignees (
+    task_id TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (task_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS task_assignees_user ON task_assignees(user_id);
+CREATE TABLE IF NOT EXISTS clients (id TEXT PRIMARY KEY, owner TEXT, updated_at TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS clients_owner ON clients(owner);
+CREATE TABLE IF NOT EXISTS profiles (id TEXT PRIMARY KEY, updated_at TEXT, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sync_state (
+    tbl TEXT PRIMARY KEY, cursor TEXT, incremental INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    tbl TEXT NOT NULL,
+    op TEXT NOT NULL,
+    row_id TEXT NOT NULL,
+    patch TEXT,
+    base TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    dead INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_row ON outbox(tbl, row_id);
+CREATE TABLE IF NOT EXISTS conflicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tbl TEXT, row_id TEXT, field TEXT, ours TEXT, theirs TEXT, resolution TEXT, at REAL
+);
+"""
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _norm(val):
+    if isinstance(val, str) and val[:1] in "[{":
+        try:
+            return json.loads(val)
+        except ValueError:
+            return val
+    return val
+
+
+def _same(a, b) -> bool:
+    return json.dumps(_norm(a), sort_keys=True, default=str) == json.dumps(_norm(b), sort_keys=True, default=str)
+
+
+def _merge_by_id(base, ours, theirs):
+    """Three-way merge of lists of {"id": ...} dicts (subtasks, comments):
+    the server's list plus our own additions, removals and edits.
+    None when the values are not such lists."""
+    base, ours, theirs = _norm(base), _norm(ours), _norm(theirs)
+    lists = (base or [], ours or [], theirs or [])
+    if not all(isinstance(v, list) and all(isinstance(x, dict) and x.get("id") for x in v) for v in lists):
+        return None
+    b = {x["id"]: x for x in lists[0]}
+    o = {x["id"]: x for x in lists[1]}
+    merged = []
+    for item in lists[2]:
+        i = item["id"]
+        if i in b and i not in o:
+            continue  # we removed it
+        merged.append(o[i] if i in o and not _same(o[i], b.get(i)) else item)
+    seen = {x["id"] for x in lists[2]}
+    merged += [x for x in lists[1] if x["id"] not in b and x["id"] not in seen]
+    return merged
+
+
+class LocalMirror:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # The outbox holds unsent user edits: fsync every commit
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._target = None  # (client, user_id) used by the background sync
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_sync = 0.0
+        self._last_reconcile = {}
+
+    # ---------------- reads ----------------
+
+    def _query(self, sql: str, args=()) -> list[dict]:
+        with self._lock:
+            return [json.loads(r[0]) for r in self._conn.execute(sql, args)]
+
+    def tasks_for_user(self, uid: str) -> list[dict]:
+        return self._query(
+            "SELECT data FROM tasks WHERE owner = ? "
+            "OR id IN (SELECT task_id FROM task_assignees WHERE user_id = ?)",
+            (uid, uid),
+        )
+
+    def get(self, tbl: str, row_id: str) -> dict | None:
+        rows = self._query(f"SELECT data FROM {tbl} WHERE id = ?", (row_id,))
+        return rows[0] if rows else None
+
+    def rows(self, tbl: str) -> list[dict]:
+        return self._query(f"SELECT data FROM {tbl}")
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE dead = 0").fetchone()[0]
+
+    # ---------------- local writes ----------------
+
+    def _put(self, tbl: str, row: dict):
+        data = json.dumps(row, default=str)
+        if tbl == "tasks":
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, owner, status, client_id, updated_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (row["id"], row.get("owner"), (row.get("status") or "open").lower(),
+                 row.get("client_id"), row.get("updated_at"), data),
+            )
+            self._conn.execute("DELETE FROM task_assignees WHERE task_id = ?", (row["id"],))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO task_assignees (task_id, user_id) VALUES (?, ?)",
+                [(row["id"], a) for a in as_list(row.get("assignees")) if a],
+            )
+        elif tbl == "clients":
+            self._conn.execute(
+                "INSERT OR REPLACE INTO clients (id, owner, updated_at, data) VALUES (?, ?, ?, ?)",
+                (row["id"], row.get("owner"), row.get("updated_at"), data),
+            )
+        else:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {tbl} (id, updated_at, data) VALUES (?, ?, ?)",
+                (row["id"], row.get("updated_at"), data),
+            )
+
+    def _drop(self, tbl: str, row_id: str):
+        self._conn.execute(f"DELETE FROM {tbl} WHERE id = ?", (row_id,))
+        if tbl == "tasks":
+            self._conn.execute("DELETE FROM task_assignees WHERE task_id = ?", (row_id,))
+
+    def _enqueue(self, tbl, op, row_id, patch=None, base=None):
+        uid = self._target[1] if self._target else ""
+        self._conn.execute(
+            "INSERT INTO outbox (user_id, tbl, op, row_id, patch, base, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (uid, tbl, op, row_id,
+             json.dumps(patch, default=str) if patch is not None else None,
+             json.dumps(base, default=str) if base is not None else None,
+             time.time()),
+        )
+
+    def insert(self, tbl: str, row: dict):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._put(tbl, row)
+                self._enqueue(tbl, "insert", row["id"], row)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._wake.set()
+
+    def update(self, tbl: str, row_id: str, patch: dict):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self.get(tbl, row_id)
+                # The values this edit was made against, for the conflict check
+                base = {f: current.get(f) for f in patch} if current else {}
+                if current is not None:
+                    self._put(tbl, {**current, **patch})
+                self._enqueue(tbl, "update", row_id, patch, base)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._wake.set()
+
+    def delete(self, tbl: str, row_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._drop(tbl, row_id)
+                self._enqueue(tbl, "delete", row_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._wake.set()
+
+    # ---------------- outbox replay ----------------
+
+    def _conflict(self, tbl, row_id, field, ours, theirs, resolution):
+        print(f"⚠️ sync conflict on {tbl}/{row_id}.{field}: {resolution}")
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conflicts (tbl, row_id, field, ours, theirs, resolution, at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (tbl, row_id, field, json.dumps(ours, default=str), json.dumps(theirs, default=str), resolution, time.time()),
+            )
+
+    def _resolve(self, tbl, row_id, patch: dict, base: dict, server: dict) -> dict:
+        final = {}
+        for f, ours in patch.items():
+            if f == "updated_at":
+                continue
+            theirs = server.get(f)
+            if f not in base or _same(theirs, base[f]):
+                final[f] = ours  # nobody else touched it
+            elif _same(theirs, ours):
+                continue  # same change made elsewhere
+            else:
+                merged = _merge_by_id(base[f], ours, theirs)
+                if merged is not None:
+                    final[f] = merged
+                    self._conflict(tbl, row_id, f, ours, theirs, "merged by id")
+                else:
+                    self._conflict(tbl, row_id, f, ours, theirs, "server value kept")
+        if final and "updated_at" in server:
+            # Stamp the replay time, not the (possibly hours old) edit time:
+            # other devices pull by updated_at and would never see it otherwise
+            final["updated_at"] = _now_iso()
+        return final
+
+    def _replay_update(self, client, tbl, row_id, patch, base):
+        for _ in range(UPDATE_RETRIES):
+            res = client.table(tbl).select("*").eq("id", row_id).execute()
+            server = (res.data or [None])[0]
+            if server is None:
+                self._conflict(tbl, row_id, "*", patch, None, "deleted on server, edit dropped")
+                return
+            final = self._resolve(tbl, row_id, patch, base, server)
+            if not final:
+                return
+            def make_query(values, stamp=server.get("updated_at")):
+                q = client.table(tbl).update(values).eq("id", row_id)
+                # Only if nobody wrote since we read it; else re-check
+                return q.eq("updated_at", stamp) if stamp is not None else q
+
+            res = execute_patch(make_query, final)
+            if res.data:
+                self._store_server_row(tbl, res.data[0])
+                return
+        raise RuntimeError(f"{tbl}/{row_id} kept changing during replay")
+
+    def _store_server_row(self, tbl, row):
+        with self._lock:
+            busy = self._conn.execute(
+                "SELECT 1 FROM outbox WHERE tbl = ? AND row_id = ? AND dead = 0 LIMIT 2", (tbl, row["id"])
+            ).fetchall()
+            # The entry being replayed is still queued; later local edits win
+            if len(busy) <= 1:
+                self._put(tbl, row)
+
+    def _replay_one(self, client, tbl, op, row_id, patch, base):
+        if op == "insert":
+            try:
+                client.table(tbl).insert(patch).execute()
+            except httpx.TransportError:
+                raise
+            except Exception as e:
+                if getattr(e, "code", None) != "23505":  # already inserted
+                    raise
+        elif op == "delete":
+            client.table(tbl).delete().eq("id", row_id).execute()
+        else:
+            self._replay_update(client, tbl, row_id, patch, base)
+
+    def replay(self, client, uid: str) -> bool:
+        """Send queued writes in order. False when the server is unreachable."""
+        while True:
+            with self._lock:
+                entry = self._conn.execute(
+                    "SELECT seq, tbl, op, row_id, patch, base, attempts FROM outbox "
+                    "WHERE dead = 0 AND user_id = ? ORDER BY seq LIMIT 1",
+                    (uid,),
+                ).fetchone()
+            if entry is None:
+                return True
+            seq, tbl, op, row_id, patch, base, attempts = entry
+            try:
+                self._replay_one(client, tbl, op, row_id,
+                                 json.loads(patch) if patch else None,
+                                 json.loads(base) if base else {})
+            except httpx.TransportError:
+                return False
+            except Exception as e:
+                dead = attempts + 1 >= MAX_ATTEMPTS
+                print("⚠️ outbox replay failed:", tbl, op, row_id, repr(e))
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE outbox SET attempts = attempts + 1, last_error = ?, dead = ? WHERE seq = ?",
+                        (repr(e), int(dead), seq),
+                    )
+                if not dead:
+                    return False  # keep the order: retry on the next sync
+                continue
+            with self._lock:
+                self._conn.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+
+    # ---------------- pull ----------------
+
+    @staticmethod
+    def _fetch_pages(make_query) -> list[dict]:
+        rows, start = [], 0
+        while True:
+            page = make_query().range(start, start + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    def _pending_ids(self, tbl) -> set:
+        return {r[0] for r in self._conn.execute("SELECT row_id FROM outbox WHERE tbl = ? AND dead = 0", (tbl,))}
+
+    def _pull(self, client, tbl):
+        with self._lock:
+            state = self._conn.execute("SELECT cursor, incremental FROM sync_state WHERE tbl = ?", (tbl,)).fetchone()
+        cursor, incremental = state if state else (None, 0)
+
+        if incremental and cursor:
+            rows = self._fetch_pages(
+                lambda: client.table(tbl).select("*").gte("updated_at", cursor).order("updated_at")
+            )
+            live_ids = None
+            if time.time() - self._last_reconcile.get(tbl, 0) > RECONCILE_INTERVAL:
+                live_ids = {r["id"] for r in self._fetch_pages(lambda: client.table(tbl).select("id").order("id"))}
+                self._last_reconcile[tbl] = time.time()
+        else:
+            # First sync, or a table without updated_at: full copy
+            rows = self._fetch_pages(lambda: client.table(tbl).select("*").order("id"))
+            live_ids = {r["id"] for r in rows}
+            incremental = int(bool(rows) and all(r.get("updated_at") for r in rows))
+            self._last_reconcile[tbl] = time.time()
+
+        stamps = [r["updated_at"] for r in rows if r.get("updated_at")]
+        cursor = max([cursor or "", *stamps]) or None
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = self._pending_ids(tbl)
+                for r in rows:
+                    if r.get("id") and r["id"] not in pending:
+                        self._put(tbl, r)
+                if live_ids is not None:
+                    local = {r[0] for r in self._conn.execute(f"SELECT id FROM {tbl}")}
+                    for row_id in local - live_ids - pending:
+                        self._drop(tbl, row_id)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (tbl, cursor, incremental) VALUES (?, ?, ?)",
+                    (tbl, cursor, incremental),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _reset_if_other_user(self, uid: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'user_id'").fetchone()
+            if row and row[0] == uid:
+                return
+            # Another account signed in: its data must not show up. Queued
+            # writes stay, tagged with their user, until that user is back.
+            for tbl in (*MIRROR_TABLES, "task_assignees", "sync_state"):
+                self._conn.execute(f"DELETE FROM {tbl}")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('user_id', ?)", (uid,))
+            self._last_reconcile.clear()
+
+    def sync(self, client, uid: str) -> bool:
+        """Replay the outbox, then pull changes. False when offline or failed."""
+        with self._sync_lock:
+            try:
+                self._reset_if_other_user(uid)
+                if not self.replay(client, uid):
+                    return False
+                for tbl in MIRROR_TABLES:
+                    self._pull(client, tbl)
+                self._last_sync = time.time()
+                return True
+            except httpx.TransportError:
+                return False
+            except Exception as e:  # e.g. a PostgREST APIError
+                print("⚠️ local mirror sync failed:", repr(e))
+                return False
+
+    # ---------------- background sync ----------------
+
+    def is_ready_for(self, uid: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'user_id'").fetchone()
+            synced = self._conn.execute("SELECT COUNT(*) FROM sync_state").fetchone()[0]
+        return bool(row and row[0] == uid and synced)
+
+    def ensure_ready(self, client, uid: str) -> bool:
+        """Keep the mirror syncing for this user in the background. True once
+        it holds a full copy; until then callers go to the server directly,
+        so the first sync never runs on (and blocks) a UI handler."""
+        self._target = (client, uid)
+        ready = self.is_ready_for(uid)
+        if (not ready or time.time() - self._last_sync > SYNC_INTERVAL) and not self._sync_lock.locked():
+            self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="local-mirror-sync", daemon=True)
+            self._thread.start()
+        return ready
+
+    def _run(self):
+        while True:
+            self._wake.wait(SYNC_INTERVAL)
+            self._wake.clear()
+            client, uid = self._target
+            self.sync(client, uid)
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def mirror_enabled() -> bool:
+    return (os.getenv("LOCAL_MIRROR") or "").strip().lower() in ("1", "true", "yes")
+
+
+def get_local_mirror() -> LocalMirror | None:
+    """The process-wide mirror, or None unless LOCAL_MIRROR is set."""
+    global _mirror
+    if not mirror_enabled():
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            # Flet's app data dir on mobile/desktop builds, config/ otherwise
+            default_dir = os.getenv("FLET_APP_STORAGE_DATA") or "config"
+            path = os.getenv("LOCAL_MIRROR_PATH") or os.path.join(default_dir, "mirror.sqlite3")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _mirror = LocalMirror(path)
+        return _mirror
@@ -0,0 +1,344 @@
+# app/metrics.py
+# Process metrics in Prometheus text format, served on a side port next to
+# the Flet server when METRICS_PORT is set (GET /metrics). With several web
+# workers each worker listens on METRICS_PORT + its worker id. The same port
+# serves GET /debug/profile (see app/profiling.py) when PROFILE_TOKEN is set.
+# Histograms have fixed buckets and every metric caps its label sets, so
+# memory stays bounded however long the process runs.
+import functools
+import hmac
+import os
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from app.workers import WORKER_ID_ENV
+
+# Seconds: from a cached read to a slow Supabase round-trip or big render
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONTROL_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+# Further label combinations of one metric are folded into "other"
+MAX_LABEL_SETS = 200
+
+
+def metrics_port() -> int | None:
+    raw = (os.getenv("METRICS_PORT") or "").strip()
+    if not raw:
+        return None
+    try:
+        port = int(raw) + int(os.getenv(WORKER_ID_ENV) or 0)
+    except ValueError:
+        port = -1
+    if not 0 < port < 65536:
+        # A bad setting must not keep the app from starting
+        print(f"⚠️ METRICS_PORT={raw!r} is not a valid port, metrics disabled")
+        return None
+    return port
+
+
+PORT = metrics_port()
+ENABLED = PORT is not None
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        if key not in self._values and len(self._values) >= MAX_LABEL_SETS:
+            key = ("other",) * len(self.label_names)
+        return key
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+_INF = 'le="+Inf"'
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        with self._lock:
+            key = self._key(labels)
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(c), s, n) for k, (c, s, n) in self._values.items()]
+        lines = self.header()
+        for key, counts, total, n in items:
+            running = 0
+            for bound, c in zip(self.buckets, counts):
+                running += c
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [le])} {running}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [_INF])} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []  # callables returning [(name, kind, help, {labels: value})]
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Read values other modules already keep, at scrape time only."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines += m.render()
+        for fn in self._collectors:
+            try:
+                samples = fn()
+            except Exception as e:
+                print("⚠️ metrics collector failed:", repr(e))
+                continue
+            for name, kind, help_text, values in samples:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in values.items():
+                    names = [n for n, _ in labels]
+                    lines.append(f"{name}{_labels(names, [v for _, v in labels])} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+ROUTE_SECONDS = registry.register(Histogram(
+    "task_manager_route_change_seconds", "Time to build and send a route's view.", ("route",)))
+QUERY_SECONDS = registry.register(Histogram(
+    "task_manager_query_seconds", "Latency of data layer calls.", ("query", "outcome")))
+REFRESH_SECONDS = registry.register(Histogram(
+    "task_manager_refresh_seconds", "Page refresh time, fetch included.", ("page",)))
+REFRESH_CONTROLS = registry.register(Histogram(
+    "task_manager_refresh_controls", "Controls on a page after a refresh.", ("page",), CONTROL_BUCKETS))
+ACTIVE_SESSIONS = registry.register(Gauge(
+    "task_manager_active_sessions", "Open Flet sessions in this process."))
+
+
+# ---------------- HOOKS ----------------
+
+# Set by timed_query for the call in progress, see record_query_error()
+_query_failed: ContextVar = ContextVar("query_failed", default=None)
+
+
+def record_query_error():
+    """Count the current query as an error when it handled one and returned
+    a fallback instead of raising (the metrics twin of tracing.record_error)."""
+    failed = _query_failed.get()
+    if failed is not None:
+        failed[0] = True
+
+
+def timed_query(name: str):
+    """Observe a data layer function's latency (no-op without METRICS_PORT)."""
+
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            failed = [False]
+            token = _query_failed.set(failed)
+            try:
+                result = fn(*args, **kwargs)
+                outcome = "error" if failed[0] else "ok"
+                return result
+            finally:
+                _query_failed.reset(token)
+                QUERY_SECONDS.observe(time.perf_counter() - start, query=name, outcome=outcome)
+
+        return wrapper
+
+    return decorator
+
+
+def count_controls(control) -> int:
+    n, stack = 0, [control]
+    while stack:
+        c = stack.pop()
+        n += 1
+        stack.extend(c._get_children())
+    return n
+
+
+def timed_refresh(page_name: str):
+    """Observe a page refresh method: its duration and the controls it left."""
+
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                REFRESH_SECONDS.observe(time.perf_counter() - start, page=page_name)
+                REFRESH_CONTROLS.observe(count_controls(self), page=page_name)
+
+        return wrapper
+
+    return decorator
+
+
+@registry.collector
+def _cache_stats():
+    from app.db_client import single_flight_stats
+    from app.signed_urls import get_signed_url_cache
+
+    urls = get_signed_url_cache()
+    out = [
+        ("task_manager_signed_url_cache_total", "counter", "Signed PDF URL lookups by result.",
+         {(("result", "hit"),): urls.hits, (("result", "miss"),): urls.misses}),
+        ("task_manager_single_flight_calls_total", "counter", "Deduplicated reads, and how many shared a flight.",
+         {(("result", "leader"),): single_flight_stats["calls"] - single_flight_stats["shared"],
+          (("result", "shared"),): single_flight_stats["shared"]}),
+    ]
+    from app.auth import backend_name
+
+    if backend_name() == "local":
+        from app.local_backend import get_store
+
+        with get_store().lock:
+            requests = dict(get_store().requests)
+        out.append(("task_manager_local_backend_requests_total", "counter", "Requests made to the local backend.",
+                    {(("table", t), ("op", op)): n for (t, op), n in requests.items()}))
+    return out
+
+
+# ---------------- HTTP ----------------
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/debug/profile":
+            self._profile()
+            return
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _profile(self):
+        from app import profiling
+
+        query = parse_qs(urlsplit(self.path).query)
+        token = (query.get("token") or [""])[0]
+        if not profiling.PROFILE_TOKEN or not hmac.compare_digest(token, profiling.PROFILE_TOKEN):
+            self.send_error(404)
+            return
+        try:
+            seconds = float((query.get("seconds") or ["30"])[0])
+        except ValueError:
+            self.send_error(400, "seconds must be a number")
+            return
+        path = profiling.start(seconds)
+        body = (f"profiling, writing {path}\n" if path else "a profile is already running\n").encode()
+        self.send_response(202 if path else 409)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server():
+    """Serve /metrics on METRICS_PORT (once per process); no-op when unset."""
+    global _server
+    port = PORT
+    if port is None:
+        return None
+    with _server_lock:
+        if _server is None:
+            # Loopback unless asked: the port also serves /debug/profile
+            host = os.getenv("METRICS_HOST") or "127.0.0.1"
+            try:
+                _server = ThreadingHTTPServer((host, port), _Handler)
+            except OSError as e:
+                print("⚠️ metrics server failed to start:", repr(e))
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            print(f"Metrics on http://{host}:{port}/metrics")
+        return _server
@@ -0,0 +1,85 @@
+# app/models.py
+# Typed rows returned by app.db_client. JSON columns are parsed once here,
+# when a row is fetched, instead of on every render.
+import json
+from dataclasses import dataclass, field, fields, asdict
+
+
+# Task columns an older schema may lack (see README). A write the server
+# rejects because one of them is unknown is sent again without it.
+OPTIONAL_COLUMNS = ("pdf_meta",)
+# PostgREST "column not in schema cache" / Postgres "undefined column"
+_UNKNOWN_COLUMN_CODES = ("PGRST204", "42703")
+
+
+def execute_patch(make_query, patch: dict):
+    """make_query(patch).execute(), retried without an optional column the
+    table does not have."""
+    try:
+        return make_query(patch).execute()
+    except Exception as e:
+        text = str(getattr(e, "message", "") or e)
+        missing = [
+            c for c in OPTIONAL_COLUMNS
+            if c in patch and c in text and str(getattr(e, "code", "")) in _UNKNOWN_COLUMN_CODES
+        ]
+        if not missing:
+            raise
+        print(f"⚠️ tasks.{missing[0]} does not exist, saved without it (see README)")
+        return make_query({k: v for k, v in patch.items() if k != missing[0]}).execute()
+
+
+def as_list(val) -> list:
+    if val is None:
+        return []
+    if isinstance(val, list):
+        return val
+    try:
+        parsed = json.loads(val) if val else []
+    except Exception:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+@dataclass(slots=True)
+class Task:
+    id: str
+    title: str = ""
+    description: str | None = None
+    status: str = "open"
+    owner: str | None = None
+    client_id: str | None = None
+    pdf_url: str | None = None
+    pdf_meta: dict | None = None  # {"pages": int, "thumb_url": str}
+    assignees: list = field(default_factory=list)
+    subtasks: list = field(default_factory=list)
+    comments: list = field(default_factory=list)
+    created_at: str | None = None
+    updated_at: str | None = None
+    extra: dict = field(default_factory=dict)  # columns not listed above, kept as-is
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Task":
+        return cls(
+            id=row.get("id"),
+            title=row.get("title") or "",
+            description=row.get("description"),
+            status=row.get("status") or "open",
+            owner=row.get("owner"),
+            client_id=row.get("client_id"),
+            pdf_url=row.get("pdf_url"),
+            pdf_meta=row.get("pdf_meta") if isinstance(row.get("pdf_meta"), dict) else None,
+            assignees=as_list(row.get("assignees")),
+            subtasks=[s for s in as_list(row.get("subtasks")) if isinstance(s, dict)],
+            comments=[c for c in as_list(row.get("comments")) if isinstance(c, dict)],
+            created_at=row.get("created_at"),
+            updated_at=row.get("updated_at"),
+            extra={k: v for k, v in row.items() if k not in _COLUMNS},
+        )
+
+    def to_dict(self) -> dict:
+        row = asdict(self)
+        return {**row.pop("extra"), **row}
+
+
+_COLUMNS = frozenset(f.name for f in fields(Task)) - {"extra"}
@@ -0,0 +1,248 @@
+# app/payload.py
+# Websocket payload accounting: bytes and controls each page.update() sends
+# to the browser, per page (route) and per session, plus an optional budget
+# for a single user action. Turned on by PAYLOAD_STATS=1 or by setting a
+# budget (PAYLOAD_MAX_UPDATE_BYTES / PAYLOAD_MAX_UPDATE_CONTROLS); over
+# budget prints a warning, or raises with PAYLOAD_BUDGET_MODE=fail (bench
+# runs). Otherwise nothing is wrapped.
+import contextlib
+import functools
+import json
+import os
+import threading
+from collections import deque
+
+from flet.core.protocol import ClientActions, CommandEncoder
+
+from app.metrics import Histogram, registry
+
+SESSION_KEY = "task_manager.payload"
+
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+UPDATE_BYTES = registry.register(Histogram(
+    "task_manager_update_bytes", "Bytes one update sent to the browser.", ("page",), BYTE_BUCKETS))
+UPDATE_CONTROLS = registry.register(Histogram(
+    "task_manager_update_controls", "Controls one update added to the browser.", ("page",),
+    (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)))
+SESSION_BYTES = registry.register(Histogram(
+    "task_manager_session_update_bytes", "Bytes one session sent to the browser in total.", (),
+    BYTE_BUCKETS + (67108864, 268435456)))
+
+
+def _int_env(name: str) -> int | None:
+    raw = (os.getenv(name) or "").strip()
+    return int(raw) if raw else None
+
+
+class PayloadBudgetExceeded(Exception):
+    pass
+
+
+class UpdateStats:
+    """What one update (or one action's updates) sent."""
+
+    __slots__ = ("updates", "bytes", "added", "changed", "removed")
+
+    def __init__(self):
+        self.updates = 0
+        self.bytes = 0
+        self.added = 0  # controls created on the client
+        self.changed = 0  # controls whose props were updated
+        self.removed = 0
+
+    @property
+    def controls(self) -> int:
+        return self.added + self.changed
+
+    def add_message(self, message):
+        self.bytes += len(json.dumps(message, cls=CommandEncoder, separators=(",", ":")).encode())
+        payload = message.payload
+        if message.action == ClientActions.ADD_PAGE_CONTROLS:
+            self.added += len(payload.controls)
+        elif message.action == ClientActions.UPDATE_CONTROL_PROPS:
+            self.changed += len(payload.props)
+        elif message.action in (ClientActions.REMOVE_CONTROL, ClientActions.CLEAN_CONTROL):
+            self.removed += len(payload.ids)
+
+    def merge(self, other: "UpdateStats"):
+        self.updates += other.updates
+        self.bytes += other.bytes
+        self.added += other.added
+        self.changed += other.changed
+        self.removed += other.removed
+
+    def to_dict(self) -> dict:
+        return {"updates": self.updates, "bytes": self.bytes, "controls": self.controls,
+                "added": self.added, "changed": self.changed, "removed": self.removed}
+
+
+class PayloadBudget:
+    def __init__(self, max_bytes: int | None = None, max_controls: int | None = None, mode: str = "warn"):
+        self.max_bytes = max_bytes
+        self.max_controls = max_controls
+        self.mode = mode
+        self.violations = deque(maxlen=100)  # most recent (where, message)
+
+    @classmethod
+    def from_env(cls) -> "PayloadBudget | None":
+        max_bytes = _int_env("PAYLOAD_MAX_UPDATE_BYTES")
+        max_controls = _int_env("PAYLOAD_MAX_UPDATE_CONTROLS")
+        if max_bytes is None and max_controls is None:
+            return None
+        return cls(max_bytes, max_controls, (os.getenv("PAYLOAD_BUDGET_MODE") or "warn").strip().lower())
+
+    def check(self, where: str, stats: UpdateStats) -> str | None:
+        problems = []
+        if self.max_bytes is not None and stats.bytes > self.max_bytes:
+            problems.append(f"{stats.bytes} B > {self.max_bytes} B")
+        if self.max_controls is not None and stats.controls > self.max_controls:
+            problems.append(f"{stats.controls} controls > {self.max_controls}")
+        if not problems:
+            return None
+        message = f"{where}: " + ", ".join(problems)
+        self.violations.append((where, message))
+        if self.mode == "fail":
+            raise PayloadBudgetExceeded(message)
+        print("⚠️ payload budget exceeded:", message)
+        return message
+
+
+class PayloadMeter:
+    """Counts what one session's connection sends.
+
+    Wraps the page connection's send_command(s) on this instance only, so
+    other sessions (and the connection class) are untouched. Each call is one
+    update; `action(name)` groups the updates of a user action and checks
+    them against the budget as a whole.
+    """
+
+    def __init__(self, page, budget: PayloadBudget | None = None):
+        self.page = page
+        self.budget = budget
+        self.session = UpdateStats()
+        self.pages = {}  # route -> UpdateStats
+        self.largest = {}  # route -> UpdateStats of its biggest single update
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._action = None
+
+    def install(self) -> bool:
+        # Flet keeps the connection private; the meter needs the messages it builds
+        conn = getattr(self.page, "_Page__conn", None)
+        if conn is None or not hasattr(conn, "_process_command"):
+            return False
+        send_command, send_commands, process = conn.send_command, conn.send_commands, conn._process_command
+
+        def metered_process(command):
+            result, message = process(command)
+            stats = getattr(self._local, "stats", None)
+            if stats is not None and message is not None:
+                stats.add_message(message)
+            return result, message
+
+        def metered(send):
+            def wrapper(session_id, commands):
+                self._local.stats = stats = UpdateStats()
+                try:
+                    return send(session_id, commands)
+                finally:
+                    self._local.stats = None
+                    if stats.bytes:
+                        self._record(stats)
+
+            return wrapper
+
+        conn._process_command = metered_process
+        conn.send_command = metered(send_command)
+        conn.send_commands = metered(send_commands)
+        return True
+
+    def _record(self, stats: UpdateStats):
+        stats.updates = 1
+        route = getattr(self.page, "route", None) or "/"
+        with self._lock:
+            self.session.merge(stats)
+            self.pages.setdefault(route, UpdateStats()).merge(stats)
+            top = self.largest.get(route)
+            if top is None or stats.bytes > top.bytes:
+                self.largest[route] = stats
+            action = self._action
+            if action is not None:
+                action.merge(stats)
+        UPDATE_BYTES.observe(stats.bytes, page=route)
+        UPDATE_CONTROLS.observe(stats.added, page=route)
+        if action is None and self.budget is not None:
+            self.budget.check(f"update on {route}", stats)
+
+    @contextlib.contextmanager
+    def action(self, name: str):
+        """Sum the updates sent inside the block; budget-check the total."""
+        stats = UpdateStats()
+        outer, self._action = self._action, stats
+        try:
+            yield stats
+        finally:
+            self._action = outer
+            if outer is not None:
+                outer.merge(stats)
+        if self.budget is not None:
+            self.budget.check(name, stats)
+
+    def close(self):
+        """Session ended: record its total; print the summary only if it
+        went over budget."""
+        with self._lock:
+            sent = self.session.bytes
+        SESSION_BYTES.observe(sent)
+        if self.budget is not None and self.budget.violations:
+            print("⚠️ payload over budget for session", getattr(self.page, "session_id", None), self.summary())
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "session": self.session.to_dict(),
+                "pages": {
+                    route: {**s.to_dict(), "max_update_bytes": self.largest[route].bytes,
+                            "max_update_controls": self.largest[route].controls}
+                    for route, s in self.pages.items()
+                },
+            }
+
+
+def enabled() -> bool:
+    return (os.getenv("PAYLOAD_STATS") or "").strip() == "1" or PayloadBudget.from_env() is not None
+
+
+ENABLED = enabled()
+
+
+def watch_payload(page) -> PayloadMeter | None:
+    """Install a meter on the session (no-op unless payload stats are on)."""
+    if not ENABLED:
+        return None
+    meter = PayloadMeter(page, PayloadBudget.from_env())
+    if not meter.install():
+        return None
+    page.session.set(SESSION_KEY, meter)
+    return meter
+
+
+def metered_action(name: str):
+    """Count a page method's updates as one action (no-op when off)."""
+
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            page = self.page
+            meter = page.session.get(SESSION_KEY) if page is not None else None
+            if meter is None:
+                return fn(self, *args, **kwargs)
+            with meter.action(name):
+                return fn(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,135 @@
+# app/pdf_preview.py
+# Upload-time preview of attached PDFs: page count + small first-page PNG,
+# produced on a small worker thread pool and stored next to the PDF object
+# so pages can show a preview without downloading the whole file. Threads,
+# not processes: forking a multithreaded server can deadlock the child, and
+# spawning would re-run main.py in every worker.
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.storage import is_duplicate
+
+THUMB_WIDTH = 160
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+
+_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+_pool = None
+_pool_lock = threading.Lock()
+# PDFium is not thread-safe: one document open at a time in the process
+_pdfium_lock = threading.Lock()
+
+
+def _count_pages_raw(local_path: str) -> int:
+    # Last resort: count page objects in the raw bytes (misses pages inside
+    # compressed object streams, hence only a fallback).
+    count = 0
+    tail = b""
+    with open(local_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            buf = tail + chunk
+            count += len(_PAGE_RE.findall(buf))
+            # keep a small overlap so a token split across chunks is seen,
+            # minus anything already matched in it
+            tail = buf[-32:]
+            count -= len(_PAGE_RE.findall(tail))
+    return count + len(_PAGE_RE.findall(tail))
+
+
+def _count_pages(local_path: str) -> int:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return _count_pages_raw(local_path)
+    try:
+        return len(PdfReader(local_path).pages)
+    except Exception:
+        return _count_pages_raw(local_path)
+
+
+def _render_thumbnail(local_path: str, thumb_path: str, width: int) -> bool:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return False
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(local_path)
+        try:
+            page = pdf[0]
+            scale = width / max(page.get_width(), 1)
+            image = page.render(scale=scale).to_pil()
+        except Exception:
+            return False
+        finally:
+            pdf.close()
+    try:
+        image.save(thumb_path, format="PNG", optimize=True)
+        return True
+    except Exception:
+        return False
+
+
+def extract_preview(local_path: str, thumb_path: str, width: int = THUMB_WIDTH) -> dict:
+    """Runs on a preview worker thread. Returns {"pages": int, "thumb": bool}."""
+    return {
+        "pages": _count_pages(local_path),
+        "thumb": _render_thumbnail(local_path, thumb_path, width),
+    }
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, PREVIEW_WORKERS), thread_name_prefix="pdf-preview")
+        return _pool
+
+
+def sidecar_keys(key: str) -> tuple[str, str]:
+    return f"{key}.thumb.png", f"{key}.meta.json"
+
+
+def _store_once(storage, key: str, path: str, content_type: str):
+    if storage.exists(key):
+        return
+    try:
+        storage.upload_file(key, path, content_type=content_type)
+    except Exception as e:
+        if not is_duplicate(e):
+            raise
+
+
+def attach_preview(storage, local_path: str, key: str) -> dict:
+    """Build the preview for an uploaded PDF and store it beside the object.
+
+    Returns the metadata saved on the task/subtask as `pdf_meta`.
+    """
+    thumb_key, meta_key = sidecar_keys(key)
+    with tempfile.TemporaryDirectory() as tmp:
+        thumb_path = os.path.join(tmp, "thumb.png")
+        try:
+            result = _get_pool().submit(extract_preview, local_path, thumb_path).result()
+        except Exception as e:
+            print("⚠️ PDF preview failed:", repr(e))
+            return {}
+
+        meta = {"pages": result["pages"]}
+        if result["thumb"]:
+            meta["thumb_url"] = storage.public_url(thumb_key)
+
+        # Content-addressed: sidecars of an existing object are already there
+        try:
+            if result["thumb"]:
+                _store_once(storage, thumb_key, thumb_path, "image/png")
+            meta_path = os.path.join(tmp, "meta.json")
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            _store_once(storage, meta_key, meta_path, "application/json")
+        except Exception as e:
+            print("⚠️ storing PDF preview failed:", repr(e))
+            meta.pop("thumb_url", None)
+    return meta
@@ -0,0 +1,120 @@
+# app/profiling.py
+# Opt-in sampling profiler for slow sessions. Route changes, page refreshes
+# and upload handlers are marked with @profiled; while a profiling window is
+# open a background thread samples the stacks of threads inside those calls
+# and, when the window closes, writes them to PROFILE_DIR as collapsed
+# stacks ("label;frame;frame count", one line each), which flamegraph.pl,
+# inferno and speedscope all read.
+#
+# A window is opened by PROFILE_SECONDS=N at startup, or at runtime with
+# GET /debug/profile?seconds=N&token=... on the metrics port when
+# PROFILE_TOKEN is set. With neither set the decorator hands back the
+# function unchanged.
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIR = os.getenv("PROFILE_DIR") or "profiles"
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS") or 0)
+PROFILE_TOKEN = (os.getenv("PROFILE_TOKEN") or "").strip()
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS") or 5) / 1000
+MAX_SECONDS = 600
+
+AVAILABLE = bool(PROFILE_SECONDS or PROFILE_TOKEN)
+
+_active = {}  # thread id -> (label, frame of the profiled call)
+_lock = threading.Lock()
+_window = None
+
+
+class _Window:
+    def __init__(self, seconds: float):
+        self.until = time.monotonic() + seconds
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(PROFILE_DIR, f"profile-{stamp}-{os.getpid()}.folded")
+        self.stacks = Counter()
+        self.samples = 0
+        threading.Thread(target=self._run, name="profiler", daemon=True).start()
+
+    def _run(self):
+        global _window
+        while time.monotonic() < self.until:
+            time.sleep(INTERVAL)
+            self._sample()
+        with _lock:
+            _window = None
+        self._write()
+
+    def _sample(self):
+        with _lock:
+            active = list(_active.items())
+        if not active:
+            return
+        frames = sys._current_frames()
+        for tid, (label, top) in active:
+            frame = frames.get(tid)
+            stack = []
+            while frame is not None and frame is not top:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frame is None:  # the call returned between the two reads
+                continue
+            stack.append(label)
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _write(self):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                for stack, n in self.stacks.most_common():
+                    f.write(f"{stack} {n}\n")
+        except OSError as e:
+            print("⚠️ writing profile failed:", repr(e))
+            return
+        print(f"Profile: {self.samples} samples in {self.path}")
+
+
+def start(seconds: float) -> str | None:
+    """Open a profiling window; returns the output path, None if one is open."""
+    global _window
+    seconds = max(1.0, min(float(seconds), MAX_SECONDS))
+    with _lock:
+        if _window is not None:
+            return None
+        _window = _Window(seconds)
+        return _window.path
+
+
+def start_from_env():
+    if PROFILE_SECONDS:
+        start(PROFILE_SECONDS)
+
+
+def profiled(label: str):
+    """Mark a function for the profiler (unchanged unless profiling is set up)."""
+
+    def decorator(fn):
+        if not AVAILABLE:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tid = threading.get_ident()
+            if _window is None or tid in _active:
+                return fn(*args, **kwargs)
+            with _lock:
+                _active[tid] = (label, sys._getframe())
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with _lock:
+                    _active.pop(tid, None)
+
+        return wrapper
+
+    return decorator
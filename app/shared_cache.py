@@ -0,0 +1,89 @@
+# app/shared_cache.py
+# Optional cache shared by every worker process on one machine, kept in a
+# SQLite file under SHARED_CACHE_DIR (point it at /dev/shm to keep it in
+# shared memory). Without it each process only has its own in-memory caches.
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID
+"""
+# SQLite caps bound parameters per statement
+_BATCH = 500
+# Drop expired rows every this many writes
+_PURGE_EVERY = 200
+
+
+class SharedCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._conn().execute(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a cache: losing it is fine
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, ns: str, keys) -> dict:
+        """{key: (value, expires_at)} for the keys that have not expired."""
+        keys = list(keys)
+        out = {}
+        now = time.time()
+        try:
+            for i in range(0, len(keys), _BATCH):
+                chunk = keys[i : i + _BATCH]
+                rows = self._conn().execute(
+                    f"SELECT key, value, expires_at FROM cache WHERE ns = ? AND expires_at > ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})",
+                    [ns, now, *chunk],
+                )
+                out.update((k, (v, exp)) for k, v, exp in rows)
+        except sqlite3.Error as e:
+            print("⚠️ shared cache read failed:", repr(e))
+        return out
+
+    def set_many(self, ns: str, items: dict, expires_at: float):
+        if not items:
+            return
+        try:
+            conn = self._conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (ns, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                [(ns, k, v, expires_at) for k, v in items.items()],
+            )
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print("⚠️ shared cache write failed:", repr(e))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache | None:
+    """The machine-wide cache, or None when SHARED_CACHE_DIR is not set."""
+    global _shared
+    folder = (os.getenv("SHARED_CACHE_DIR") or "").strip()
+    if not folder:
+        return None
+    with _shared_lock:
+        if _shared is None:
+            os.makedirs(folder, exist_ok=True)
+            _shared = SharedCache(os.path.join(folder, "task_manager_cache.sqlite3"))
+        return _shared
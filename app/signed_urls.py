@@ -0,0 +1,142 @@
+# app/signed_urls.py
+# Signed links for a private PDF bucket. URLs are cached per user and
+# storage path until shortly before they expire, and every path visible on
+# a page is signed in one batch request instead of one round-trip per
+# attachment. A URL is signed with its user's token after RLS checked it,
+# so it is never handed to another user, even for a shared object.
+import os
+import threading
+import time
+
+from app.shared_cache import get_shared_cache
+from app.storage import path_from_url
+
+SIGNED_URL_TTL = int(os.getenv("PDF_SIGNED_URL_TTL", "3600"))
+# Stop handing out a URL this long before it expires
+EXPIRY_MARGIN = 60
+MAX_ENTRIES = 5000
+
+
+def bucket_is_private() -> bool:
+    return (os.getenv("PDF_BUCKET_PRIVATE") or "").strip().lower() in ("1", "true", "yes")
+
+
+class SignedUrlCache:
+    def __init__(self, ttl: int = SIGNED_URL_TTL, margin: int = EXPIRY_MARGIN, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.margin = margin
+        self.max_entries = max_entries
+        self._entries = {}  # (user_id, bucket, path) -> (signed_url, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, bucket: str, path: str):
+        with self._lock:
+            entry = self._entries.get((user_id, bucket, path))
+            if entry and entry[1] - self.margin > time.time():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def resolve_many(self, storage, paths, user_id: str) -> dict:
+        """Signed URL for each path as seen by `user_id`; all misses are
+        signed in one request."""
+        out = {}
+        missing = []
+        ns = f"signed:{user_id}:{storage.bucket}"
+        for p in dict.fromkeys(paths):
+            url = self.get(user_id, storage.bucket, p)
+            if url:
+                out[p] = url
+            else:
+                missing.append(p)
+
+        # Other worker processes may have signed these already
+        shared = get_shared_cache()
+        if missing and shared is not None:
+            found = shared.get_many(ns, missing)
+            fresh = {p: e for p, e in found.items() if e[1] - self.margin > time.time()}
+            with self._lock:
+                for p, entry in fresh.items():
+                    self._entries[(user_id, storage.bucket, p)] = entry
+            out.update((p, url) for p, (url, _) in fresh.items())
+            missing = [p for p in missing if p not in fresh]
+
+        if missing:
+            signed = storage.sign_urls(missing, self.ttl)
+            expires_at = time.time() + self.ttl
+            with self._lock:
+                for p, url in signed.items():
+                    self._entries[(user_id, storage.bucket, p)] = (url, expires_at)
+                self._evict()
+            if shared is not None:
+                shared.set_many(ns, signed, expires_at)
+            out.update(signed)
+        return out
+
+    def _evict(self):
+        now = time.time()
+        expired = [k for k, (_, exp) in self._entries.items() if exp - self.margin <= now]
+        for k in expired:
+            del self._entries[k]
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            # Drop the entries that would expire first
+            for k, _ in sorted(self._entries.items(), key=lambda kv: kv[1][1])[:overflow]:
+                del self._entries[k]
+
+
+# One per process; entries are keyed by user
+_cache = SignedUrlCache()
+
+
+def get_signed_url_cache() -> SignedUrlCache:
+    return _cache
+
+
+class PdfLinks:
+    """Turns stored pdf_url values into URLs the browser can open."""
+
+    def __init__(
+        self, storage, user_id: str | None, private: bool | None = None, cache: SignedUrlCache | None = None
+    ):
+        self.storage = storage
+        self.user_id = user_id or "anon"
+        self.private = bucket_is_private() if private is None else private
+        self.cache = cache or _cache
+
+    def prefetch(self, urls):
+        if not self.private:
+            return
+        paths = [p for p in (path_from_url(u, self.storage.bucket) for u in urls if u) if p]
+        if paths:
+            try:
+                self.cache.resolve_many(self.storage, paths, self.user_id)
+            except Exception as e:
+                print("⚠️ signing PDF urls failed:", repr(e))
+
+    def cached(self, url: str) -> str | None:
+        """For rendering: the URL if it needs no signing or prefetch() has
+        signed it, else None. Never sends a request."""
+        if not self.private or not url:
+            return url
+        path = path_from_url(url, self.storage.bucket)
+        if not path:
+            return url
+        return self.cache.get(self.user_id, self.storage.bucket, path)
+
+    def resolve(self, url: str) -> str:
+        """For a click: signs the link now if needed. Falls back to the
+        stored URL when signing fails."""
+        if not self.private or not url:
+            return url
+        path = path_from_url(url, self.storage.bucket)
+        if not path:
+            return url
+        try:
+            return self.cache.resolve_many(self.storage, [path], self.user_id).get(path, url)
+        except Exception as e:
+            print("⚠️ signing PDF url failed:", repr(e))
+            return url
@@ -0,0 +1,307 @@
+# app/storage.py
+# PDF storage: streams files from disk in chunks (never the whole file in
+# memory) and reports progress. SupabaseStorage talks to the real bucket,
+# LocalStorage is a directory-backed stand-in with the same interface.
+import base64
+import hashlib
+import io
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+PDF_BUCKET = "ssr-reports"
+
+# Supabase resumable (TUS) uploads must use 6 MB chunks
+CHUNK_SIZE = 6 * 1024 * 1024
+RESUMABLE_THRESHOLD = CHUNK_SIZE
+MAX_CHUNK_RETRIES = 3
+
+# (bucket, key, size) -> TUS upload url, so a retried upload continues
+# from the last acknowledged offset instead of starting over.
+_resume_urls = {}
+
+
+class _ProgressReader(io.BufferedReader):
+    """File reader that reports bytes read; httpx streams it chunk by chunk."""
+
+    def __init__(self, path: str, on_progress=None):
+        super().__init__(io.FileIO(path, "rb"))
+        self.total = os.path.getsize(path)
+        self.sent = 0
+        self.on_progress = on_progress
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        pos = super().seek(offset, whence)
+        self.sent = pos
+        return pos
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        if chunk:
+            self.sent += len(chunk)
+            if self.on_progress:
+                self.on_progress(self.sent, self.total)
+        return chunk
+
+
+def hash_file(local_path: str) -> str:
+    """SHA-256 of a local file, read in CHUNK_SIZE pieces.
+
+    A pass of its own rather than part of _ProgressReader: the digest is the
+    object key and decides whether anything needs uploading, so it must be
+    known before the first byte is sent. Hashing during the transfer would
+    mean uploading every file (duplicates too) to a temporary key first.
+    """
+    h = hashlib.sha256()
+    with open(local_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def content_key(digest: str, ext: str = "pdf") -> str:
+    """Content-addressed object key: identical files share one object."""
+    return f"cas/{digest[:2]}/{digest}.{ext}"
+
+
+def path_from_url(url: str, bucket: str = PDF_BUCKET):
+    try:
+        parts = (url or "").split(f"{bucket}/")
+        if len(parts) > 1:
+            return parts[1].split("?")[0]
+    except Exception:
+        pass
+    return None
+
+
+class SupabaseStorage:
+    def __init__(self, client, bucket: str = PDF_BUCKET):
+        self.client = client
+        self.bucket = bucket
+
+    def _bucket(self):
+        return self.client.storage.from_(self.bucket)
+
+    def upload_file(self, key: str, local_path: str, content_type="application/pdf", on_progress=None):
+        size = os.path.getsize(local_path)
+        if size > RESUMABLE_THRESHOLD:
+            self._upload_resumable(key, local_path, size, content_type, on_progress)
+            return
+        with _ProgressReader(local_path, on_progress) as fp:
+            self._bucket().upload(key, fp, {"content-type": content_type})
+
+    def _upload_resumable(self, key, local_path, size, content_type, on_progress):
+        # storage3 has no TUS client; reuse its (shared) httpx transport
+        # and the session's auth headers
+        bucket = self._bucket()
+        http = bucket._client
+        endpoint = str(bucket._base_url.joinpath("upload", "resumable"))
+        base = {**bucket._headers, "Tus-Resumable": "1.0.0"}
+
+        resume_key = (self.bucket, key, size)
+        location = _resume_urls.get(resume_key)
+        offset = 0
+        if location:
+            try:
+                r = http.head(location, headers=base)
+                r.raise_for_status()
+                offset = int(r.headers.get("Upload-Offset", 0))
+            except Exception:
+                location = None
+
+        if not location:
+            meta = {
+                "bucketName": self.bucket,
+                "objectName": key,
+                "contentType": content_type,
+                "cacheControl": "3600",
+            }
+            r = http.post(
+                endpoint,
+                headers={
+                    **base,
+                    "Upload-Length": str(size),
+                    "Upload-Metadata": ",".join(
+                        f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in meta.items()
+                    ),
+                },
+            )
+            r.raise_for_status()
+            location = r.headers["Location"]
+            _resume_urls[resume_key] = location
+
+        with open(local_path, "rb") as fp:
+            retries = 0
+            while offset < size:
+                fp.seek(offset)
+                chunk = fp.read(CHUNK_SIZE)
+                try:
+                    r = http.patch(
+                        location,
+                        content=chunk,
+                        headers={
+                            **base,
+                            "Upload-Offset": str(offset),
+                            "Content-Type": "application/offset+octet-stream",
+                        },
+                    )
+                    r.raise_for_status()
+                    offset = int(r.headers.get("Upload-Offset", offset + len(chunk)))
+                    retries = 0
+                except Exception:
+                    retries += 1
+                    if retries > MAX_CHUNK_RETRIES:
+                        raise
+                    r = http.head(location, headers=base)
+                    offset = int(r.headers.get("Upload-Offset", offset))
+                    continue
+
+                if on_progress:
+                    on_progress(offset, size)
+
+        _resume_urls.pop(resume_key, None)
+
+    def exists(self, key: str) -> bool:
+        # Only "not found" means False: a transient failure must not look
+        # like a missing object. A HEAD has no error body, so a missing (or
+        # RLS-hidden) object comes back as a bare 400/404.
+        try:
+            return bool(self._bucket().exists(key))
+        except Exception as e:
+            if _error_status(e) in ("400", "404"):
+                return False
+            raise
+
+    def public_url(self, key: str) -> str:
+        return self._bucket().get_public_url(key)
+
+    def sign_urls(self, paths: list[str], expires_in: int) -> dict:
+        res = self._bucket().create_signed_urls(paths, expires_in)
+        return {r["path"]: r["signedURL"] for r in res if r.get("signedURL") and not r.get("error")}
+
+    def remove(self, paths: list[str]):
+        if paths:
+            self._bucket().remove(paths)
+
+    def list_objects(self, prefix: str = "", page_size: int = 1000):
+        """Yield (key, size, modified_iso) for every object under prefix."""
+        folders = [prefix]
+        while folders:
+            folder = folders.pop()
+            offset = 0
+            while True:
+                items = self._bucket().list(
+                    folder or None, {"limit": page_size, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+                )
+                for it in items:
+                    key = f"{folder}/{it['name']}" if folder else it["name"]
+                    if it.get("id") is None:  # folder placeholder
+                        folders.append(key)
+                    else:
+                        meta = it.get("metadata") or {}
+                        yield key, int(meta.get("size") or 0), it.get("updated_at") or it.get("created_at")
+                if len(items) < page_size:
+                    break
+                offset += page_size
+
+
+class LocalStorage:
+    def __init__(self, root: str, bucket: str = PDF_BUCKET, base_url: str | None = None):
+        self.root = os.path.abspath(root)
+        self.bucket = bucket
+        self.base_url = (base_url or f"file://{self.root}").rstrip("/")
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, self.bucket, key))
+        if not path.startswith(os.path.join(self.root, self.bucket) + os.sep):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    def upload_file(self, key: str, local_path: str, content_type="application/pdf", on_progress=None):
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + ".part"
+        with _ProgressReader(local_path, on_progress) as src, open(tmp, "wb") as out:
+            shutil.copyfileobj(src, out, CHUNK_SIZE)
+        os.replace(tmp, dest)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{self.bucket}/{key}"
+
+    def sign_urls(self, paths: list[str], expires_in: int) -> dict:
+        expires = int(time.time()) + expires_in
+        return {p: f"{self.public_url(p)}?expires={expires}" for p in paths if self.exists(p)}
+
+    def remove(self, paths: list[str]):
+        for p in paths:
+            try:
+                os.remove(self._path(p))
+            except FileNotFoundError:
+                pass
+
+    def list_objects(self, prefix: str = ""):
+        base = os.path.join(self.root, self.bucket)
+        for dirpath, _, files in os.walk(os.path.join(base, prefix)):
+            for name in files:
+                if name.endswith(".part"):
+                    continue
+                full = os.path.join(dirpath, name)
+                st = os.stat(full)
+                modified = datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat()
+                yield os.path.relpath(full, base).replace(os.sep, "/"), st.st_size, modified
+
+
+def _error_status(exc) -> str | None:
+    """HTTP status of a storage3 StorageApiError or an httpx HTTPStatusError."""
+    status = getattr(exc, "status", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = exc.response.status_code
+    return None if status is None else str(status)
+
+
+def is_duplicate(exc) -> bool:
+    """True if an upload failed because the key is already stored."""
+    return _error_status(exc) == "409" or "duplicate" in str(getattr(exc, "code", "") or exc).lower()
+
+
+def upload_pdf(storage, local_path: str, on_progress=None) -> str:
+    """Store a PDF under its content hash and return its URL.
+
+    If an identical file is already in the bucket the transfer is skipped
+    and the existing object's URL is reused. exists() cannot see objects
+    that RLS hides, so a duplicate-key answer to the upload counts as
+    already stored too.
+    """
+    key = content_key(hash_file(local_path))
+    stored = storage.exists(key)
+    if not stored:
+        try:
+            storage.upload_file(key, local_path, on_progress=on_progress)
+        except Exception as e:
+            if not is_duplicate(e):
+                raise
+            stored = True
+    if stored and on_progress:
+        size = os.path.getsize(local_path)
+        on_progress(size, size)
+    return storage.public_url(key)
+
+
+def get_pdf_storage(client=None):
+    """LocalStorage when PDF_STORAGE_DIR is set (or the backend is local),
+    the Supabase bucket otherwise."""
+    local_dir = (os.getenv("PDF_STORAGE_DIR") or "").strip()
+    if local_dir:
+        return LocalStorage(local_dir)
+    if client is None:
+        from app.auth import get_supabase
+
+        client = get_supabase()
+    # The in-process backend keeps its bucket in a local folder
+    if getattr(client, "storage_root", None):
+        return LocalStorage(client.storage_root)
+    return SupabaseStorage(client)
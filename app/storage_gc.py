@@ -0,0 +1,164 @@
+# app/storage_gc.py
+# Garbage collector for the PDF bucket and the local uploads/ dir.
+#
+# Bucket objects that no task or subtask references (plus their preview
+# sidecars) are deleted in batched remove() calls; leftover files from
+# failed web uploads are deleted from uploads/. Dry-run by default:
+#
+#   python -m app.storage_gc            # report only
+#   python -m app.storage_gc --delete   # needs SUPABASE_SERVICE_ROLE_KEY
+import argparse
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from app.models import Task
+from app.pdf_preview import sidecar_keys
+from app.storage import path_from_url
+
+UPLOAD_DIR = "uploads"
+REMOVE_BATCH = 100
+# Skip anything younger than this: it may belong to an upload in flight
+MIN_AGE = timedelta(hours=1)
+
+
+@dataclass(slots=True)
+class GcReport:
+    dry_run: bool
+    objects_scanned: int = 0
+    referenced: int = 0
+    orphans: list = field(default_factory=list)  # [(key, size)]
+    local_orphans: list = field(default_factory=list)  # [(path, size)]
+    skipped_recent: int = 0
+    reclaimed_bytes: int = 0
+
+    def summary(self) -> str:
+        verb = "would reclaim" if self.dry_run else "reclaimed"
+        return (
+            f"scanned {self.objects_scanned} objects, {self.referenced} referenced, "
+            f"{len(self.orphans)} orphaned + {len(self.local_orphans)} local upload files, "
+            f"{self.skipped_recent} too recent; {verb} {self.reclaimed_bytes} bytes"
+        )
+
+
+def fetch_task_pdf_refs(client, page_size: int = 1000) -> list[Task]:
+    """All tasks with just the columns that reference storage, paged."""
+    tasks = []
+    start = 0
+    while True:
+        res = (
+            client.table("tasks")
+            .select("id,pdf_url,subtasks")
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        rows = res.data or []
+        tasks.extend(Task.from_row(r) for r in rows)
+        if len(rows) < page_size:
+            return tasks
+        start += page_size
+
+
+def referenced_keys(tasks, bucket: str) -> set[str]:
+    keys = set()
+    for t in tasks:
+        urls = [t.pdf_url] + [s.get("pdf_url") for s in t.subtasks]
+        for url in urls:
+            key = path_from_url(url, bucket)
+            if key:
+                keys.add(key)
+                keys.update(sidecar_keys(key))
+    return keys
+
+
+def _is_recent(modified, now) -> bool:
+    if not modified:
+        return False
+    try:
+        ts = datetime.fromisoformat(str(modified).replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return now - ts < MIN_AGE
+
+
+def collect_garbage(storage, tasks, upload_dir: str = UPLOAD_DIR, dry_run: bool = True) -> GcReport:
+    now = datetime.now(timezone.utc)
+    report = GcReport(dry_run=dry_run)
+    live = referenced_keys(tasks, storage.bucket)
+
+    for key, size, modified in storage.list_objects():
+        report.objects_scanned += 1
+        if key in live:
+            report.referenced += 1
+        elif _is_recent(modified, now):
+            report.skipped_recent += 1
+        else:
+            report.orphans.append((key, size))
+
+    # Nothing ever references uploads/: files there are temp copies that a
+    # failed or interrupted web upload did not clean up.
+    if os.path.isdir(upload_dir):
+        for name in os.listdir(upload_dir):
+            path = os.path.join(upload_dir, name)
+            if not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            if _is_recent(datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat(), now):
+                report.skipped_recent += 1
+            else:
+                report.local_orphans.append((path, st.st_size))
+
+    report.reclaimed_bytes = sum(s for _, s in report.orphans) + sum(s for _, s in report.local_orphans)
+    if dry_run:
+        return report
+
+    keys = [k for k, _ in report.orphans]
+    for i in range(0, len(keys), REMOVE_BATCH):
+        storage.remove(keys[i : i + REMOVE_BATCH])
+    for path, _ in report.local_orphans:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete unreferenced PDFs from storage.")
+    parser.add_argument("--delete", action="store_true", help="actually delete (default: dry run)")
+    parser.add_argument("--upload-dir", default=UPLOAD_DIR)
+    parser.add_argument("--verbose", "-v", action="store_true", help="list every orphan")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from app.auth import _load_supabase_credentials
+    from app.storage import get_pdf_storage
+
+    load_dotenv()
+    url, anon_key = _load_supabase_credentials()
+    # Only the service role sees every task through RLS; with the anon key
+    # other users' references would be invisible and look orphaned.
+    service_key = (os.getenv("SUPABASE_SERVICE_ROLE_KEY") or "").strip()
+    if args.delete and not service_key:
+        parser.error("--delete requires SUPABASE_SERVICE_ROLE_KEY")
+    client = create_client(url, service_key or anon_key)
+
+    report = collect_garbage(
+        get_pdf_storage(client),
+        fetch_task_pdf_refs(client),
+        upload_dir=args.upload_dir,
+        dry_run=not args.delete,
+    )
+    if args.verbose:
+        for key, size in report.orphans:
+            print(f"  {key}  {size}")
+        for path, size in report.local_orphans:
+            print(f"  {path}  {size}")
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
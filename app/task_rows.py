@@ -0,0 +1,121 @@
+# app/task_rows.py
+# Pure-Python row model for the task table (no Flet imports), so the data
+# side can be built and benchmarked without a page.
+from app.models import Task
+
+
+class TaskRow:
+    __slots__ = (
+        "task_id",
+        "title",
+        "status",
+        "assignee_names",
+        "subtask_id",
+        "subtask",
+        "done",
+        "progress",
+        "progress_label",
+        "pdf_url",
+        "pdf_pages",
+        "pdf_thumb",
+        "search_key",
+    )
+
+    def __init__(
+        self,
+        task_id,
+        title,
+        status,
+        assignee_names,
+        subtask_id,
+        subtask,
+        done,
+        progress,
+        progress_label,
+        pdf_url,
+        pdf_meta=None,
+    ):
+        self.task_id = task_id
+        self.title = title
+        self.status = status
+        self.assignee_names = assignee_names
+        self.subtask_id = subtask_id
+        self.subtask = subtask
+        self.done = done
+        self.progress = progress
+        self.progress_label = progress_label
+        self.pdf_url = pdf_url
+        self.pdf_pages = (pdf_meta or {}).get("pages")
+        self.pdf_thumb = (pdf_meta or {}).get("thumb_url")
+        self.search_key = f"{title} {subtask}".lower()
+
+
+def build_task_rows(task: Task, users_map: dict) -> list[TaskRow]:
+    """One row per subtask (or a single placeholder row when there are none)."""
+    assignee_names = ", ".join([users_map.get(uid, uid[:6]) for uid in task.assignees]) or "—"
+
+    all_subs = task.subtasks
+    tot_subs = len(all_subs)
+    done_subs = sum(1 for s in all_subs if s.get("done"))
+    progress = (done_subs / tot_subs) if tot_subs else 0.0
+    progress_label = f"{done_subs}/{tot_subs}"
+
+    rows = []
+    for sub in all_subs or [{}]:
+        rows.append(
+            TaskRow(
+                task.id,
+                task.title,
+                (task.status or "open").lower(),
+                assignee_names,
+                sub.get("id"),
+                sub.get("title", "—"),
+                bool(sub.get("done")),
+                progress,
+                progress_label,
+                sub.get("pdf_url") or task.pdf_url,
+                sub.get("pdf_meta") if sub.get("pdf_url") else task.pdf_meta,
+            )
+        )
+    return rows
+
+
+class TaskRowModel:
+    """Caches built rows per task, keyed by the task's `updated_at`."""
+
+    def __init__(self, users_map: dict | None = None):
+        self.users_map = users_map or {}
+        self._cache = {}  # task_id -> (updated_at, rows)
+
+    def set_users(self, users_map: dict):
+        if users_map != self.users_map:
+            self.users_map = users_map
+            self._cache.clear()
+
+    def rows_for(self, tasks: list[Task]) -> list[TaskRow]:
+        cache = {}
+        rows = []
+        for task in tasks:
+            tid = task.id
+            stamp = task.updated_at
+            hit = self._cache.get(tid)
+            if hit is not None and stamp is not None and hit[0] == stamp:
+                task_rows = hit[1]
+            else:
+                task_rows = build_task_rows(task, self.users_map)
+            cache[tid] = (stamp, task_rows)
+            rows.extend(task_rows)
+
+        # Drop entries for tasks that are gone
+        self._cache = cache
+        return rows
+
+    @staticmethod
+    def filter(rows: list[TaskRow], status: str = "all", search: str = "") -> list[TaskRow]:
+        status = (status or "all").lower()
+        search = (search or "").lower()
+        return [
+            r
+            for r in rows
+            if (status == "all" or r.status == status) and (not search or search in r.search_key)
+        ]
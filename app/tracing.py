@@ -0,0 +1,255 @@
+# app/tracing.py
+# Timing spans for backend calls and page refreshes. Set TRACE_FILE (e.g.
+# traces.jsonl) to record them: spans are written in batches as OTLP/JSON,
+# one ExportTraceServiceRequest per line, which the OpenTelemetry
+# collector's otlpjsonfile receiver and most trace viewers can read.
+# Without TRACE_FILE the decorators hand back the function unchanged.
+import atexit
+import contextlib
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+
+try:
+    from flet import context as _flet_context
+except ImportError:  # scripts/benchmarks without Flet
+    _flet_context = None
+
+TRACE_FILE = (os.getenv("TRACE_FILE") or "").strip()
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME") or "task-manager"
+# Write out every this many spans, or this often
+FLUSH_EVERY = 256
+FLUSH_INTERVAL = 2.0
+
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+
+_current: ContextVar = ContextVar("trace_span", default=None)
+
+
+def enabled() -> bool:
+    return bool(TRACE_FILE)
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start", "end", "attrs", "error")
+
+    def __init__(self, name: str, kind: int, parent):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else ""
+        self.start = time.time_ns()
+        self.end = 0
+        self.attrs = {}
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_otlp(self) -> dict:
+        out = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_attr(k, v) for k, v in self.attrs.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+def _attr(key, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class _SpanFile:
+    """Buffers finished spans and appends them to the trace file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._spans = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        threading.Thread(target=self._loop, name="trace-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def add(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+            full = len(self._spans) >= FLUSH_EVERY
+        if full:
+            self.flush()
+
+    def _loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not spans:
+            return
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_attr("service.name", SERVICE_NAME), _attr("process.pid", os.getpid())]},
+                "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }, separators=(",", ":"))
+        try:
+            with self._write_lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print("⚠️ writing traces failed:", repr(e))
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def _export(span: Span):
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                folder = os.path.dirname(TRACE_FILE)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                _exporter = _SpanFile(TRACE_FILE)
+    _exporter.add(span)
+
+
+def flush():
+    if _exporter is not None:
+        _exporter.flush()
+
+
+# ---------------- SPAN DATA ----------------
+
+def _session_id():
+    page = _flet_context.page if _flet_context is not None else None
+    if page is not None:
+        return str(page.session_id)
+    from app.auth import _task_ctx  # imported late: app.auth imports this module
+
+    ctx = _task_ctx.get()
+    return getattr(ctx, "session_id", None)
+
+
+def _owner_session(obj):
+    # AuthContext carries its session id; pages carry their page
+    sid = getattr(obj, "session_id", None)
+    if sid is None:
+        sid = getattr(getattr(obj, "page", None), "session_id", None)
+    return str(sid) if sid is not None else None
+
+
+def _plain(obj):
+    to_dict = getattr(obj, "to_dict", None)
+    return to_dict() if callable(to_dict) else str(obj)
+
+
+def _size(obj) -> int | None:
+    try:
+        return len(json.dumps(obj, default=_plain, separators=(",", ":")).encode())
+    except (TypeError, ValueError):
+        return None
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict) or hasattr(result, "to_dict"):
+        return 1
+    data = getattr(result, "data", None)  # postgrest APIResponse
+    if isinstance(data, list):
+        return len(data)
+    return None
+
+
+# ---------------- API ----------------
+
+@contextlib.contextmanager
+def _span(name: str, kind: int, attrs: dict):
+    s = Span(name, kind, _current.get())
+    s.attrs.update(attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end = time.time_ns()
+        s.attrs["duration_ms"] = (s.end - s.start) / 1e6
+        if "session.id" not in s.attrs:
+            s.attrs["session.id"] = _session_id()
+        _export(s)
+
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attrs):
+    """`with span("name") as s:` (s is None when tracing is off)."""
+    if not TRACE_FILE:
+        return _NO_SPAN
+    return _span(name, kind, attrs)
+
+
+def traced(name: str, kind: int = KIND_CLIENT, rows=None, payload: bool = True):
+    """Run every call of the function in a span.
+
+    `rows(result, *args)` overrides the row count taken from the result;
+    `payload=False` skips measuring argument/result sizes (page methods).
+    """
+
+    def decorator(fn):
+        if not TRACE_FILE:
+            return fn
+        is_method = fn.__code__.co_varnames[:1] == ("self",)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name, kind, {"code.function": fn.__qualname__}) as s:
+                if is_method:
+                    sid = _owner_session(args[0])
+                    if sid is not None:
+                        s.attrs["session.id"] = sid
+                result = fn(*args, **kwargs)
+                s.attrs["rows"] = rows(result, *args) if rows else _row_count(result)
+                if payload:
+                    s.attrs["payload.request_bytes"] = _size([args[1:] if is_method else args, kwargs])
+                    s.attrs["payload.response_bytes"] = _size(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def record_error(error: BaseException):
+    """Mark the current span failed for errors that are handled, not raised."""
+    if TRACE_FILE:
+        s = _current.get()
+        if s is not None:
+            s.error = repr(error)
@@ -0,0 +1,168 @@
+# app/upload_queue.py
+# Bounded upload queue: N transfers in parallel, each job carries its own
+# target (task_id, subtask_id), failed transfers are retried with backoff.
+# One queue per Flet session (get_upload_queue), shared by its pages.
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+SESSION_KEY = "task_manager.upload_queue"
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = (os.getenv(name) or "").strip()
+    try:
+        return int(raw) if raw else default
+    except ValueError:
+        print(f"⚠️ {name}={raw!r} is not a number, using {default}")
+        return default
+
+
+DEFAULT_PARALLELISM = _env_int("UPLOAD_PARALLELISM", 3)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0  # seconds, doubled per attempt
+
+
+@dataclass(slots=True, eq=False)
+class UploadJob:
+    local_path: str
+    task_id: str
+    subtask_id: str | None = None
+    name: str = ""
+    new_subtask: bool = False  # extra files of a batch become new subtasks
+    remove_after: bool = False  # web uploads are temp copies under uploads/
+    status: str = "queued"  # queued | uploading | retrying | done | failed
+    progress: float = 0.0
+    attempts: int = 0
+    url: str | None = None
+    error: str | None = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+class UploadQueue:
+    def __init__(
+        self,
+        upload_fn,
+        max_workers: int = DEFAULT_PARALLELISM,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        on_change=None,
+    ):
+        """`upload_fn(job, on_progress)` does one transfer and returns the URL."""
+        self.upload_fn = upload_fn
+        self.retries = retries
+        self.backoff = backoff
+        self.on_change = on_change
+        self.jobs: list[UploadJob] = []
+        self.waiting: dict[str, UploadJob] = {}  # job id -> job whose file is still on its way
+        self._active = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="upload")
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def submit(self, job: UploadJob):
+        with self._lock:
+            if job not in self.jobs:
+                self.jobs.append(job)
+            self._active += 1
+        job.status = "queued"
+        self._notify(job)
+        # Carry the submitting context (Flet session, auth) into the worker
+        return self._executor.submit(contextvars.copy_context().run, self._run, job)
+
+    def expect(self, job: UploadJob):
+        """Track a job whose file the browser is still uploading to the server."""
+        with self._lock:
+            if job not in self.jobs:
+                self.jobs.append(job)
+            self.waiting[job.id] = job
+
+    def expected(self, name: str) -> UploadJob | None:
+        """The oldest waiting job for a file of this name (the browser sends them in order)."""
+        with self._lock:
+            return next((j for j in self.waiting.values() if j.name == name), None)
+
+    def arrived(self, job: UploadJob):
+        with self._lock:
+            self.waiting.pop(job.id, None)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._active or self.waiting)
+
+    def clear_finished(self):
+        with self._lock:
+            self.jobs = [j for j in self.jobs if j.status not in ("done", "failed")]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _notify(self, job: UploadJob):
+        on_change = self.on_change
+        if on_change:
+            try:
+                on_change(job)
+            except Exception as e:
+                print("⚠️ upload queue on_change failed:", repr(e))
+
+    def _run(self, job: UploadJob):
+        def on_progress(sent, total):
+            job.progress = (sent / total) if total else 1.0
+            self._notify(job)
+
+        try:
+            while True:
+                job.attempts += 1
+                job.status = "uploading"
+                self._notify(job)
+                try:
+                    job.url = self.upload_fn(job, on_progress)
+                    job.status = "done"
+                    job.progress = 1.0
+                    job.error = None
+                    break
+                except Exception as e:
+                    job.error = repr(e)
+                    if job.attempts > self.retries:
+                        job.status = "failed"
+                        break
+                    job.status = "retrying"
+                    self._notify(job)
+                    time.sleep(self.backoff * (2 ** (job.attempts - 1)))
+        finally:
+            if job.remove_after and os.path.exists(job.local_path):
+                try:
+                    os.remove(job.local_path)
+                except Exception:
+                    pass
+            with self._lock:
+                self._active -= 1
+            self._notify(job)
+        return job
+
+
+def get_upload_queue(page, upload_fn, on_change=None) -> UploadQueue:
+    """The queue shared by all pages of one Flet session, its callbacks
+    pointed at the caller: jobs started on a page that has since been
+    replaced finish (and report) on the one now shown."""
+    if page.session.contains_key(SESSION_KEY):
+        queue = page.session.get(SESSION_KEY)
+        queue.upload_fn = upload_fn
+        queue.on_change = on_change
+        return queue
+    queue = UploadQueue(upload_fn, on_change=on_change)
+    page.session.set(SESSION_KEY, queue)
+    return queue
+
+
+def close_upload_queue(page):
+    """Stop the session's upload workers once queued jobs are done."""
+    if page.session.contains_key(SESSION_KEY):
+        page.session.get(SESSION_KEY).shutdown(wait=False)
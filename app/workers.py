@@ -0,0 +1,219 @@
+# app/workers.py
+# Multi-worker web mode: N Flet worker processes (one GIL each) behind a
+# small sticky front on the public port. Flet keeps a session's page in the
+# memory of the worker that created it, so a visitor must always land on the
+# same worker; the front hashes the client address to pick it and then just
+# pipes bytes, which carries websockets and uploads unchanged.
+#
+#   WEB_WORKERS=4 python main.py      # or WEB_WORKERS=auto (one per core)
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+import zlib
+
+# Set in the environment of every worker process
+WORKER_ID_ENV = "WEB_WORKER_ID"
+# Header carrying the real client address behind Render's proxy
+STICKY_HEADER = (os.getenv("WEB_STICKY_HEADER") or "x-forwarded-for").strip().lower()
+MAX_HEAD = 64 * 1024
+READY_TIMEOUT = 60
+RESTART_DELAY = 1.0
+
+
+def worker_count() -> int:
+    raw = (os.getenv("WEB_WORKERS") or "1").strip().lower()
+    if raw == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return 1
+
+
+def is_worker() -> bool:
+    return bool(os.getenv(WORKER_ID_ENV))
+
+
+def sticky_key(head: bytes, peer: str) -> str:
+    """Client identity from the request head: first hop of the sticky
+    header if present, otherwise the peer address."""
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower().decode("latin-1") == STICKY_HEADER:
+            first = value.decode("latin-1").split(",")[0].strip()
+            if first:
+                return first
+    return peer
+
+
+def pick_worker(key: str, n: int) -> int:
+    return zlib.crc32(key.encode()) % n
+
+
+# ---------------- FRONT ----------------
+
+class StickyFront:
+    def __init__(self, host: str, port: int, worker_ports: list[int]):
+        self.host = host
+        self.port = port
+        self.worker_ports = worker_ports
+        self.connections = 0
+
+    async def wait_ready(self, timeout: float = READY_TIMEOUT):
+        # Open the public port only once every worker accepts connections
+        deadline = time.monotonic() + timeout
+        pending = set(self.worker_ports)
+        while pending and time.monotonic() < deadline:
+            for p in list(pending):
+                try:
+                    _, w = await asyncio.open_connection("127.0.0.1", p)
+                    w.close()
+                    pending.discard(p)
+                except OSError:
+                    pass
+            if pending:
+                await asyncio.sleep(0.25)
+        if pending:
+            print("⚠️ workers not ready on ports:", sorted(pending))
+
+    async def serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEAD)
+        print(f"Front listening on {self.host}:{self.port} -> {len(self.worker_ports)} workers")
+        async with server:
+            await server.serve_forever()
+
+    async def _open_upstream(self, first: int):
+        # A worker that is down (restarting) is skipped; its sessions are
+        # gone anyway, and everyone else keeps their assignment.
+        n = len(self.worker_ports)
+        for i in range(n):
+            port = self.worker_ports[(first + i) % n]
+            try:
+                return await asyncio.open_connection("127.0.0.1", port)
+            except OSError:
+                continue
+        return None
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        upstream = None
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            peer = (writer.get_extra_info("peername") or ("",))[0]
+            upstream = await self._open_upstream(pick_worker(sticky_key(head, peer), len(self.worker_ports)))
+            if upstream is None:
+                writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+            up_reader, up_writer = upstream
+            up_writer.write(head)
+            await asyncio.gather(_pipe(reader, up_writer), _pipe(up_reader, writer))
+        except Exception as e:
+            print("⚠️ front connection failed:", repr(e))
+        finally:
+            self.connections -= 1
+            if upstream is not None:
+                upstream[1].close()
+            writer.close()
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(64 * 1024)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        try:
+            writer.write_eof()
+        except (OSError, RuntimeError):
+            pass
+
+
+# ---------------- SUPERVISOR ----------------
+
+class Supervisor:
+    """Starts the worker processes and restarts any that exit."""
+
+    def __init__(self, script: str, ports: list[int]):
+        self.script = script
+        self.ports = ports
+        self.procs: dict[int, subprocess.Popen] = {}
+        self._stopping = False
+
+    def _spawn(self, i: int):
+        env = {
+            **os.environ,
+            WORKER_ID_ENV: str(i + 1),
+            "FLET_FORCE_WEB_SERVER": "true",
+            "FLET_SERVER_IP": "127.0.0.1",
+            "FLET_SERVER_PORT": str(self.ports[i]),
+        }
+        self.procs[i] = subprocess.Popen([sys.executable, self.script], env=env)
+
+    def start(self):
+        for i in range(len(self.ports)):
+            self._spawn(i)
+
+    async def watch(self):
+        while not self._stopping:
+            for i, proc in list(self.procs.items()):
+                if proc.poll() is not None and not self._stopping:
+                    print(f"⚠️ worker {i + 1} exited with {proc.returncode}, restarting")
+                    await asyncio.sleep(RESTART_DELAY)
+                    self._spawn(i)
+            await asyncio.sleep(0.5)
+
+    def stop(self):
+        self._stopping = True
+        for proc in self.procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in self.procs.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def serve(script: str, workers: int | None = None):
+    """Run `script` in N worker processes behind the sticky front."""
+    workers = workers or worker_count()
+    host = os.getenv("FLET_SERVER_IP") or "0.0.0.0"
+    port = int(os.getenv("FLET_SERVER_PORT") or "8000")
+    base = int(os.getenv("WEB_WORKER_BASE_PORT") or str(port + 1))
+    ports = [base + i for i in range(workers)]
+
+    sup = Supervisor(script, ports)
+    front = StickyFront(host, port, ports)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows
+                pass
+        sup.start()
+        watcher = asyncio.create_task(sup.watch())
+        await front.wait_ready()
+        server = asyncio.create_task(front.serve())
+        await stop.wait()
+        server.cancel()
+        watcher.cancel()
+
+    try:
+        asyncio.run(run())
+    finally:
+        sup.stop()
@@ -0,0 +1,156 @@
+# app/write_buffer.py
+# Coalesces rapid edits of one task (subtask checkboxes, status changes)
+# into a single update: patches for a task are merged and written once the
+# task has been quiet for WRITE_DELAY seconds, or right away on flush().
+# A failed write is queued again (newer edits win) and retried with
+# backoff; after MAX_ATTEMPTS it is given up and reported to on_failure.
+import contextvars
+import copy
+import os
+import threading
+import time
+
+from app.db_client import update_task
+
+WRITE_DELAY = float(os.getenv("WRITE_COALESCE_DELAY", "0.6"))
+# A task that keeps changing is still written at least this often
+MAX_DELAY = 3.0
+MAX_ATTEMPTS = 3
+
+SESSION_KEY = "task_manager.write_buffer"
+
+
+class TaskWriteBuffer:
+    def __init__(
+        self,
+        write_fn=None,
+        delay: float = WRITE_DELAY,
+        max_delay: float = MAX_DELAY,
+        max_attempts: int = MAX_ATTEMPTS,
+        on_failure=None,
+    ):
+        """`write_fn(task_id, patch)` returns False (or raises) when the write
+        did not happen; `on_failure(task_id, patch, error)` hears about
+        patches given up after `max_attempts`."""
+        self.write_fn = write_fn or update_task
+        self.delay = delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.on_failure = on_failure
+        self._pending = {}  # task_id -> merged patch
+        self._first = {}  # task_id -> time of the oldest unwritten change
+        self._ctx = {}  # task_id -> caller's context (auth/session) for the write
+        self._timers = {}
+        self._attempts = {}  # task_id -> failed writes of its pending patch
+        self._lock = threading.Lock()
+        # Held across pop + write so writes of one task never reorder
+        self._write_lock = threading.Lock()
+        self.writes = 0
+        self.coalesced = 0
+        self.failed = 0  # patches given up
+
+    def patch(self, task_id: str, fields: dict):
+        """Queue `fields` for the task; later values of a field win."""
+        fields = copy.deepcopy(fields)  # callers keep mutating their lists
+        with self._lock:
+            pending = self._pending.setdefault(task_id, {})
+            if pending:
+                self.coalesced += 1
+            pending.update(fields)
+            now = time.monotonic()
+            first = self._first.setdefault(task_id, now)
+            self._ctx[task_id] = contextvars.copy_context()
+            self._schedule(task_id, max(0.0, min(self.delay, first + self.max_delay - now)))
+
+    def _schedule(self, task_id: str, wait: float):
+        # Caller holds self._lock
+        timer = self._timers.pop(task_id, None)
+        if timer:
+            timer.cancel()
+        timer = threading.Timer(wait, self.flush, args=(task_id,))
+        timer.daemon = True
+        self._timers[task_id] = timer
+        timer.start()
+
+    def pending(self, task_id: str | None = None) -> dict:
+        with self._lock:
+            if task_id is not None:
+                return dict(self._pending.get(task_id, {}))
+            return {k: dict(v) for k, v in self._pending.items()}
+
+    def discard(self, task_id: str):
+        """Drop unwritten changes (e.g. the task is being deleted)."""
+        with self._lock:
+            self._pending.pop(task_id, None)
+            self._first.pop(task_id, None)
+            self._ctx.pop(task_id, None)
+            self._attempts.pop(task_id, None)
+            timer = self._timers.pop(task_id, None)
+            if timer:
+                timer.cancel()
+
+    def flush(self, task_id: str | None = None) -> int:
+        """Write pending changes now (one task, or all). Returns writes made."""
+        with self._write_lock:
+            with self._lock:
+                ids = [task_id] if task_id is not None else list(self._pending)
+                batch = []
+                for tid in ids:
+                    patch = self._pending.pop(tid, None)
+                    if patch is None:
+                        continue
+                    self._first.pop(tid, None)
+                    timer = self._timers.pop(tid, None)
+                    if timer:
+                        timer.cancel()
+                    batch.append((tid, patch, self._ctx.pop(tid, None)))
+
+            written = 0
+            for tid, patch, ctx in batch:
+                try:
+                    ok = ctx.run(self.write_fn, tid, patch) if ctx is not None else self.write_fn(tid, patch)
+                    error = None if ok is not False else "write was not applied"
+                except Exception as e:
+                    error = repr(e)
+                if error is None:
+                    written += 1
+                    self.writes += 1
+                    with self._lock:
+                        self._attempts.pop(tid, None)
+                else:
+                    print("⚠️ buffered write failed:", tid, error)
+                    self._retry(tid, patch, ctx, error)
+            return written
+
+    def _retry(self, task_id: str, patch: dict, ctx, error: str):
+        with self._lock:
+            attempts = self._attempts.get(task_id, 0) + 1
+            if attempts < self.max_attempts:
+                self._attempts[task_id] = attempts
+                # Edits made since the failed write are newer and win
+                self._pending[task_id] = {**patch, **self._pending.get(task_id, {})}
+                self._first.setdefault(task_id, time.monotonic())
+                self._ctx.setdefault(task_id, ctx)
+                self._schedule(task_id, self.delay * 2 ** attempts)
+                return
+            self._attempts.pop(task_id, None)
+            self.failed += 1
+            on_failure = self.on_failure
+        if on_failure:
+            try:
+                on_failure(task_id, patch, error)
+            except Exception as e:
+                print("⚠️ write buffer on_failure failed:", repr(e))
+
+
+def get_write_buffer(page, on_failure=None) -> TaskWriteBuffer:
+    """The buffer shared by all pages of one Flet session; `on_failure`, if
+    given, replaces the handler of the page shown before."""
+    if page.session.contains_key(SESSION_KEY):
+        buf = page.session.get(SESSION_KEY)
+    else:
+        buf = TaskWriteBuffer()
+        page.session.set(SESSION_KEY, buf)
+    if on_failure is not None:
+        buf.on_failure = on_failure
+    return buf
@@ -0,0 +1,137 @@
+# bench/cold_start.py
+# Cold start: how long a fresh process takes to import the app and to show
+# the first login screen, as on a Render free-plan wake-up.
+#
+#   python bench/cold_start.py --runs 5 --target 3.0 --json cold.json
+#
+# Imports: each step timed in a new interpreter (median over --runs).
+# Server: main.py on the local backend, from spawn to HTTP up, to the login
+# screen on a websocket, and to the first dashboard after logging in.
+# Exit 1 if the median time to the login screen is over --target seconds.
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import websockets
+from load_sessions import ROOT, Session, _register_payload, run_server
+
+from app.local_backend import DEMO_EMAIL, DEMO_PASSWORD  # noqa: E402
+
+# What main.py imports before ft.app() starts, then what a signed-in user loads
+IMPORT_STEPS = [
+    "dotenv", "flet", "app.auth", "app.metrics", "pages.login", "pages.signup",
+    "pages.dashboard", "pages.task_table", "pages.clients",
+]
+
+_IMPORT_PROBE = """
+import importlib, json, sys, time
+out = {}
+for name in sys.argv[1:]:
+    t = time.perf_counter()
+    importlib.import_module(name)
+    out[name] = (time.perf_counter() - t) * 1000
+print(json.dumps(out))
+"""
+
+
+def time_imports(runs: int) -> dict:
+    samples = {name: [] for name in IMPORT_STEPS}
+    for _ in range(runs):
+        res = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE, *IMPORT_STEPS],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        for name, ms in json.loads(res.stdout.strip().splitlines()[-1]).items():
+            samples[name].append(ms)
+    return {name: statistics.median(v) for name, v in samples.items()}
+
+
+def _wait_port(port: int, proc, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"main.py exited with code {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+async def _first_screens(port: int, start: float, timeout: float) -> dict:
+    s = Session(f"http://127.0.0.1:{port}", DEMO_EMAIL, DEMO_PASSWORD, 0.2, timeout, lambda *a: None)
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws", max_size=None) as ws:
+        s.ws = ws
+        reader = asyncio.create_task(s._reader())
+        try:
+            await s.send(json.dumps(_register_payload()))
+            login = await s.settle(lambda: bool(s.tree.find("textfield", label="Email")))
+            await s.type_into(s._one("textfield", label="Email"), s.email)
+            await s.type_into(s._one("textfield", label="Password"), s.password)
+            clicked = time.perf_counter()
+            await s.click(s._one("elevatedbutton", text="🔐 Login"))
+            dashboard = await s.settle(lambda: s.tree.route() == "/dashboard")
+        finally:
+            reader.cancel()
+    return {"login_screen_s": login - start, "first_dashboard_s": dashboard - clicked}
+
+
+def time_server(port: int, tasks: int, timeout: float) -> dict:
+    start = time.perf_counter()
+    proc = run_server(port, tasks, 1)
+    try:
+        _wait_port(port, proc, timeout)
+        http_up = time.perf_counter() - start
+        screens = asyncio.run(_first_screens(port, start, timeout))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {"http_up_s": http_up, **screens}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=200, help="seeded tasks for the first dashboard")
+    parser.add_argument("--target", type=float, default=3.0, help="seconds from spawn to the login screen")
+    parser.add_argument("--port", type=int, default=8650)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+    runs = max(1, args.runs)
+
+    imports = time_imports(runs)
+    for name, ms in imports.items():
+        print(f"import {name:<18} {ms:8.1f} ms")
+
+    server = []
+    for i in range(runs):
+        server.append(time_server(args.port + i * 2, args.tasks, args.timeout))
+        r = server[-1]
+        print(f"run {i + 1}: http up {r['http_up_s']:.2f} s  login screen {r['login_screen_s']:.2f} s  "
+              f"first dashboard {r['first_dashboard_s']:.2f} s after login")
+    medians = {k: statistics.median(r[k] for r in server) for k in server[0]}
+    ok = medians["login_screen_s"] <= args.target
+    print(f"median login screen {medians['login_screen_s']:.2f} s (target {args.target:.2f} s): "
+          f"{'ok' if ok else 'OVER TARGET'}")
+
+    if args.json:
+        path = args.json if os.path.isabs(args.json) else os.path.join(ROOT, args.json)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "imports_ms": imports, "runs": server,
+                       "median": medians, "target_s": args.target}, f, indent=2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# bench/dialog_overlay.py
+# Memory check for dialogs and the overlay (app/dialogs.py): opens and
+# closes every dashboard, table and clients dialog --opens times in turn on
+# a headless session, and rebuilds the dashboard --remounts times the way a
+# route change does. The overlay and the page's control index must stay
+# flat once every dialog kind has been opened; exit 1 if they grow.
+#
+#   python bench/dialog_overlay.py --opens 1000 --remounts 50
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import flet as ft
+from page_render import _loop_thread, make_page, settle
+
+from app import local_backend  # noqa: E402  (page_render put the repo on sys.path)
+
+
+def snapshot(page) -> dict:
+    return {
+        "overlay": len(page.overlay),
+        "index": len(page._index),
+        "traced_kb": tracemalloc.get_traced_memory()[0] / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--opens", type=int, default=1000, help="dialogs to open and close")
+    parser.add_argument("--remounts", type=int, default=50, help="dashboards to rebuild")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--every", type=int, default=100, help="print a checkpoint every N opens")
+    args = parser.parse_args(argv)
+
+    from pages.clients import ClientsPage
+    from pages.dashboard import DashboardPage
+    from pages.task_table import TaskTablePage
+
+    os.chdir(tempfile.mkdtemp(prefix="task_manager_bench_"))
+    local_backend._store = store = local_backend.LocalStore()
+    local_backend.seed(store, tasks=args.tasks, clients=5)
+    loop = _loop_thread()
+    page = make_page(loop)
+
+    dash = DashboardPage(page, on_logout=lambda: None)
+    table = TaskTablePage(page, on_back=lambda: None)
+    clients = ClientsPage(page, on_back=lambda: None)
+    page.add(dash, table, clients)
+    settle(loop)
+    tasks = list(dash._tasks_by_id.values())
+    client_id = next(iter(store.tables["clients"]))
+
+    def select():
+        dash._selected = {t.id for t in tasks[:3]}
+        table._selected = {t.id for t in tasks[:3]}
+
+    openers = [
+        lambda t: dash._edit_task_dialog(t),
+        lambda t: dash._delete_confirm(t),
+        lambda t: dash._add_subtask_dialog(t),
+        lambda t: dash._assign_dialog(t),
+        lambda t: dash._comments_dialog(t),
+        lambda t: (select(), dash._bulk_assign_dialog()),
+        lambda t: (select(), dash._bulk_delete_confirm()),
+        lambda t: (select(), table._bulk_delete_confirm()),
+        lambda t: clients._delete_client(client_id),
+    ]
+
+    tracemalloc.start()
+    warm = None
+    checkpoints = []
+    for i in range(args.opens):
+        openers[i % len(openers)](tasks[i % len(tasks)])
+        for c in list(page.overlay):
+            if isinstance(c, ft.AlertDialog) and c.open:
+                dash.dialogs.close(c)  # the "No"/"Cancel" button
+        if i + 1 == len(openers):
+            warm = snapshot(page)
+        if (i + 1) % args.every == 0 or i + 1 == args.opens:
+            checkpoints.append((i + 1, snapshot(page)))
+            s = checkpoints[-1][1]
+            print(f"opens={i + 1:<6} overlay={s['overlay']:<4} index={s['index']:<6} traced={s['traced_kb']:9.0f} KiB")
+
+    for _ in range(args.remounts):
+        page.controls.remove(dash)
+        dash = DashboardPage(page, on_logout=lambda: None)
+        page.controls.insert(0, dash)
+        page.update()
+    settle(loop)
+    after = snapshot(page)
+    tracemalloc.stop()
+    print(f"remounts={args.remounts:<4} overlay={after['overlay']:<4} index={after['index']:<6} "
+          f"traced={after['traced_kb']:9.0f} KiB")
+    print(f"dialogs opened={dash.dialogs.opened} pooled kinds={len(dash.dialogs._pool)}")
+
+    final = checkpoints[-1][1]
+    grew = []
+    if warm and final["overlay"] > warm["overlay"]:
+        grew.append(f"overlay grew {warm['overlay']} -> {final['overlay']} over {args.opens} opens")
+    if warm and after["overlay"] > final["overlay"]:
+        grew.append(f"overlay grew {final['overlay']} -> {after['overlay']} over {args.remounts} remounts")
+    if warm and final["index"] > warm["index"] * 1.5:
+        grew.append(f"control index grew {warm['index']} -> {final['index']}")
+    for line in grew:
+        print("FAIL:", line)
+    sys.exit(1 if grew else 0)
+
+
+if __name__ == "__main__":
+    main()
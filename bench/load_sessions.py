@@ -0,0 +1,513 @@
+# bench/load_sessions.py
+# Load generator for many concurrent browser sessions against one server.
+# Starts `main.py` on the local backend (TASK_BACKEND=local, seeded) and
+# drives N simulated Flet web clients over the websocket, each one going
+# through a realistic visit:
+#
+#   login -> dashboard -> subtask toggles -> task table -> search typing
+#   -> back to dashboard -> PDF attach (real HTTP upload) -> close
+#
+# The client keeps a copy of the control tree from the server's updates so
+# it can find fields and buttons the way a user would (by label/tooltip).
+# Reports p50/p95/p99 latency and websocket bytes per action, plus server
+# CPU and RSS (sampled from /proc, so Linux only).
+#
+#   python bench/load_sessions.py --clients 20 --duration 60 --json load.json
+#
+# An action is finished when its expected screen arrived and the server
+# then stayed quiet for --quiet seconds; latency is taken at the last
+# message, so the quiet window itself is not counted. Subtask toggles get
+# no reply (they are buffered server side); their write lands with the
+# next route change, which is part of "open_table".
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.local_backend import DEMO_EMAIL, DEMO_PASSWORD  # noqa: E402
+
+# seed() creates demo@example.com plus user1..user19@example.com
+SEED_USERS = [(DEMO_EMAIL, DEMO_PASSWORD)] + [(f"user{i}@example.com", "password") for i in range(1, 20)]
+SEARCH_TEXT = "site 1"
+
+
+def _register_payload(route: str = "/") -> dict:
+    return {
+        "action": "registerWebClient",
+        "payload": {
+            "pageName": "", "pageRoute": route, "pageWidth": "1280", "pageHeight": "800",
+            "windowWidth": "1280", "windowHeight": "800", "windowTop": "", "windowLeft": "",
+            "isPWA": "false", "isWeb": "true", "isDebug": "false", "platform": "linux",
+            "platformBrightness": "light", "media": "{}", "sessionId": "",
+        },
+    }
+
+
+def _event(target: str, name: str, data: str = "") -> str:
+    return json.dumps({
+        "action": "pageEventFromWeb",
+        "payload": {"eventTarget": target, "eventName": name, "eventData": data},
+    })
+
+
+def _props(control_id: str, **props) -> str:
+    return json.dumps({"action": "updateControlProps", "payload": {"props": [{"i": control_id, **props}]}})
+
+
+def _text(v) -> str:
+    # Some props (tooltip, ...) arrive JSON encoded
+    if isinstance(v, str) and v.startswith('"'):
+        try:
+            return json.loads(v)
+        except ValueError:
+            pass
+    return v if isinstance(v, str) else ""
+
+
+def _pdf_bytes(tag: str) -> bytes:
+    # Unique content per upload: storage is content addressed
+    from pypdf import PdfWriter
+
+    w = PdfWriter()
+    w.add_blank_page(width=200, height=200)
+    w.add_metadata({"/Title": tag})
+    buf = io.BytesIO()
+    w.write(buf)
+    return buf.getvalue()
+
+
+class ControlTree:
+    """The client's view of the page, kept in sync from server messages."""
+
+    def __init__(self):
+        self.controls = {"page": {"t": "page", "i": "page", "p": "", "c": []}}
+
+    def apply(self, msg: dict):
+        action, payload = msg.get("action"), msg.get("payload")
+        if action == "pageControlsBatch":
+            for m in payload:
+                self.apply(m)
+        elif action == "registerWebClient":
+            for c in (payload.get("session") or {}).get("controls", {}).values():
+                self.controls[c["i"]] = dict(c)
+        elif action == "addPageControls":
+            batch = {c["i"] for c in payload["controls"]}
+            for c in payload["controls"]:
+                self.controls[c["i"]] = dict(c)
+                parent = self.controls.get(c.get("p"))
+                if parent is not None and c.get("p") not in batch and c["i"] not in parent["c"]:
+                    at = int(c.get("at", -1))
+                    parent["c"].insert(at, c["i"]) if at >= 0 else parent["c"].append(c["i"])
+        elif action == "updateControlProps":
+            for p in payload["props"]:
+                if p["i"] in self.controls:
+                    self.controls[p["i"]].update(p)
+        elif action == "removeControl":
+            for cid in payload["ids"]:
+                c = self.controls.get(cid)
+                if c is not None and c.get("p") in self.controls:
+                    siblings = self.controls[c["p"]]["c"]
+                    if cid in siblings:
+                        siblings.remove(cid)
+                self._drop(cid)
+        elif action == "cleanControl":
+            for cid in payload["ids"]:
+                c = self.controls.get(cid)
+                if c is not None:
+                    for child in c["c"]:
+                        self._drop(child)
+                    c["c"] = []
+
+    def _drop(self, cid):
+        stack = [cid]
+        while stack:
+            c = self.controls.pop(stack.pop(), None)
+            if c is not None:
+                stack.extend(c.get("c", []))
+
+    def find(self, t: str, **attrs) -> list:
+        return [
+            c for c in self.controls.values()
+            if c["t"] == t and all(_text(c.get(k)) == v for k, v in attrs.items())
+        ]
+
+    def route(self) -> str | None:
+        views = [c for c in self.controls.values() if c["t"] == "view"]
+        return _text(views[-1].get("route")) if views else None
+
+
+class Session:
+    """One simulated browser tab."""
+
+    def __init__(self, base_url: str, email: str, password: str, quiet: float, timeout: float, record):
+        self.base = base_url
+        self.email, self.password = email, password
+        self.quiet, self.timeout = quiet, timeout
+        self.record = record
+        self.tree = ControlTree()
+        self.ws = None
+        self.inbox = asyncio.Queue()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.current = "connect"  # action in progress, for error reports
+
+    async def send(self, data: str):
+        self.bytes_out += len(data.encode())
+        await self.ws.send(data)
+
+    async def _reader(self):
+        async for raw in self.ws:
+            self.bytes_in += len(raw.encode() if isinstance(raw, str) else raw)
+            msg = json.loads(raw)
+            self.tree.apply(msg)
+            if msg.get("action") == "invokeMethod":
+                # clientStorage get/set, launchUrl...: answer like a fresh browser
+                p = msg["payload"]
+                result = None if p["methodName"].endswith(":get") else "true"
+                await self.send(_event(
+                    "page", "invoke_method_result",
+                    json.dumps({"method_id": p["methodId"], "result": result, "error": None}),
+                ))
+            await self.inbox.put(msg)
+
+    async def settle(self, done=lambda: True) -> float:
+        """Wait for `done()` and then a quiet gap; returns time of last message.
+
+        `done` is checked after every message, so a state that shows up and
+        is replaced again within one burst still counts.
+        """
+        deadline = time.perf_counter() + self.timeout
+        last, ready = None, False
+        while True:
+            wait = self.quiet if ready else deadline - time.perf_counter()
+            if wait <= 0:
+                raise TimeoutError("no reply from server")
+            try:
+                await asyncio.wait_for(self.inbox.get(), wait)
+            except asyncio.TimeoutError:
+                if ready:
+                    return last
+                raise TimeoutError("no reply from server")
+            last = time.perf_counter()
+            ready = ready or done()
+
+    async def action(self, name: str, send, done=lambda: True, reply: bool = True):
+        self.current = name
+        b_in, b_out = self.bytes_in, self.bytes_out
+        start = time.perf_counter()
+        await send()
+        latency = None
+        if reply:
+            latency = await self.settle(done) - start
+        self.record(name, latency, self.bytes_in - b_in, self.bytes_out - b_out)
+
+    def _one(self, t, **attrs):
+        found = self.tree.find(t, **attrs)
+        if not found:
+            raise LookupError(f"{t} {attrs} not on screen ({self.tree.route()})")
+        return found[0]
+
+    async def click(self, control):
+        await self.send(_event(control["i"], "click"))
+
+    async def type_into(self, control, value: str):
+        await self.send(_props(control["i"], value=value))
+        await self.send(_event(control["i"], "change", value))
+
+    async def run(self, rng: random.Random, toggles: int):
+        ws_url = self.base.replace("http://", "ws://") + "/ws"
+        ip = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        async with websockets.connect(ws_url, additional_headers={"X-Forwarded-For": ip}, max_size=None) as ws:
+            self.ws = ws
+            reader = asyncio.create_task(self._reader())
+            try:
+                await self._visit(rng, toggles)
+            finally:
+                await self.send(_event("page", "close"))
+                reader.cancel()
+
+    async def _visit(self, rng, toggles):
+        await self.action(
+            "open_login", lambda: self.send(json.dumps(_register_payload())),
+            done=lambda: self.tree.route() == "/login",
+        )
+
+        async def login():
+            await self.type_into(self._one("textfield", label="Email"), self.email)
+            await self.type_into(self._one("textfield", label="Password"), self.password)
+            await self.click(self._one("elevatedbutton", text="🔐 Login"))
+
+        await self.action("login", login, done=lambda: self.tree.route() == "/dashboard")
+
+        boxes = [c for c in self.tree.find("checkbox") if _text(c.get("label"))]
+        for box in rng.sample(boxes, min(toggles, len(boxes))):
+            value = "false" if box.get("value") == "true" else "true"
+            await self.action("toggle_subtask", lambda: self.type_into(box, value), reply=False)
+
+        await self.action(
+            "open_table", lambda: self.click(self._one("iconbutton", tooltip="Task table")),
+            done=lambda: self.tree.route() == "/table",
+        )
+        search = self._one("textfield", label="Search task or subtask...")
+        for i in range(1, len(SEARCH_TEXT) + 1):
+            await self.action("search_keystroke", lambda: self.type_into(search, SEARCH_TEXT[:i]))
+
+        await self.action(
+            "back_to_dashboard", lambda: self.click(self._one("iconbutton", icon="arrow_back")),
+            done=lambda: self.tree.route() == "/dashboard",
+        )
+
+        attach = self.tree.find("elevatedbutton", text="Attach PDFs & Close")
+        if attach:
+            await self._attach_pdf(attach[0], rng)
+
+    async def _attach_pdf(self, button, rng):
+        name = f"load_{rng.getrandbits(48):012x}.pdf"
+        data = _pdf_bytes(name)
+
+        def picker():
+            # Each dashboard visit adds a picker; the one asked to pick is ours
+            return next((c for c in self.tree.find("filepicker") if c.get("state") == "pickFiles"), None)
+
+        def upload_url():
+            files = json.loads(picker().get("upload") or "[]")
+            return next((f["upload_url"] for f in files if f["name"] == name), None)
+
+        def finished():
+            return any(name in _text(c.get("value")) and "done" in _text(c.get("value"))
+                       for c in self.tree.find("text"))
+
+        async def attach():
+            await self.click(button)
+            await self.settle(lambda: picker() is not None)
+            target = picker()["i"]
+            files = [{"name": name, "path": None, "size": len(data), "id": 0}]
+            await self.send(_event(target, "result", json.dumps({"path": None, "files": files})))
+            await self.settle(lambda: upload_url() is not None)
+            req = urllib.request.Request(self.base + upload_url(), data=data, method="PUT")
+            await asyncio.to_thread(lambda: urllib.request.urlopen(req, timeout=self.timeout).read())
+            await self.send(_event(target, "upload", json.dumps({"file_name": name, "progress": 1.0, "error": None})))
+
+        await self.action("attach_pdf", attach, done=finished)
+
+
+# ---------------- server ----------------
+
+class ProcSampler:
+    """CPU% and RSS of the server process (and its children), from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.samples = []  # (t, cpu_seconds, rss_bytes)
+        self._tick = os.sysconf("SC_CLK_TCK")
+        self._page = os.sysconf("SC_PAGE_SIZE")
+
+    def _pids(self):
+        pids, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            for task in os.listdir(f"/proc/{pid}/task"):
+                try:
+                    with open(f"/proc/{pid}/task/{task}/children") as f:
+                        stack.extend(int(x) for x in f.read().split())
+                except OSError:
+                    pass
+        return pids
+
+    def sample(self):
+        cpu = rss = 0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                cpu += (int(fields[11]) + int(fields[12])) / self._tick
+                rss += int(fields[21]) * self._page
+            except (OSError, IndexError, ValueError):
+                pass
+        self.samples.append((time.perf_counter(), cpu, rss))
+
+    async def run(self, interval: float = 0.5):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    def summary(self) -> dict:
+        if len(self.samples) < 2:
+            return {}
+        (t0, c0, _), (t1, c1, _) = self.samples[0], self.samples[-1]
+        rates = [
+            (b[1] - a[1]) / (b[0] - a[0]) * 100
+            for a, b in zip(self.samples, self.samples[1:]) if b[0] > a[0]
+        ]
+        return {
+            "cpu_avg_pct": (c1 - c0) / (t1 - t0) * 100,
+            "cpu_peak_pct": max(rates) if rates else 0.0,
+            "rss_start_mb": self.samples[0][2] / 2**20,
+            "rss_peak_mb": max(s[2] for s in self.samples) / 2**20,
+            "rss_end_mb": self.samples[-1][2] / 2**20,
+        }
+
+
+def run_server(port: int, tasks: int, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "TASK_BACKEND": "local",
+        "LOCAL_BACKEND_SEED_TASKS": str(tasks),
+        "WEB_WORKERS": str(workers),
+        "FLET_FORCE_WEB_SERVER": "true",
+        "FLET_SERVER_IP": "127.0.0.1",
+        "FLET_SERVER_PORT": str(port),
+        "WEB_WORKER_BASE_PORT": str(port + 1),
+    }
+    env.pop("LOCAL_BACKEND_DB", None)
+    env.pop("LOCAL_MIRROR", None)
+    return subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def _wait_http(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2).read()
+            return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+# ---------------- driver ----------------
+
+def _stats(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {}
+    q = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+    return {"p50_ms": q[49] * 1000, "p95_ms": q[94] * 1000, "p99_ms": q[98] * 1000, "max_ms": values[-1] * 1000}
+
+
+async def drive(base_url: str, clients: int, duration: float, args, pid: int | None) -> dict:
+    actions = {}  # name -> {"latency": [...], "in": [...], "out": [...]}
+    errors = {}
+    visits = 0
+    stop_at = time.perf_counter() + duration
+
+    def record(name, latency, b_in, b_out):
+        a = actions.setdefault(name, {"latency": [], "in": [], "out": []})
+        if latency is not None:
+            a["latency"].append(latency)
+        a["in"].append(b_in)
+        a["out"].append(b_out)
+
+    async def client(i):
+        nonlocal visits
+        rng = random.Random(args.seed * 1000 + i)
+        email, password = SEED_USERS[i % len(SEED_USERS)]
+        await asyncio.sleep(rng.uniform(0, args.ramp))
+        while True:
+            s = Session(base_url, email, password, args.quiet, args.timeout, record)
+            try:
+                await s.run(rng, args.toggles)
+                visits += 1
+            except Exception as e:
+                key = f"{s.current}: {type(e).__name__}" + (f" {e}" if isinstance(e, LookupError) else "")
+                errors[key] = errors.get(key, 0) + 1
+            if time.perf_counter() >= stop_at:
+                return
+            await asyncio.sleep(rng.uniform(0, args.think))
+
+    sampler = ProcSampler(pid) if pid and os.path.isdir(f"/proc/{pid}") else None
+    sampling = asyncio.create_task(sampler.run()) if sampler else None
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    wall = time.perf_counter() - started
+    if sampling:
+        sampling.cancel()
+        sampler.sample()
+
+    per_action = {
+        name: {
+            "count": len(a["in"]),
+            **_stats(a["latency"]),
+            "bytes_in_avg": statistics.fmean(a["in"]),
+            "bytes_out_avg": statistics.fmean(a["out"]),
+        }
+        for name, a in actions.items()
+    }
+    all_latency = [x for a in actions.values() for x in a["latency"]]
+    return {
+        "clients": clients,
+        "visits": visits,
+        "wall_s": wall,
+        "errors": errors,
+        "overall": _stats(all_latency),
+        "actions": per_action,
+        "server": sampler.summary() if sampler else {},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=20, help="concurrent simulated browsers")
+    parser.add_argument("--duration", type=float, default=60, help="seconds; every client finishes its visit")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks seeded into the local backend")
+    parser.add_argument("--toggles", type=int, default=3, help="subtask checkboxes clicked per visit")
+    parser.add_argument("--quiet", type=float, default=0.3, help="seconds of silence that end an action")
+    parser.add_argument("--think", type=float, default=1.0, help="max pause between visits")
+    parser.add_argument("--ramp", type=float, default=5.0, help="clients start spread over this many seconds")
+    parser.add_argument("--timeout", type=float, default=60, help="per-action timeout")
+    parser.add_argument("--workers", type=int, default=1, help="WEB_WORKERS for the server")
+    parser.add_argument("--port", type=int, default=8750)
+    parser.add_argument("--url", help="drive an already running server instead of starting one")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    proc = None
+    base = (args.url or f"http://127.0.0.1:{args.port}").rstrip("/")
+    if not args.url:
+        proc = run_server(args.port, args.tasks, args.workers)
+    try:
+        if proc:
+            _wait_http(args.port)
+        r = asyncio.run(drive(base, args.clients, args.duration, args, proc.pid if proc else None))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=15)
+
+    print(f"clients={r['clients']} visits={r['visits']} wall={r['wall_s']:.1f}s errors={r['errors'] or 0}")
+    for name, a in r["actions"].items():
+        lat = (
+            f"p50={a['p50_ms']:8.1f} p95={a['p95_ms']:8.1f} p99={a['p99_ms']:8.1f} ms"
+            if "p50_ms" in a else "(no reply expected)".ljust(44)
+        )
+        print(f"  {name:<18} n={a['count']:<5} {lat}  in={a['bytes_in_avg']:10.0f} B  out={a['bytes_out_avg']:7.0f} B")
+    if r["server"]:
+        s = r["server"]
+        print(
+            f"server: cpu avg={s['cpu_avg_pct']:.0f}% peak={s['cpu_peak_pct']:.0f}%  "
+            f"rss {s['rss_start_mb']:.0f} -> peak {s['rss_peak_mb']:.0f} MiB"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cpu_count": os.cpu_count(), "tasks": args.tasks, **r}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# bench/page_render.py
+# Benchmarks for the data layer and the page render paths, run against the
+# in-process local backend (app/local_backend.py) seeded with 10, 1k and 10k
+# tasks. Pages run on a real ft.Page whose connection serializes every
+# update the way the web server would, so the numbers include the payload
+# that would go over the websocket.
+#
+#   python bench/page_render.py --sizes 10,1000,10000 --json bench.json
+#
+# Per case: latency (median/p95 over --repeat runs), peak allocation
+# (tracemalloc, separate run), controls on the page and bytes sent.
+# A case slower than --budget runs once and is skipped at larger sizes.
+# --max-update-bytes / --max-update-controls set a payload budget for one
+# run of a case (app/payload.py); any case over it fails the run (exit 1).
+# Compare the JSON of two commits to spot regressions.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["TASK_BACKEND"] = "local"
+os.environ.pop("LOCAL_BACKEND_DB", None)
+os.environ.pop("LOCAL_MIRROR", None)
+
+import flet as ft  # noqa: E402
+from flet.core.local_connection import LocalConnection  # noqa: E402
+from flet.core.page import Page  # noqa: E402
+from flet.core.protocol import (  # noqa: E402
+    ClientActions,
+    ClientMessage,
+    CommandEncoder,
+    PageCommandResponsePayload,
+    PageCommandsBatchResponsePayload,
+)
+
+from app import auth, local_backend  # noqa: E402
+from app.db_client import fetch_clients, fetch_tasks_for_user  # noqa: E402
+from app import payload  # noqa: E402
+from app.payload import PayloadBudget, PayloadMeter  # noqa: E402
+
+
+class CaptureConnection(LocalConnection):
+    """Stands in for the websocket: encodes what would be sent, counts bytes."""
+
+    def __init__(self):
+        super().__init__()
+        self.page = None
+        self.bytes_sent = 0
+        self.messages = 0
+
+    def _get_next_control_id(self):
+        return self.page.get_next_control_id()
+
+    def _send(self, message):
+        self.bytes_sent += len(json.dumps(message, cls=CommandEncoder, separators=(",", ":")).encode())
+        self.messages += 1
+
+    def send_command(self, session_id, command):
+        result, message = self._process_command(command)
+        if message:
+            self._send(message)
+        return PageCommandResponsePayload(result=result, error="")
+
+    def send_commands(self, session_id, commands):
+        results, messages = [], []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ("add", "get"):
+                results.append(result)
+            if message:
+                messages.append(message)
+        if messages:
+            self._send(ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages))
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.data = None
+
+    def load(self):
+        return self.data
+
+    def save(self, data):
+        self.data = data
+
+    def clear(self):
+        self.data = None
+
+
+def _loop_thread():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def make_page(loop, width: int = 1280):
+    """A headless session page, signed in as the demo user."""
+    conn = CaptureConnection()
+    page = Page(conn, "bench", loop=loop)
+    conn.page = page
+    conn._client_details = type("Details", (), {
+        "pageRoute": "/", "pageWidth": str(width), "pageHeight": "800", "windowWidth": str(width),
+        "windowHeight": "800", "windowTop": "", "windowLeft": "", "isPWA": "false", "isWeb": "false",
+        "isDebug": "false", "platform": "linux", "platformBrightness": "light", "media": "{}",
+        "sessionId": "bench", "pageName": "",
+    })()
+    page._set_attr("width", str(width), dirty=False)
+    ctx = auth.AuthContext(_MemoryStore())
+    page.session.set(auth.SESSION_KEY, ctx)
+    ctx.sign_in(local_backend.DEMO_EMAIL, local_backend.DEMO_PASSWORD)
+    auth.use_auth(page)
+    meter = PayloadMeter(page, PayloadBudget.from_env())
+    meter.install()
+    page.session.set(payload.SESSION_KEY, meter)
+    return page
+
+
+def settle(loop):
+    """Wait until tasks already scheduled on the page loop (did_mount) ran."""
+    for _ in range(3):
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result()
+
+
+def count_controls(control) -> int:
+    n, stack = 0, [control]
+    while stack:
+        c = stack.pop()
+        n += 1
+        stack.extend(c._get_children())
+    return n
+
+
+def measure(fn, repeat: int, page=None, count_root=None, budget: float = 60.0) -> dict:
+    conn = page._Page__conn if page is not None else None
+    largest = None  # the run that sent the most, as counted by the payload meter
+
+    def timed():
+        nonlocal largest
+        before = conn.bytes_sent if conn else 0
+        t0 = time.perf_counter()
+        if page is None:
+            fn()
+        else:
+            with page.session.get(payload.SESSION_KEY).action(fn.__name__) as sent:
+                fn()
+            if largest is None or sent.bytes > largest.bytes:
+                largest = sent
+        return time.perf_counter() - t0, (conn.bytes_sent - before) if conn else 0
+
+    first = timed()  # warm-up: imports, row caches
+    over = first[0] > budget
+    runs = [first] if over else [timed() for _ in range(repeat)]
+
+    peak = None
+    if not over:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+    times = sorted(t for t, _ in runs)
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+        "min_ms": times[0] * 1000,
+        "peak_alloc_kb": peak,
+        "bytes_sent": int(statistics.median(b for _, b in runs)),
+        "controls": count_controls(count_root) if count_root is not None else None,
+        "controls_sent": largest.controls if largest is not None else None,
+        "largest": largest,
+        "over_budget": over,
+    }
+
+
+def run_size(n: int, repeat: int, loop, budget: float, skip: set, payload_budget=None) -> dict:
+    """All cases at one task count. Cases in `skip` are not run."""
+    from pages.clients import ClientsPage
+    from pages.dashboard import DashboardPage
+    from pages.task_table import TaskTablePage
+
+    store = local_backend.LocalStore()
+    local_backend._store = store
+    local_backend.seed(store, tasks=n, clients=max(10, n // 20))
+
+    out = {}
+    page = make_page(loop)
+
+    def case(name, fn, count_root=None, **extra):
+        if name in skip:
+            out[name] = {"skipped": True}
+            return
+        out[name] = m = {**measure(fn, repeat, page, count_root, budget), **extra}
+        largest = m.pop("largest")
+        m["payload_over"] = None
+        if payload_budget is not None and largest is not None:
+            m["payload_over"] = payload_budget.check(f"tasks={n} {name}", largest)
+
+    raw_fetch = getattr(fetch_tasks_for_user, "__wrapped__", fetch_tasks_for_user)
+    case("fetch_tasks_for_user", raw_fetch, rows=len(raw_fetch() or []))
+
+    if "dashboard_refresh" not in skip:
+        dash = DashboardPage(page, on_logout=lambda: None)
+        page.add(dash)
+        settle(loop)
+        case("dashboard_refresh", dash.refresh, page)
+        page.controls.clear()
+        page.overlay.clear()
+        page.update()
+
+    table_cases = {"table_refresh", "table_refresh_search", "export_csv"}
+    if table_cases - skip:
+        table = TaskTablePage(page, on_back=lambda: None)
+        if "table_refresh" in skip:
+            table.task_filter.value = "site 1"  # keep the first render small too
+        page.add(table)
+        settle(loop)
+        case("table_refresh", table.refresh_table, page)
+        table.task_filter.value = "site 1"
+        case("table_refresh_search", table.refresh_table, page)
+        table.task_filter.value = ""
+        case("export_csv", lambda: table.export_csv(None))
+        page.controls.clear()
+        page.update()
+
+    raw_clients = getattr(fetch_clients, "__wrapped__", fetch_clients)
+    case("fetch_clients", raw_clients, rows=len(raw_clients() or []))
+    if "clients_refresh" not in skip:
+        clients = ClientsPage(page, on_back=lambda: None)
+        page.add(clients)
+        case("clients_refresh", clients.refresh, page)
+        page.controls.clear()
+    for name in out:
+        out[name].setdefault("skipped", False)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma separated task counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument(
+        "--budget", type=float, default=60,
+        help="seconds; a case slower than this runs once and is skipped at larger sizes",
+    )
+    parser.add_argument("--max-update-bytes", type=int, help="payload budget: bytes one run of a case may send")
+    parser.add_argument("--max-update-controls", type=int, help="payload budget: controls one run may add or change")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+    payload_budget = None
+    if args.max_update_bytes is not None or args.max_update_controls is not None:
+        payload_budget = PayloadBudget(args.max_update_bytes, args.max_update_controls)
+
+    os.chdir(tempfile.mkdtemp(prefix="task_manager_bench_"))  # uploads/ etc. stay out of the repo
+    loop = _loop_thread()
+    results = {}
+    skip = set()
+    for n in sorted(int(x) for x in args.sizes.split(",")):
+        results[str(n)] = r = run_size(n, max(1, args.repeat), loop, args.budget, skip, payload_budget)
+        for case, m in r.items():
+            if m["skipped"]:
+                print(f"tasks={n:<6} {case:<22} skipped (over budget at a smaller size)")
+                continue
+            alloc = f"{m['peak_alloc_kb']:9.0f} KiB" if m["peak_alloc_kb"] is not None else "        - KiB"
+            print(
+                f"tasks={n:<6} {case:<22} median={m['median_ms']:9.2f} ms  p95={m['p95_ms']:9.2f} ms  "
+                f"alloc={alloc}  sent={m['bytes_sent']:>9} B  controls={m['controls'] or '-'}"
+                f"  sent_controls={m['controls_sent'] if m['controls_sent'] is not None else '-'}"
+            )
+            if m["over_budget"]:
+                skip.add(case)
+    if args.json:
+        with open(os.path.join(ROOT, args.json) if not os.path.isabs(args.json) else args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "flet": ft.version.version, "budget_s": args.budget,
+                       "results": results}, f, indent=2)
+    if payload_budget is not None and payload_budget.violations:
+        print(f"{len(payload_budget.violations)} case(s) over the payload budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
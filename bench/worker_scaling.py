@@ -0,0 +1,170 @@
+# bench/worker_scaling.py
+# Load test for the multi-worker web mode: starts `main.py` with 1, 2, 4...
+# workers and drives many simulated browser sessions against it, each one
+# registering over the Flet websocket and waiting for the login screen.
+# Session throughput should scale close to linearly with the worker count,
+# up to the number of cores.
+#
+#   python bench/worker_scaling.py --workers 1,2,4 --concurrency 64 --duration 20
+#
+# Needs the `websockets` package (installed with supabase's realtime).
+# No Supabase project is required: the login screen makes no queries.
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _register_payload(route: str = "/") -> dict:
+    return {
+        "action": "registerWebClient",
+        "payload": {
+            "pageName": "", "pageRoute": route, "pageWidth": "1280", "pageHeight": "800",
+            "windowWidth": "", "windowHeight": "", "windowTop": "", "windowLeft": "",
+            "isPWA": "false", "isWeb": "true", "isDebug": "false", "platform": "linux",
+            "platformBrightness": "light", "media": "{}", "sessionId": "",
+        },
+    }
+
+
+def _page_event(name: str, data: str = "") -> str:
+    return json.dumps({
+        "action": "pageEventFromWeb",
+        "payload": {"eventTarget": "page", "eventName": name, "eventData": data},
+    })
+
+
+def _shows_view(msg: dict, route: str) -> bool:
+    if msg.get("action") != "pageControlsBatch":
+        return False
+    for m in msg["payload"]:
+        if m.get("action") == "addPageControls":
+            for c in m["payload"].get("controls", []):
+                if c.get("t") == "view" and c.get("route") == route:
+                    return True
+    return False
+
+
+async def one_session(url: str, timeout: float) -> float:
+    """Open a session and wait for the login view. Returns seconds taken."""
+    ip = f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+    start = time.perf_counter()
+    async with websockets.connect(url, additional_headers={"X-Forwarded-For": ip}, max_size=None) as ws:
+        await ws.send(json.dumps(_register_payload()))
+        deadline = start + timeout
+        while True:
+            msg = json.loads(await asyncio.wait_for(ws.recv(), deadline - time.perf_counter()))
+            if msg.get("action") == "invokeMethod":
+                # clientStorage.get of the saved session: the browser has none
+                p = msg["payload"]
+                await ws.send(_page_event(
+                    "invoke_method_result",
+                    json.dumps({"method_id": p["methodId"], "result": None, "error": None}),
+                ))
+            elif _shows_view(msg, "/login"):
+                elapsed = time.perf_counter() - start
+                await ws.send(_page_event("close"))
+                return elapsed
+
+
+async def drive(url: str, concurrency: int, duration: float, timeout: float) -> dict:
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            try:
+                latencies.append(await one_session(url, timeout))
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "sessions": len(latencies),
+        "errors": errors,
+        "sessions_per_sec": len(latencies) / wall,
+        "p50_ms": q[49] * 1000,
+        "p95_ms": q[94] * 1000,
+    }
+
+
+def _wait_http(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2).read()
+            return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def run_server(workers: int, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_WORKERS": str(workers),
+        "FLET_FORCE_WEB_SERVER": "true",
+        "FLET_SERVER_IP": "127.0.0.1",
+        "FLET_SERVER_PORT": str(port),
+        "WEB_WORKER_BASE_PORT": str(port + 1),
+    }
+    # Any saved desktop session or local .env must not change what is measured
+    env.pop("SUPABASE_URL", None)
+    return subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=64, help="simulated browsers")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per worker count")
+    parser.add_argument("--timeout", type=float, default=30, help="per-session timeout")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n in (int(x) for x in args.workers.split(",")):
+        proc = run_server(n, args.port)
+        try:
+            _wait_http(args.port)
+            # warm-up: first sessions pay for imports and page caches
+            asyncio.run(drive(f"ws://127.0.0.1:{args.port}/ws", min(4, args.concurrency), 2, args.timeout))
+            r = asyncio.run(drive(f"ws://127.0.0.1:{args.port}/ws", args.concurrency, args.duration, args.timeout))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=15)
+        r["workers"] = n
+        results.append(r)
+        base = results[0]["sessions_per_sec"] / results[0]["workers"]
+        r["efficiency"] = r["sessions_per_sec"] / (base * n) if base else 0.0
+        print(
+            f"workers={n:<3} sessions/s={r['sessions_per_sec']:8.1f}  p50={r['p50_ms']:7.1f} ms  "
+            f"p95={r['p95_ms']:7.1f} ms  errors={r['errors']}  scaling={r['efficiency']:.0%}"
+        )
+
+    print(f"cores available: {os.cpu_count()}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,93 @@
 # main.py
 print("Starting main.py...")
+import os
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+
+# Before the app imports: several modules read their settings at import time
+load_dotenv()
+os.environ.setdefault("FLET_SECRET_KEY", "any-long-random-string-here")
+
+from app.workers import is_worker, serve, worker_count
+
+if worker_count() > 1 and not is_worker():
+    # WEB_WORKERS > 1: this process only runs the sticky front and
+    # supervises the workers, each of which runs this file again. It never
+    # renders a page, so it stops before Flet and the pages are imported.
+    serve(os.path.abspath(__file__))
+    sys.exit(0)
+
 import flet as ft
-from app.auth import restore_session_if_any, get_current_user
+from app.auth import attach_auth
+from app.metrics import ACTIVE_SESSIONS, ROUTE_SECONDS, start_metrics_server
+from app.payload import watch_payload
+from app.profiling import profiled, start_from_env as start_profiling
+from app.upload_queue import close_upload_queue
+from app.write_buffer import get_write_buffer
 from pages.login import LoginPage
 from pages.signup import SignupPage
-from pages.dashboard import DashboardPage
-from pages.task_table import TaskTablePage
-from pages.clients import ClientsPage
 
+# Known routes; anything else is counted as "other" in the metrics
+ROUTES = ("/login", "/signup", "/dashboard", "/table", "/clients")
 
-import os
-from dotenv import load_dotenv
+# The pages behind the login screen are imported on first use; once a
+# login screen is up they are loaded in the background so the first
+# dashboard does not pay for them either.
+_warm_thread = None
+
+
+def warm_pages():
+    global _warm_thread
+    if _warm_thread is None:
+        _warm_thread = threading.Thread(target=_import_pages, name="warm-pages", daemon=True)
+        _warm_thread.start()
 
-load_dotenv()
 
+def _import_pages():
+    import pages.clients  # noqa: F401
+    import pages.dashboard  # noqa: F401
+    import pages.task_table  # noqa: F401
 
-def main(page: ft.Page):
+
+async def main(page: ft.Page):
     page.title = "Task Manager"
     page.theme_mode = ft.ThemeMode.LIGHT
     page.padding = 0
     page.spacing = 0
 
+    # Auth is per session: each browser tab gets its own user + client
+    auth = attach_auth(page)
+    writes = get_write_buffer(page)
+    payload = watch_payload(page)
+    ACTIVE_SESSIONS.inc()
+
+    def on_close(e):
+        ACTIVE_SESSIONS.dec()
+        if payload:
+            payload.close()
+        writes.flush()
+        close_upload_queue(page)
+        auth.close()
+
+    page.on_close = on_close
+
     def go(route: str):
         page.go(route)
 
+    @profiled("route_change")
     def on_route_change(e: ft.RouteChangeEvent):
+        start = time.perf_counter()
+        try:
+            show_route()
+        finally:
+            route = page.route if page.route in ROUTES else "other"
+            ROUTE_SECONDS.observe(time.perf_counter() - start, route=route)
+
+    def show_route():
+        # Leaving a page: write its buffered edits before the next one reads
+        writes.flush()
         page.views.clear()
 
         # -------- SIGNUP --------
@@ -39,9 +102,10 @@ def main(page: ft.Page):
 
         # -------- DASHBOARD --------
         elif page.route == "/dashboard":
-            if not get_current_user():
+            if not auth.user:
                 page.go("/login")
                 return
+            from pages.dashboard import DashboardPage
 
             page.views.append(
                 ft.View(
@@ -59,9 +123,10 @@ def main(page: ft.Page):
 
         # -------- TASK TABLE --------
         elif page.route == "/table":
-            if not get_current_user():
+            if not auth.user:
                 page.go("/login")
                 return
+            from pages.task_table import TaskTablePage
 
             page.views.append(
                 ft.View(
@@ -77,6 +142,8 @@ def main(page: ft.Page):
                 )
             )
         elif page.route == "/clients":
+            from pages.clients import ClientsPage
+
             page.views.append(
                 ft.View(
                     "/clients",
@@ -117,14 +184,15 @@ def main(page: ft.Page):
     page.on_resize = on_page_resize
 
     # Restore session (refresh-friendly)
-    if restore_session_if_any():
+    if await auth.restore_async():
         page.go("/dashboard")
     else:
         page.go("/login")
+        warm_pages()
 
 
-os.environ.setdefault("FLET_SECRET_KEY", "any-long-random-string-here")
-
+start_metrics_server()
+start_profiling()
 ft.app(
     target=main,
     upload_dir="uploads",
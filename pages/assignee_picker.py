@@ -0,0 +1,132 @@
+# pages/assignee_picker.py
+# Searchable assignee list for the assign dialogs: the people already
+# picked, then one page of profiles whose name or email starts with what was
+# typed (app.db_client.search_profiles), with "Show more" for the next page.
+# Opening it costs one page of results however many profiles there are;
+# typing searches once the user pauses for SEARCH_DELAY seconds.
+import contextvars
+import threading
+
+import flet as ft
+
+from app.db_client import PROFILE_PAGE_SIZE, fetch_profiles_by_ids, search_profiles
+
+SEARCH_DELAY = 0.25
+
+
+def profile_label(p: dict) -> str:
+    return p.get("full_name") or p.get("email") or p["id"][:6]
+
+
+class AssigneePicker(ft.Column):
+    def __init__(self, selected: dict | None = None, page_size: int = PROFILE_PAGE_SIZE):
+        super().__init__(tight=True, spacing=6, width=360)
+        self.selected = dict(selected or {})  # uid -> label, in picking order
+        self.page_size = page_size
+        self._query = ""
+        self._offset = 0
+        self._seq = 0  # newest search; results of older ones are dropped
+        self._lock = threading.Lock()
+        self._timer = None
+
+        self.search = ft.TextField(
+            hint_text="Search by name or email",
+            prefix_icon=ft.Icons.SEARCH,
+            dense=True,
+            autofocus=True,
+            on_change=self._on_search,
+        )
+        self.chosen = ft.Column(spacing=0)
+        self.results = ft.Column(spacing=0)
+        self.more = ft.TextButton("Show more", visible=False, on_click=self._on_more)
+        self.controls = [
+            self.search,
+            self.chosen,
+            ft.Divider(height=1),
+            ft.Column([self.results, self.more], scroll=ft.ScrollMode.AUTO, height=220, spacing=0),
+        ]
+        self._render_chosen()
+        self._load(reset=True)
+
+    @property
+    def selected_ids(self) -> list[str]:
+        return list(self.selected)
+
+    # ---------------- Data ----------------
+
+    def _load(self, reset: bool):
+        with self._lock:
+            if reset:
+                self._seq += 1
+                self._offset = 0
+            seq, query, offset = self._seq, self._query, self._offset
+        try:
+            rows = search_profiles(query, offset, self.page_size)
+        except Exception as e:
+            print("⚠️ profile search failed:", repr(e))
+            rows = []
+        with self._lock:
+            if seq != self._seq:
+                return False
+            self._offset = offset + len(rows)
+        if reset:
+            self.results.controls.clear()
+        self.results.controls.extend(
+            self._checkbox(r["id"], profile_label(r)) for r in rows if r.get("id") and r["id"] not in self.selected
+        )
+        if reset and not self.results.controls:
+            self.results.controls.append(ft.Text("No matches", size=12, color=ft.Colors.GREY_600))
+        self.more.visible = len(rows) == self.page_size
+        return True
+
+    # ---------------- Rendering ----------------
+
+    def _checkbox(self, uid: str, label: str) -> ft.Checkbox:
+        return ft.Checkbox(label=label, value=uid in self.selected, data=(uid, label), on_change=self._on_toggle)
+
+    def _render_chosen(self):
+        self.chosen.controls = [self._checkbox(uid, label) for uid, label in self.selected.items()]
+        self.chosen.visible = bool(self.selected)
+
+    # ---------------- Events ----------------
+
+    def _on_search(self, e):
+        self._query = self.search.value or ""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            # The timer thread needs the session's context (signed-in user)
+            self._timer = threading.Timer(SEARCH_DELAY, contextvars.copy_context().run, args=(self._search,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _search(self):
+        if self._load(reset=True):
+            try:
+                self.update()
+            except Exception:
+                pass  # the dialog was closed meanwhile
+
+    def _on_more(self, e):
+        if self._load(reset=False):
+            self.update()
+
+    def _on_toggle(self, e):
+        uid, label = e.control.data
+        if e.control.value:
+            self.selected[uid] = label
+            if e.control in self.results.controls:
+                self.results.controls.remove(e.control)
+        else:
+            self.selected.pop(uid, None)
+            if e.control in self.chosen.controls:
+                self.results.controls.insert(0, self._checkbox(uid, label))
+        self._render_chosen()
+        self.update()
+
+
+def assignee_labels(ids: list[str], known: dict) -> dict:
+    """uid -> label for `ids`, looking up only the ones `known` lacks."""
+    missing = [uid for uid in ids if uid not in known]
+    found = {p["id"]: profile_label(p) for p in fetch_profiles_by_ids(missing)} if missing else {}
+    return {uid: known.get(uid) or found.get(uid) or uid[:6] for uid in ids}
@@ -1,5 +1,10 @@
 import flet as ft
 from app.db_client import fetch_clients, add_client, update_client, delete_client
+from app.dialogs import get_dialogs
+from app.metrics import timed_refresh
+from app.payload import metered_action
+from app.profiling import profiled
+from app.tracing import KIND_INTERNAL, traced
 
 
 class ClientsPage(ft.Container):
@@ -7,6 +12,7 @@ class ClientsPage(ft.Container):
         super().__init__()
         self.page = page
         self.on_back = on_back
+        self.dialogs = get_dialogs(page)
         self.expand = True
         self.padding = 16
         self.bgcolor = ft.Colors.BLUE_GREY_50
@@ -171,6 +177,10 @@ class ClientsPage(ft.Container):
         )
 
     # ---------------- Data ----------------
+    @traced("page.clients.refresh", kind=KIND_INTERNAL, payload=False, rows=lambda _, self: len(self.clients_list.controls))
+    @timed_refresh("clients")
+    @metered_action("clients.refresh")
+    @profiled("clients.refresh")
     def refresh(self):
         self.clients_list.controls.clear()
         clients = fetch_clients() or []
@@ -305,7 +315,8 @@ class ClientsPage(ft.Container):
             self._toast("🗑️ Client deleted")
             self.refresh()
 
-        dlg = ft.AlertDialog(
+        dlg = self.dialogs.show(
+            "clients.delete",
             title=ft.Text("Delete client?"),
             content=ft.Text("This will remove the client permanently."),
             actions=[
@@ -313,14 +324,10 @@ class ClientsPage(ft.Container):
                 ft.ElevatedButton("Delete", on_click=yes),
             ],
         )
-        self.page.overlay.append(dlg)
-        dlg.open = True
-        self.page.update()
 
     # ---------------- small helpers ----------------
     def _close_dialog(self, dlg):
-        dlg.open = False
-        self.page.update()
+        self.dialogs.close(dlg)
 
     def _toast(self, msg: str):
         self.page.snack_bar = ft.SnackBar(content=ft.Text(msg), open=True)
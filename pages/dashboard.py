@@ -1,6 +1,6 @@
 import os
+import threading
 import uuid
-import json
 from datetime import datetime
 
 import flet as ft
@@ -10,6 +10,9 @@ from app.db_client import (
     fetch_tasks_for_user,
     delete_task,
     update_task,
+    update_tasks,
+    delete_tasks,
+    set_assignees_bulk,
     set_task_subtasks,
     set_task_assignees,
     set_task_comments,
@@ -17,9 +20,20 @@ from app.db_client import (
     fetch_task,
     fetch_clients,   # ✅ only once
 )
+from app.dialogs import get_dialogs
+from app.metrics import timed_refresh
+from app.payload import metered_action
+from app.profiling import profiled
+from app.models import Task
+from app.storage import get_pdf_storage, path_from_url, upload_pdf
+from app.pdf_preview import attach_preview
+from app.signed_urls import PdfLinks
+from app.tracing import KIND_INTERNAL, traced
+from app.upload_queue import UploadJob, get_upload_queue
+from app.write_buffer import get_write_buffer
+from pages.assignee_picker import AssigneePicker, assignee_labels
 
 UPLOAD_DIR = "uploads"
-PDF_BUCKET = "ssr-reports"
 
 
 class DashboardPage(ft.Container):
@@ -32,15 +46,17 @@ class DashboardPage(ft.Container):
         self.padding = 14
         self.bgcolor = ft.Colors.BLUE_GREY_50
 
-        self.supabase = get_supabase()
-        self.user = get_current_user() or {}
+        self.supabase = get_supabase(page)
+        self.user = get_current_user(page) or {}
+        # Checkbox/status edits are coalesced per task, see app/write_buffer.py
+        self.writes = get_write_buffer(page, on_failure=self._on_write_failed)
+        self.dialogs = get_dialogs(page)
 
         # Responsive
         self.is_mobile = self._get_width() < 700
 
-        # Users map
+        # Users map (loaded by refresh() below)
         self.users_map = {}
-        self._load_users()
 
         # Clients
         self.clients = []
@@ -53,14 +69,34 @@ class DashboardPage(ft.Container):
 
         # File picker
         os.makedirs(UPLOAD_DIR, exist_ok=True)
-        self.file_picker = ft.FilePicker(
+        # One picker per session: a new one per DashboardPage piled up in the overlay
+        self.file_picker = self.dialogs.file_picker(
             on_result=self._on_file_picked,
             on_upload=self._on_file_upload,
         )
-        if self.file_picker not in self.page.overlay:
-            self.page.overlay.append(self.file_picker)
 
-        self._pending_pdf = None
+        self._pick_target = None  # (task_id, subtask_id) of the open picker
+
+        # PDF storage + upload queue and its progress panel
+        self.storage = get_pdf_storage(self.supabase)
+        self.pdf_links = PdfLinks(self.storage, self.user.get("id"))
+        # One queue (and worker pool) per session, not one per DashboardPage
+        self.upload_queue = get_upload_queue(page, self._upload_job, on_change=self._on_job_change)
+        self._job_rows = {}
+        self._link_locks = {}
+        self._jobs_lock = threading.Lock()
+        self.upload_list = ft.Column(spacing=8)
+        self.upload_panel = ft.Container(
+            visible=False,
+            padding=12,
+            border_radius=16,
+            bgcolor=ft.Colors.WHITE,
+            border=ft.border.all(1, ft.Colors.GREY_200),
+            content=ft.Column(
+                [ft.Text("Uploads", weight="bold", size=13), self.upload_list],
+                spacing=6,
+            ),
+        )
 
         # Inputs
         self.title_f = ft.TextField(
@@ -76,6 +112,47 @@ class DashboardPage(ft.Container):
 
         self.tasks_view = ft.ListView(expand=True, spacing=10, padding=0)
 
+        # Multi-select: bulk status / assign / delete in one request each
+        self.select_mode = False
+        self._selected = set()
+        self._tasks_by_id = {}
+        self.bulk_count = ft.Text("0 selected", weight="bold", size=13)
+        self.bulk_status = ft.Dropdown(
+            label="Set status",
+            width=160,
+            options=[
+                ft.dropdown.Option("open", "Open"),
+                ft.dropdown.Option("in_progress", "In Progress"),
+                ft.dropdown.Option("closed", "Closed"),
+            ],
+            on_change=lambda e: self._bulk_set_status(e.control.value),
+        )
+        self.bulk_bar = ft.Container(
+            visible=False,
+            padding=12,
+            border_radius=16,
+            bgcolor=ft.Colors.WHITE,
+            border=ft.border.all(1, ft.Colors.BLUE_200),
+            content=ft.Row(
+                [
+                    self.bulk_count,
+                    self.bulk_status,
+                    ft.OutlinedButton("Assign", icon=ft.Icons.PERSON_ADD, on_click=lambda e: self._bulk_assign_dialog()),
+                    ft.OutlinedButton(
+                        "Delete",
+                        icon=ft.Icons.DELETE,
+                        icon_color=ft.Colors.RED_400,
+                        on_click=lambda e: self._bulk_delete_confirm(),
+                    ),
+                    ft.TextButton("Select all", on_click=lambda e: self._select_all()),
+                    ft.TextButton("Done", on_click=lambda e: self._toggle_select_mode()),
+                ],
+                wrap=True,
+                spacing=8,
+                vertical_alignment=ft.CrossAxisAlignment.CENTER,
+            ),
+        )
+
         # Main Layout Container
         self.content_column = ft.Column(expand=True, spacing=12)
         self.content = self.content_column
@@ -111,16 +188,13 @@ class DashboardPage(ft.Container):
         if self.client_dd.value and not any(c.get("id") == self.client_dd.value for c in self.clients):
             self.client_dd.value = ""
 
-    def _load_users(self):
+    def _load_users(self, tasks):
+        # Labels for the assignees on screen only; known ones are reused
+        ids = list(dict.fromkeys(uid for t in tasks for uid in t.assignees))
         try:
-            users = self.supabase.table("profiles").select("id,email,full_name").execute().data or []
-            self.users_map = {
-                u["id"]: (u.get("full_name") or u.get("email") or u["id"][:6])
-                for u in users
-                if u.get("id")
-            }
-        except Exception:
-            self.users_map = {}
+            self.users_map = assignee_labels(ids, self.users_map)
+        except Exception as e:
+            print("⚠️ Profile lookup failed:", repr(e))
 
     # ---------------- UI pieces ----------------
     def _build_header(self):
@@ -150,6 +224,12 @@ class DashboardPage(ft.Container):
                         tooltip="Task table",
                         on_click=lambda e: self.page.go("/table"),
                     ),
+                    ft.IconButton(
+                        ft.Icons.CHECKLIST,
+                        tooltip="Select tasks",
+                        selected=self.select_mode,
+                        on_click=lambda e: self._toggle_select_mode(),
+                    ),
                     ft.IconButton(
                         ft.Icons.REFRESH,
                         tooltip="Refresh",
@@ -207,13 +287,29 @@ class DashboardPage(ft.Container):
         )
 
     # ---------------- Main refresh ----------------
+    @traced("page.dashboard.refresh", kind=KIND_INTERNAL, payload=False, rows=lambda _, self: len(self._tasks_by_id))
+    @timed_refresh("dashboard")
+    @metered_action("dashboard.refresh")
+    @profiled("dashboard.refresh")
     def refresh(self):
-        self._load_users()
+        # Buffered edits must land before we read back
+        self.writes.flush()
         self._load_clients()
 
         self.tasks_view.controls.clear()
 
         tasks = fetch_tasks_for_user() or []
+        self._load_users(tasks)
+        self._tasks_by_id = {t.id: t for t in tasks}
+        self._selected &= self._tasks_by_id.keys()
+        self._sync_bulk_bar()
+        # Private bucket: sign every link on this page in one request
+        urls = []
+        for t in tasks:
+            attached = [(t.pdf_url, t.pdf_meta)] + [(s.get("pdf_url"), s.get("pdf_meta")) for s in t.subtasks]
+            for url, meta in attached:
+                urls += [url, (meta or {}).get("thumb_url")]
+        self.pdf_links.prefetch(urls)
         if not tasks:
             self.tasks_view.controls.append(
                 ft.Container(
@@ -230,6 +326,8 @@ class DashboardPage(ft.Container):
 
         self.content_column.controls = [
             self._build_header(),
+            self.bulk_bar,
+            self.upload_panel,
             self._build_add_task_area(),
             ft.Text("Your tasks", size=14, weight="bold", color=ft.Colors.BLUE_GREY_700),
             self.tasks_view,
@@ -238,18 +336,17 @@ class DashboardPage(ft.Container):
         self.page.update()
 
     # ---------------- Task card ----------------
-    def _task_card(self, task: dict) -> ft.Control:
-        status = (task.get("status") or "open").lower()
-        pdf_url = task.get("pdf_url")
+    def _task_card(self, task: Task) -> ft.Control:
+        status = (task.status or "open").lower()
+        pdf_url = task.pdf_url
 
-        assignees = self._as_list(task.get("assignees"))
-        assignee_labels = [self.users_map.get(uid, uid[:6]) for uid in assignees]
-        assignee_text = ", ".join(assignee_labels) if assignee_labels else "Unassigned"
+        assignee_names = [self.users_map.get(uid, uid[:6]) for uid in task.assignees]
+        assignee_text = ", ".join(assignee_names) if assignee_names else "Unassigned"
 
-        subtasks = self._as_list(task.get("subtasks"))
+        subtasks = task.subtasks
 
         # ✅ Client line (FIX: must be added to card controls)
-        client = next((c for c in self.clients if c.get("id") == task.get("client_id")), None)
+        client = next((c for c in self.clients if c.get("id") == task.client_id), None)
         client_line = None
         if client:
             label = client.get("branch_name") or client.get("person_email") or "Client"
@@ -270,7 +367,7 @@ class DashboardPage(ft.Container):
                 ft.OutlinedButton("Subtask", icon=ft.Icons.ADD, on_click=lambda e: self._add_subtask_dialog(task)),
                 ft.OutlinedButton("Assign", icon=ft.Icons.PERSON_ADD, on_click=lambda e: self._assign_dialog(task)),
                 ft.OutlinedButton(
-                    f"Comments ({len(self._as_list(task.get('comments')))})",
+                    f"Comments ({len(task.comments)})",
                     icon=ft.Icons.COMMENT,
                     on_click=lambda e: self._comments_dialog(task),
                 ),
@@ -284,19 +381,22 @@ class DashboardPage(ft.Container):
         if not pdf_url:
             pdf_section.controls.append(
                 ft.ElevatedButton(
-                    "Attach PDF & Close",
+                    "Attach PDFs & Close",
                     icon=ft.Icons.UPLOAD_FILE,
                     on_click=lambda e: self._attach_pdf(task),
                     style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=12)),
                 )
             )
         else:
+            preview = self._pdf_preview(pdf_url, task.pdf_meta, 56)
+            if preview:
+                pdf_section.controls.append(preview)
             pdf_section.controls.extend(
                 [
                     ft.TextButton(
                         "Open PDF",
                         icon=ft.Icons.PICTURE_AS_PDF,
-                        on_click=lambda e, url=pdf_url: self.page.launch_url(url),
+                        on_click=lambda e, url=pdf_url: self._open_pdf(url),
                     ),
                     ft.TextButton(
                         "Remove",
@@ -316,7 +416,12 @@ class DashboardPage(ft.Container):
                 [
                     ft.Row(
                         [
-                            ft.Text(task.get("title", ""), size=16, weight="bold", expand=True),
+                            ft.Checkbox(
+                                value=task.id in self._selected,
+                                visible=self.select_mode,
+                                on_change=lambda e: self._set_selected(task.id, e.control.value),
+                            ),
+                            ft.Text(task.title, size=16, weight="bold", expand=True),
                             ft.IconButton(ft.Icons.EDIT, icon_size=20, on_click=lambda e: self._edit_task_dialog(task)),
                             ft.IconButton(
                                 ft.Icons.DELETE,
@@ -327,7 +432,7 @@ class DashboardPage(ft.Container):
                         ],
                         alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                     ),
-                    ft.Text(task.get("description") or "No description", color=ft.Colors.GREY_700),
+                    ft.Text(task.description or "No description", color=ft.Colors.GREY_700),
 
                     # ✅ show client info
                     client_line if client_line else ft.Container(),
@@ -372,7 +477,7 @@ class DashboardPage(ft.Container):
             ),
         )
 
-    def _subtask_row(self, task: dict, subtask: dict) -> ft.Control:
+    def _subtask_row(self, task: Task, subtask: dict) -> ft.Control:
         pdf_url = subtask.get("pdf_url")
         return ft.Row(
             [
@@ -384,6 +489,7 @@ class DashboardPage(ft.Container):
                 ),
                 ft.Row(
                     [
+                        self._pdf_preview(pdf_url, subtask.get("pdf_meta"), 28) or ft.Container(),
                         ft.IconButton(
                             ft.Icons.UPLOAD_FILE,
                             icon_size=18,
@@ -395,7 +501,7 @@ class DashboardPage(ft.Container):
                             ft.Icons.PICTURE_AS_PDF,
                             icon_size=18,
                             tooltip="View",
-                            on_click=lambda e, url=pdf_url: self.page.launch_url(url),
+                            on_click=lambda e, url=pdf_url: self._open_pdf(url),
                             visible=bool(pdf_url),
                         ),
                         ft.IconButton(
@@ -418,24 +524,124 @@ class DashboardPage(ft.Container):
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
         )
 
+    # ---------------- Multi-select ----------------
+    def _toggle_select_mode(self):
+        self.select_mode = not self.select_mode
+        self._selected.clear()
+        self.refresh()
+
+    def _sync_bulk_bar(self):
+        self.bulk_bar.visible = self.select_mode
+        self.bulk_count.value = f"{len(self._selected)} selected"
+        self.bulk_status.value = None
+
+    def _set_selected(self, task_id, on):
+        if on:
+            self._selected.add(task_id)
+        else:
+            self._selected.discard(task_id)
+        # Checkboxes keep their own state; only the counter changes
+        self.bulk_count.value = f"{len(self._selected)} selected"
+        self.bulk_count.update()
+
+    def _select_all(self):
+        self._selected = set(self._tasks_by_id)
+        self.refresh()
+
+    def _bulk_set_status(self, status):
+        if not status or not self._selected:
+            return
+        self.writes.flush()
+        update_tasks(list(self._selected), {"status": status})
+        self.toast(f"✅ {len(self._selected)} tasks set to {status}")
+        self._selected.clear()
+        self.refresh()
+
+    def _bulk_assign_dialog(self):
+        if not self._selected:
+            return self.toast("⚠️ Select tasks first")
+        picker = AssigneePicker()
+
+        def save(e):
+            # Add the checked people to every selected task
+            add = picker.selected_ids
+            assignments = {}
+            for tid in self._selected:
+                task = self._tasks_by_id.get(tid)
+                current = task.assignees if task else []
+                assignments[tid] = current + [u for u in add if u not in current]
+            set_assignees_bulk(assignments)
+            dlg.open = False
+            self._selected.clear()
+            self.refresh()
+
+        dlg = self.dialogs.show(
+            "dashboard.bulk_assign",
+            title=ft.Text(f"Assign {len(self._selected)} tasks"),
+            content=picker,
+            actions=[ft.ElevatedButton("Add assignees", on_click=save)],
+        )
+
+    def _bulk_delete_confirm(self):
+        if not self._selected:
+            return self.toast("⚠️ Select tasks first")
+
+        def confirm(e):
+            for tid in self._selected:
+                self.writes.discard(tid)
+            delete_tasks(list(self._selected))
+            dlg.open = False
+            self._selected.clear()
+            self.refresh()
+
+        dlg = self.dialogs.show(
+            "dashboard.bulk_delete",
+            title=ft.Text(f"Delete {len(self._selected)} tasks?"),
+            actions=[
+                ft.TextButton("No", on_click=lambda e: self._close_dialog(dlg)),
+                ft.ElevatedButton("Yes", on_click=confirm),
+            ],
+        )
+
     # ---------------- helpers ----------------
-    def _as_list(self, val):
-        if val is None:
-            return []
-        if isinstance(val, list):
-            return val
-        try:
-            return json.loads(val) if val else []
-        except Exception:
-            return []
+    def _open_pdf(self, url):
+        self.page.launch_url(self.pdf_links.resolve(url))
+
+    def _pdf_preview(self, url, meta, height):
+        # Thumbnail + page count stored at upload time; no PDF download
+        if not url or not meta:
+            return None
+        controls = []
+        # Only links prefetch() already signed: render never signs per row
+        thumb = self.pdf_links.cached(meta.get("thumb_url"))
+        if thumb:
+            controls.append(
+                ft.GestureDetector(
+                    on_tap=lambda e: self._open_pdf(url),
+                    content=ft.Image(
+                        src=thumb,
+                        height=height,
+                        fit=ft.ImageFit.CONTAIN,
+                        border_radius=4,
+                    ),
+                )
+            )
+        if meta.get("pages"):
+            controls.append(ft.Text(f"{meta['pages']} p.", size=11, color=ft.Colors.GREY_600))
+        return ft.Row(controls, spacing=4) if controls else None
 
     def toast(self, msg: str):
         self.page.snack_bar = ft.SnackBar(content=ft.Text(msg), open=True)
         self.page.update()
 
+    def _on_write_failed(self, task_id, patch, error):
+        # The write buffer gave up on an edit: say so and show what was saved
+        task = self._tasks_by_id.get(task_id)
+        self.toast(f"⚠️ Could not save changes to {task.title if task else 'a task'}")
+        self.refresh()
+
     def _close_dialog(self, dlg):
-        dlg.open = False
-        self.page.update()
+        self.dialogs.close(dlg)
 
     # ---------------- add task (with client_id) ----------------
     def add_clicked(self, e):
@@ -451,10 +657,10 @@ class DashboardPage(ft.Container):
             tasks = fetch_tasks_for_user() or []
             newest = None
             for t in tasks:
-                if t.get("title") == title:
-                    if newest is None or (t.get("created_at") or "") > (newest.get("created_at") or ""):
+                if t.title == title:
+                    if newest is None or (t.created_at or "") > (newest.created_at or ""):
                         newest = t
-            task_id = newest.get("id") if newest else None
+            task_id = newest.id if newest else None
 
         if task_id:
             cid = self.client_dd.value or None
@@ -468,96 +674,91 @@ class DashboardPage(ft.Container):
         self.refresh()
 
     # ---------------- Existing CRUD/Logic (kept same) ----------------
-    def _change_task_status(self, task: dict, new_status: str):
-        update_task(task["id"], {"status": new_status})
-        self.refresh()
+    def _change_task_status(self, task: Task, new_status: str):
+        # The dropdown already shows the new value: no rebuild needed
+        task.status = new_status
+        self.writes.patch(task.id, {"status": new_status})
 
-    def _edit_task_dialog(self, task: dict):
-        t_f = ft.TextField(label="Title", value=task.get("title", ""))
-        d_f = ft.TextField(label="Description", value=task.get("description", ""), multiline=True)
+    def _edit_task_dialog(self, task: Task):
+        t_f = ft.TextField(label="Title", value=task.title)
+        d_f = ft.TextField(label="Description", value=task.description or "", multiline=True)
 
         def save(e):
-            update_task(task["id"], {"title": t_f.value, "description": d_f.value})
+            update_task(task.id, {"title": t_f.value, "description": d_f.value})
             dlg.open = False
             self.refresh()
 
-        dlg = ft.AlertDialog(
+        dlg = self.dialogs.show(
+            "dashboard.edit",
             title=ft.Text("Edit"),
             content=ft.Column([t_f, d_f], tight=True),
             actions=[ft.ElevatedButton("Save", on_click=save)],
         )
-        self.page.overlay.append(dlg)
-        dlg.open = True
-        self.page.update()
 
-    def _delete_confirm(self, task: dict):
+    def _delete_confirm(self, task: Task):
         def confirm(e):
-            delete_task(task["id"])
+            self.writes.discard(task.id)
+            delete_task(task.id)
             dlg.open = False
             self.refresh()
 
-        dlg = ft.AlertDialog(
+        dlg = self.dialogs.show(
+            "dashboard.delete",
             title=ft.Text("Delete?"),
-            actions=[ft.TextButton("No"), ft.ElevatedButton("Yes", on_click=confirm)],
+            actions=[
+                ft.TextButton("No", on_click=lambda e: self._close_dialog(dlg)),
+                ft.ElevatedButton("Yes", on_click=confirm),
+            ],
         )
-        self.page.overlay.append(dlg)
-        dlg.open = True
-        self.page.update()
 
-    def _add_subtask_dialog(self, task: dict):
+    def _add_subtask_dialog(self, task: Task):
         t_f = ft.TextField(label="Subtask title")
 
         def save(e):
-            subs = self._as_list(task.get("subtasks"))
-            subs.append({"id": str(uuid.uuid4()), "title": t_f.value, "done": False})
-            set_task_subtasks(task["id"], subs)
+            self.writes.flush(task.id)
+            subs = task.subtasks + [{"id": str(uuid.uuid4()), "title": t_f.value, "done": False}]
+            set_task_subtasks(task.id, subs)
             dlg.open = False
             self.refresh()
 
-        dlg = ft.AlertDialog(
+        dlg = self.dialogs.show(
+            "dashboard.add_subtask",
             title=ft.Text("Add Subtask"),
             content=t_f,
             actions=[ft.ElevatedButton("Add", on_click=save)],
         )
-        self.page.overlay.append(dlg)
-        dlg.open = True
-        self.page.update()
 
     def _toggle_subtask(self, task, subtask, done):
-        subs = self._as_list(task.get("subtasks"))
+        subs = task.subtasks
         for s in subs:
             if s.get("id") == subtask.get("id"):
                 s["done"] = done
-        set_task_subtasks(task["id"], subs)
-        self.page.update()
+        self.writes.patch(task.id, {"subtasks": subs})
 
     def _delete_subtask(self, task, subtask_id):
-        subs = [s for s in self._as_list(task.get("subtasks")) if s.get("id") != subtask_id]
-        set_task_subtasks(task["id"], subs)
+        self.writes.flush(task.id)
+        subs = [s for s in task.subtasks if s.get("id") != subtask_id]
+        set_task_subtasks(task.id, subs)
         self.refresh()
 
-    def _assign_dialog(self, task: dict):
-        current = set(self._as_list(task.get("assignees")))
-        cbs = []
-        for uid, label in self.users_map.items():
-            cbs.append(ft.Checkbox(label=label, value=(uid in current), data=uid))
+    def _assign_dialog(self, task: Task):
+        # Current assignees plus a page of search results, not every profile
+        picker = AssigneePicker(assignee_labels(task.assignees, self.users_map))
 
         def save(e):
-            set_task_assignees(task["id"], [c.data for c in cbs if c.value])
+            set_task_assignees(task.id, picker.selected_ids)
             dlg.open = False
             self.refresh()
 
-        dlg = ft.AlertDialog(
+        dlg = self.dialogs.show(
+            "dashboard.assign",
             title=ft.Text("Assign"),
-            content=ft.Column(cbs, tight=True, scroll=ft.ScrollMode.AUTO, height=200),
+            content=picker,
             actions=[ft.ElevatedButton("Save", on_click=save)],
         )
-        self.page.overlay.append(dlg)
-        dlg.open = True
-        self.page.update()
 
-    def _comments_dialog(self, task: dict):
-        comments = self._as_list(task.get("comments"))
+    def _comments_dialog(self, task: Task):
+        comments = list(task.comments)
         new_c = ft.TextField(hint_text="Comment...", multiline=True)
         list_c = ft.Column(
             [ft.Text(f"{c['author']}: {c['text']}", size=12) for c in comments],
@@ -573,123 +774,204 @@ class DashboardPage(ft.Container):
                     "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
                 }
             )
-            set_task_comments(task["id"], comments)
+            set_task_comments(task.id, comments)
             dlg.open = False
             self.refresh()
 
-        dlg = ft.AlertDialog(
+        dlg = self.dialogs.show(
+            "dashboard.comments",
             title=ft.Text("Comments"),
             content=ft.Column([list_c, new_c], tight=True),
             actions=[ft.ElevatedButton("Send", on_click=send)],
         )
-        self.page.overlay.append(dlg)
-        dlg.open = True
-        self.page.update()
 
     # ---------------- PDF ----------------
     def _attach_pdf(self, task):
-        self._pending_pdf = {"task_id": task["id"], "subtask_id": None}
-        self.file_picker.pick_files(allowed_extensions=["pdf"])
+        # Several files may be picked: the first closes the task, the rest
+        # are attached as new subtasks (one per report).
+        self._pick_target = (task.id, None)
+        self.file_picker.pick_files(allowed_extensions=["pdf"], allow_multiple=True)
 
     def _attach_subtask_pdf(self, task, subtask):
-        self._pending_pdf = {"task_id": task["id"], "subtask_id": subtask["id"]}
+        self._pick_target = (task.id, subtask["id"])
         self.file_picker.pick_files(allowed_extensions=["pdf"])
 
+    @profiled("upload.picked")
     def _on_file_picked(self, e: ft.FilePickerResultEvent):
-        if not e.files or not self._pending_pdf:
+        if not e.files or not self._pick_target:
             return
-        f = e.files[0]
-
-        # Desktop
-        if getattr(f, "path", None):
-            with open(f.path, "rb") as fp:
-                tid = self._pending_pdf["task_id"]
-                sid = self._pending_pdf["subtask_id"]
-                key = f"{tid}/{'sub_' + sid if sid else 'main'}_{uuid.uuid4().hex}.pdf"
-                self._upload_wrapper(tid, sid, key, fp.read())
-        else:
-            # Web/Mobile
-            self.file_picker.upload(
-                [
-                    ft.FilePickerUploadFile(
-                        f.name,
-                        self.page.get_upload_url(f.name, 600),
-                    )
-                ]
+        # Capture the target now: the next pick may change _pick_target
+        # while these files are still transferring.
+        tid, sid = self._pick_target
+        self._pick_target = None
+
+        jobs = []
+        for i, f in enumerate(e.files):
+            job = UploadJob(
+                local_path=f.path,
+                task_id=tid,
+                subtask_id=sid if i == 0 else None,
+                name=f.name,
+                new_subtask=i > 0,
+                remove_after=not f.path,
             )
+            # Web temp copies are named by job id: same-named files (from
+            # another pick or another session) must not overwrite each other
+            job.local_path = f.path or os.path.join(UPLOAD_DIR, f"{job.id}.pdf")
+            jobs.append(job)
+
+        # Desktop: stream straight from the picked paths
+        if all(getattr(f, "path", None) for f in e.files):
+            for job in jobs:
+                self.upload_queue.submit(job)
+            return
 
+        # Web/Mobile: browser uploads to uploads/ first, see _on_file_upload
+        # Waiting jobs live in the session's queue: the picker's upload events
+        # go to whichever DashboardPage is shown when they arrive.
+        for job in jobs:
+            self.upload_queue.expect(job)
+            self._on_job_change(job)
+        self.file_picker.upload(
+            [
+                ft.FilePickerUploadFile(
+                    f.name, self.page.get_upload_url(os.path.basename(job.local_path), 600), id=f.id
+                )
+                for f, job in zip(e.files, jobs)
+            ]
+        )
+
+    @profiled("upload.received")
     def _on_file_upload(self, e: ft.FilePickerUploadEvent):
-        if e.error or e.progress < 1:
+        # Events only carry the file name; the browser sends files in order,
+        # so they belong to the oldest waiting job of that name.
+        job = self.upload_queue.expected(e.file_name)
+        if not job:
             return
-
-        local_path = os.path.join(UPLOAD_DIR, e.file_name)
-        if not os.path.exists(local_path):
-            self.toast("Upload failed")
+        if e.error:
+            self.upload_queue.arrived(job)
+            job.status, job.error = "failed", e.error
+            self._on_job_change(job)
+            return
+        if e.progress < 1:
+            job.status, job.progress = "receiving", e.progress
+            self._on_job_change(job)
             return
 
-        with open(local_path, "rb") as fp:
-            data = fp.read()
-
-        tid = self._pending_pdf["task_id"]
-        sid = self._pending_pdf["subtask_id"]
-        key = f"{tid}/{'sub_' + sid if sid else 'main'}_{uuid.uuid4().hex}.pdf"
-
-        self._upload_wrapper(tid, sid, key, data)
-
-        os.remove(local_path)
-        self._pending_pdf = None
-
-    def _upload_wrapper(self, tid, sid, key, data):
-        self.supabase.storage.from_(PDF_BUCKET).upload(key, data, {"content-type": "application/pdf"})
-        url = self.supabase.storage.from_(PDF_BUCKET).get_public_url(key)
-
-        if sid:
-            task = fetch_task(tid)
-            subs = self._as_list(task.get("subtasks"))
-            for s in subs:
-                if s.get("id") == sid:
-                    s["pdf_url"] = url
-            set_task_subtasks(tid, subs)
-        else:
-            set_task_pdf(tid, url, "closed")
-
-        self.refresh()
-
-    def _get_storage_path_from_url(self, url: str):
+        self.upload_queue.arrived(job)
+        if not os.path.exists(job.local_path):
+            job.status, job.error = "failed", "missing upload"
+            self._on_job_change(job)
+            return
+        job.progress = 0.0
+        self.upload_queue.submit(job)
+
+    @profiled("upload.job")
+    def _upload_job(self, job: UploadJob, on_progress):
+        url = upload_pdf(self.storage, job.local_path, on_progress=on_progress)
+        meta = attach_preview(self.storage, job.local_path, path_from_url(url))
+        self._link_pdf(job, url, meta)
+        return url
+
+    def _on_job_change(self, job: UploadJob):
+        # Called from upload worker threads
+        with self._jobs_lock:
+            self._render_job(job)
+
+    def _render_job(self, job: UploadJob):
+        row = self._job_rows.get(id(job))
+        if row is None:
+            bar = ft.ProgressBar(value=0)
+            label = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_400)
+            row = self._job_rows[id(job)] = (label, bar, [-1])
+            self.upload_list.controls.append(ft.Column([label, bar], spacing=4))
+
+        label, bar, last = row
+        pct = int(job.progress * 100)
+        if pct == last[0] and job.status in ("uploading", "receiving"):
+            return  # throttle to whole percents
+        last[0] = pct
+
+        label.value = f"{job.name} — {job.status} {pct}%"
+        if job.status == "retrying":
+            label.value = f"{job.name} — retrying (attempt {job.attempts + 1})"
+        elif job.status == "failed":
+            label.value = f"{job.name} — failed"
+        bar.value = job.progress
+        bar.color = ft.Colors.RED_400 if job.status == "failed" else None
+
+        busy = self.upload_queue.busy
+        self.upload_panel.visible = True
         try:
-            parts = url.split(f"{PDF_BUCKET}/")
-            if len(parts) > 1:
-                return parts[1]
+            self.upload_panel.update()
         except Exception:
-            return None
+            pass
+
+        # One refresh when the whole batch is finished, not one per file
+        if not busy and job.status in ("done", "failed"):
+            failed = [j.name for j in self.upload_queue.jobs if j.status == "failed"]
+            self.upload_queue.clear_finished()
+            self.upload_list.controls.clear()
+            self._job_rows.clear()
+            self.upload_panel.visible = False
+            if failed:
+                self.toast(f"Upload failed: {', '.join(failed)}")
+            self.refresh()
+
+    def _link_pdf(self, job: UploadJob, url, meta=None):
+        # Jobs of one batch may finish together; serialize the
+        # read-modify-write of each task's subtasks.
+        with self._link_locks.setdefault(job.task_id, threading.Lock()):
+            tid = job.task_id
+            self.writes.flush(tid)
+            if job.new_subtask:
+                task = fetch_task(tid)
+                subs = task.subtasks if task else []
+                title = os.path.splitext(job.name)[0] or "Report"
+                subs.append(
+                    {"id": str(uuid.uuid4()), "title": title, "done": True, "pdf_url": url, "pdf_meta": meta}
+                )
+                set_task_subtasks(tid, subs)
+            elif job.subtask_id:
+                task = fetch_task(tid)
+                subs = task.subtasks if task else []
+                for s in subs:
+                    if s.get("id") == job.subtask_id:
+                        s["pdf_url"] = url
+                        s["pdf_meta"] = meta
+                set_task_subtasks(tid, subs)
+            else:
+                set_task_pdf(tid, url, "closed", meta)
 
     def _remove_pdf(self, task):
-        url = task.get("pdf_url")
+        url = task.pdf_url
         if url:
-            path = self._get_storage_path_from_url(url)
-            if path:
-                self.supabase.storage.from_(PDF_BUCKET).remove([path])
-            self.supabase.table("tasks").update({"pdf_url": None}).eq("id", task["id"]).execute()
-            self.toast("🗑️ File and Link Deleted")
+            # Only the link goes: the object is content-addressed and may be
+            # shared with other users' tasks, which RLS hides from us.
+            # app.storage_gc deletes it once nothing references it.
+            patch = {"pdf_url": None}
+            if task.pdf_meta:
+                patch["pdf_meta"] = None
+            update_task(task.id, patch)
+            self.toast("🔗 PDF link removed")
             self.refresh()
 
     def _remove_subtask_pdf(self, task, subtask):
         url = subtask.get("pdf_url")
         if url:
-            path = self._get_storage_path_from_url(url)
-            if path:
-                self.supabase.storage.from_(PDF_BUCKET).remove([path])
-
-            latest_task = fetch_task(task["id"])
-            subs = self._as_list(latest_task.get("subtasks"))
+            self.writes.flush(task.id)
+            latest_task = fetch_task(task.id)
+            subs = latest_task.subtasks if latest_task else []
             for s in subs:
                 if s.get("id") == subtask.get("id"):
                     s["pdf_url"] = None
+                    s["pdf_meta"] = None
 
-            set_task_subtasks(task["id"], subs)
-            self.toast("🗑️ Subtask PDF Deleted")
+            set_task_subtasks(task.id, subs)
+            self.toast("🔗 Subtask PDF link removed")
             self.refresh()
 
     def logout(self, e=None):
-        sign_out()
+        self.writes.flush()
+        sign_out(self.page)
         self.on_logout()
@@ -69,7 +69,7 @@ class LoginPage(ft.Container):
                 print("[LOGIN] missing email/password")
                 return
 
-            user_data, session = await asyncio.to_thread(sign_in, email, password)
+            user_data, session = await asyncio.to_thread(sign_in, email, password, self.page)
 
             if user_data:
                 self._notify("✅ Logged in!")
@@ -68,10 +68,10 @@ class SignupPage(ft.Container):
                 self._notify("⚠️ Full name, email and password required.")
                 return
 
-            res = await asyncio.to_thread(sign_up, email, password, name)
+            res = await asyncio.to_thread(sign_up, email, password, name, self.page)
             if res and res.user:
                 # Upsert profile for assignee display, etc.
-                supabase = get_supabase()
+                supabase = get_supabase(self.page)
                 try:
                     await asyncio.to_thread(
                         lambda: supabase.table("profiles").upsert(
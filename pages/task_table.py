@@ -1,11 +1,20 @@
 # pages/task_table.py
 import json
-import pandas as pd
 import flet as ft
 import asyncio
 
-from app.auth import get_current_user, get_supabase
-from app.db_client import fetch_tasks_for_user, set_task_subtasks
+from app.auth import get_current_user, get_supabase, use_auth
+from app.db_client import delete_tasks, fetch_tasks_for_user, update_tasks, utc_now_iso
+from app.dialogs import get_dialogs
+from app.metrics import timed_refresh
+from app.payload import metered_action
+from app.profiling import profiled
+from app.signed_urls import PdfLinks
+from app.storage import get_pdf_storage
+from app.task_rows import TaskRow, TaskRowModel
+from app.tracing import KIND_INTERNAL, traced
+from app.write_buffer import get_write_buffer
+from pages.assignee_picker import assignee_labels
 
 
 class TaskTablePage(ft.Container):
@@ -19,11 +28,18 @@ class TaskTablePage(ft.Container):
         self.padding = 16
         self.bgcolor = ft.Colors.BLUE_GREY_50
 
-        self.supabase = get_supabase()
-        self.user = get_current_user() or {}
+        self.supabase = get_supabase(page)
+        self.user = get_current_user(page) or {}
+        self.writes = get_write_buffer(page, on_failure=self._on_write_failed)
+        self.dialogs = get_dialogs(page)
 
         self.users_map = {}
-        self._load_users()
+
+        # Row model is cached per task updated_at; rendering stays below
+        self.row_model = TaskRowModel(self.users_map)
+        self._tasks_by_id = {}
+
+        self.pdf_links = PdfLinks(get_pdf_storage(self.supabase), self.user.get("id"))
 
         self._mounted = False
 
@@ -34,6 +50,7 @@ class TaskTablePage(ft.Container):
         # ---------- Stats ----------
         self.total_txt = ft.Text("0", color=ft.Colors.WHITE, size=22, weight="bold")
         self.open_txt = ft.Text("0", color=ft.Colors.WHITE, size=22, weight="bold")
+        self.progress_txt = ft.Text("0", color=ft.Colors.WHITE, size=22, weight="bold")
         self.closed_txt = ft.Text("0", color=ft.Colors.WHITE, size=22, weight="bold")
 
         # ---------- Filters ----------
@@ -42,6 +59,7 @@ class TaskTablePage(ft.Container):
             options=[
                 ft.dropdown.Option("All"),
                 ft.dropdown.Option("open"),
+                ft.dropdown.Option("in_progress"),
                 ft.dropdown.Option("closed"),
             ],
             value="All",
@@ -70,6 +88,40 @@ class TaskTablePage(ft.Container):
             rows=[],
         )
 
+        # ---------- Multi-select ----------
+        # Selection is per task: picking any of its subtask rows selects it
+        self.select_mode = False
+        self._selected = set()
+        self._visible_task_ids = set()
+        self.bulk_count = ft.Text("0 selected", weight="bold")
+        self.bulk_status = ft.Dropdown(
+            label="Set status",
+            width=160,
+            options=[
+                ft.dropdown.Option("open"),
+                ft.dropdown.Option("in_progress"),
+                ft.dropdown.Option("closed"),
+            ],
+            on_change=lambda e: self._bulk_set_status(e.control.value),
+        )
+        self.bulk_bar = ft.Row(
+            [
+                self.bulk_count,
+                self.bulk_status,
+                ft.OutlinedButton(
+                    "Delete",
+                    icon=ft.Icons.DELETE,
+                    icon_color=ft.Colors.RED_400,
+                    on_click=lambda e: self._bulk_delete_confirm(),
+                ),
+                ft.TextButton("Select all", on_click=lambda e: self._select_all()),
+                ft.TextButton("Clear", on_click=lambda e: self._clear_selection()),
+            ],
+            visible=False,
+            wrap=True,
+            spacing=10,
+        )
+
         # ---------- Mobile List ----------
         self.mobile_list = ft.ListView(spacing=10, padding=0, expand=True)
 
@@ -114,6 +166,7 @@ class TaskTablePage(ft.Container):
             self.refresh_table()
 
     async def _after_mount(self):
+        use_auth(self.page)
         await asyncio.sleep(0)
         self._sync_responsive()
         self.refresh_table()
@@ -135,6 +188,7 @@ class TaskTablePage(ft.Container):
                 [
                     ft.IconButton(ft.Icons.ARROW_BACK, on_click=lambda e: self.on_back()),
                     ft.Text("Task Overview", size=20, weight="bold", expand=True),
+                    ft.OutlinedButton("Select", icon=ft.Icons.CHECKLIST, on_click=lambda e: self._toggle_select_mode()),
                     ft.ElevatedButton("CSV", icon=ft.Icons.DOWNLOAD, on_click=self.export_csv),
                     ft.OutlinedButton("JSON", icon=ft.Icons.CODE, on_click=self.export_json),
                 ],
@@ -146,6 +200,7 @@ class TaskTablePage(ft.Container):
                 [
                     self._stat_card("Total", self.total_txt, ft.Colors.BLUE_600),
                     self._stat_card("Open", self.open_txt, ft.Colors.GREEN_600),
+                    self._stat_card("In Progress", self.progress_txt, ft.Colors.ORANGE_600),
                     self._stat_card("Closed", self.closed_txt, ft.Colors.RED_600),
                 ],
                 wrap=True,
@@ -154,6 +209,7 @@ class TaskTablePage(ft.Container):
 
             # Filters
             ft.Row([self.status_filter, self.task_filter], spacing=10),
+            self.bulk_bar,
 
             # Main Content Card
             ft.Container(
@@ -175,132 +231,160 @@ class TaskTablePage(ft.Container):
 
     # ---------------- Data ----------------
 
+    @traced("page.table.refresh_table", kind=KIND_INTERNAL, payload=False, rows=lambda _, self: len(self._visible_task_ids))
+    @timed_refresh("table")
+    @profiled("table.refresh")
     def refresh_table(self):
         if not self._mounted:
             return
 
         self._sync_responsive()
 
+        # Buffered toggles must land before we read back
+        self.writes.flush()
         tasks = fetch_tasks_for_user() or []
-        status_f = (self.status_filter.value or "All").lower()
-        search_f = (self.task_filter.value or "").lower()
-
-        total = open_c = closed = 0
-        rows = []
-        cards = []
-
+        self._load_users(tasks)
+        self._tasks_by_id = {t.id: t for t in tasks}
+        self._selected &= self._tasks_by_id.keys()
+        self._render()
+
+    @metered_action("table.render")
+    def _render(self):
+        """Rebuild stats and rows from the tasks already loaded."""
+        tasks = list(self._tasks_by_id.values())
+        total = open_c = in_progress = closed = 0
         for task in tasks:
-            task_status = (task.get("status") or "open").lower()
-
             total += 1
-            if task_status == "open":
+            status = (task.status or "open").lower()
+            if status == "open":
                 open_c += 1
-            elif task_status == "closed":
+            elif status == "in_progress":
+                in_progress += 1
+            elif status == "closed":
                 closed += 1
 
-            if status_f != "all" and task_status != status_f:
-                continue
-
-            assignees = self._as_list(task.get("assignees"))
-            assignee_names = ", ".join([self.users_map.get(uid, uid[:6]) for uid in assignees]) or "—"
-            subtasks = self._as_list(task.get("subtasks")) or [{}]
-
-            # overall task progress for mobile
-            all_subs = self._as_list(task.get("subtasks")) or []
-            tot_subs = len(all_subs)
-            done_subs = sum(1 for s in all_subs if s.get("done"))
-            task_progress = (done_subs / tot_subs) if tot_subs else 0.0
-            progress_label = f"{done_subs}/{tot_subs}"
-
-            for sub in subtasks:
-                sub_title = sub.get("title", "—")
-
-                if search_f and search_f not in f"{task.get('title', '')} {sub_title}".lower():
-                    continue
-
-                pdf_url = sub.get("pdf_url") or task.get("pdf_url")
-                done = bool(sub.get("done"))
-
-                # -------- Desktop row --------
-                rows.append(
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text(task.get("title", ""), weight="bold")),
-                            ft.DataCell(self._status_badge(task_status)),
-                            ft.DataCell(ft.Text(assignee_names, size=12)),
-                            ft.DataCell(ft.Text(sub_title)),
-                            ft.DataCell(self._done_pill(done, task, sub)),
-                            ft.DataCell(
-                                ft.IconButton(
-                                    icon=ft.Icons.PICTURE_AS_PDF,
-                                    icon_color=ft.Colors.RED_600,
-                                    on_click=lambda e, url=pdf_url: self.page.launch_url(url),
-                                )
-                                if pdf_url
-                                else ft.Text("—")
-                            ),
-                        ]
-                    )
-                )
+        self.row_model.set_users(self.users_map)
+        visible = self.row_model.filter(
+            self.row_model.rows_for(tasks),
+            status=self.status_filter.value or "All",
+            search=self.task_filter.value or "",
+        )
 
-                # -------- Mobile card --------
-                cards.append(
-                    ft.Container(
-                        padding=12,
-                        border_radius=10,
-                        border=ft.border.all(1, ft.Colors.GREY_200),
-                        bgcolor=ft.Colors.WHITE,
-                        content=ft.Column(
-                            [
-                                ft.Row(
-                                    [
-                                        ft.Text(task.get("title", ""), weight="bold", expand=True),
-                                        self._status_badge(task_status),
-                                    ]
-                                ),
-                                ft.Text(f"Subtask: {sub_title}", size=13),
-
-                                # ✅ Progress (same meaning as desktop column: Done/Pending pill for subtask)
-                                self._done_pill(done, task, sub),
-
-                                # ✅ Overall task progress bar
-                                ft.Row(
-                                    [
-                                        ft.Text("Overall", size=11, color=ft.Colors.GREY_600),
-                                        ft.Text(progress_label, size=11, color=ft.Colors.GREY_600),
-                                    ],
-                                    alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-                                ),
-                                ft.ProgressBar(value=task_progress),
-
-                                ft.Row(
-                                    [
-                                        ft.Text(f"By: {assignee_names}", size=11, color=ft.Colors.GREY_600),
-                                        ft.IconButton(
-                                            ft.Icons.PICTURE_AS_PDF,
-                                            icon_size=18,
-                                            on_click=lambda e, url=pdf_url: self.page.launch_url(url),
-                                        )
-                                        if pdf_url
-                                        else ft.Container(),
-                                    ],
-                                    alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-                                ),
-                            ],
-                            spacing=6,
-                        ),
-                    )
-                )
+        # Private bucket: sign all visible links in one request
+        self.pdf_links.prefetch([r.pdf_url for r in visible] + [r.pdf_thumb for r in visible])
 
         self.total_txt.value = str(total)
         self.open_txt.value = str(open_c)
+        self.progress_txt.value = str(in_progress)
         self.closed_txt.value = str(closed)
 
-        self.table.rows = rows
-        self.mobile_list.controls = cards
+        self._visible_task_ids = {r.task_id for r in visible}
+        self.bulk_bar.visible = self.select_mode
+        self.bulk_count.value = f"{len(self._selected)} selected"
+        self.table.show_checkbox_column = self.select_mode
+
+        self.table.rows = [self._desktop_row(r) for r in visible]
+        self.mobile_list.controls = [self._mobile_card(r) for r in visible]
 
         self.update()
 
+    # ---------------- Rendering ----------------
+
+    def _pdf_click(self, url):
+        return lambda e: self.page.launch_url(self.pdf_links.resolve(url))
+
+    def _desktop_row(self, row: TaskRow):
+        return ft.DataRow(
+            selected=row.task_id in self._selected,
+            on_select_changed=(lambda e, tid=row.task_id: self._toggle_selected(tid)) if self.select_mode else None,
+            cells=[
+                ft.DataCell(ft.Text(row.title, weight="bold")),
+                ft.DataCell(self._status_badge(row.status)),
+                ft.DataCell(ft.Text(row.assignee_names, size=12)),
+                ft.DataCell(ft.Text(row.subtask)),
+                ft.DataCell(self._done_pill(row)),
+                ft.DataCell(
+                    ft.Row(
+                        [
+                            ft.IconButton(
+                                icon=ft.Icons.PICTURE_AS_PDF,
+                                icon_color=ft.Colors.RED_600,
+                                on_click=self._pdf_click(row.pdf_url),
+                                tooltip=f"{row.pdf_pages} pages" if row.pdf_pages else None,
+                            ),
+                            ft.Text(f"{row.pdf_pages} p.", size=11) if row.pdf_pages else ft.Container(),
+                        ],
+                        spacing=0,
+                    )
+                    if row.pdf_url
+                    else ft.Text("—")
+                ),
+            ]
+        )
+
+    def _mobile_pdf(self, row: TaskRow):
+        if not row.pdf_url:
+            return ft.Container()
+        # Small first-page preview generated at upload time, if prefetch()
+        # could sign it: render never signs per row
+        thumb = self.pdf_links.cached(row.pdf_thumb)
+        if thumb:
+            return ft.GestureDetector(
+                on_tap=self._pdf_click(row.pdf_url),
+                content=ft.Image(src=thumb, height=40, border_radius=4),
+            )
+        return ft.IconButton(
+            ft.Icons.PICTURE_AS_PDF,
+            icon_size=18,
+            on_click=self._pdf_click(row.pdf_url),
+        )
+
+    def _mobile_card(self, row: TaskRow):
+        return ft.Container(
+            padding=12,
+            border_radius=10,
+            border=ft.border.all(1, ft.Colors.GREY_200),
+            bgcolor=ft.Colors.WHITE,
+            content=ft.Column(
+                [
+                    ft.Row(
+                        [
+                            ft.Checkbox(
+                                value=row.task_id in self._selected,
+                                visible=self.select_mode,
+                                on_change=lambda e, tid=row.task_id: self._toggle_selected(tid),
+                            ),
+                            ft.Text(row.title, weight="bold", expand=True),
+                            self._status_badge(row.status),
+                        ]
+                    ),
+                    ft.Text(f"Subtask: {row.subtask}", size=13),
+
+                    # ✅ Progress (same meaning as desktop column: Done/Pending pill for subtask)
+                    self._done_pill(row),
+
+                    # ✅ Overall task progress bar
+                    ft.Row(
+                        [
+                            ft.Text("Overall", size=11, color=ft.Colors.GREY_600),
+                            ft.Text(row.progress_label, size=11, color=ft.Colors.GREY_600),
+                        ],
+                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                    ),
+                    ft.ProgressBar(value=row.progress),
+
+                    ft.Row(
+                        [
+                            ft.Text(f"By: {row.assignee_names}", size=11, color=ft.Colors.GREY_600),
+                            self._mobile_pdf(row),
+                        ],
+                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                    ),
+                ],
+                spacing=6,
+            ),
+        )
+
     # ---------------- UI Helpers ----------------
 
     def _stat_card(self, title, value_control, color):
@@ -320,7 +404,7 @@ class TaskTablePage(ft.Container):
         )
 
     def _status_badge(self, status: str):
-        color = ft.Colors.GREEN_600 if status == "open" else ft.Colors.RED_600
+        color = {"open": ft.Colors.GREEN_600, "in_progress": ft.Colors.ORANGE_600}.get(status, ft.Colors.RED_600)
         return ft.Container(
             padding=ft.padding.symmetric(horizontal=10, vertical=4),
             border_radius=15,
@@ -328,10 +412,11 @@ class TaskTablePage(ft.Container):
             content=ft.Text(status.capitalize(), size=10, color=ft.Colors.WHITE, weight="bold"),
         )
 
-    def _done_pill(self, done: bool, task, sub):
+    def _done_pill(self, row: TaskRow):
+        done = row.done
         color = ft.Colors.BLUE_600 if done else ft.Colors.GREY_400
         return ft.GestureDetector(
-            on_tap=lambda e: self._toggle_subtask_direct(task, sub, not done),
+            on_tap=lambda e: self._toggle_subtask_direct(row, not done),
             content=ft.Container(
                 padding=ft.padding.symmetric(horizontal=10, vertical=4),
                 border_radius=15,
@@ -342,50 +427,115 @@ class TaskTablePage(ft.Container):
 
     # ---------------- Logic ----------------
 
-    def _toggle_subtask_direct(self, task, subtask, new_val):
-        subs = self._as_list(task.get("subtasks"))
+    def _toggle_subtask_direct(self, row: TaskRow, new_val):
+        task = self._tasks_by_id.get(row.task_id)
+        if not task or not row.subtask_id:
+            return
+        subs = task.subtasks
         for s in subs:
-            if s.get("id") == subtask.get("id"):
+            if s.get("id") == row.subtask_id:
                 s["done"] = new_val
-        set_task_subtasks(task["id"], subs)
+        # Write later (coalesced with further clicks); redraw from memory.
+        # A new stamp makes the row model rebuild this task's rows.
+        task.updated_at = utc_now_iso()
+        self.writes.patch(task.id, {"subtasks": subs})
+        self._render()
+
+    def _on_write_failed(self, task_id, patch, error):
+        # The write buffer gave up on an edit: say so and show what was saved
+        task = self._tasks_by_id.get(task_id)
+        self.page.snack_bar = ft.SnackBar(
+            content=ft.Text(f"⚠️ Could not save changes to {task.title if task else 'a task'}"), open=True
+        )
+        self.page.update()
         self.refresh_table()
 
-    def _as_list(self, val):
-        if isinstance(val, list):
-            return val
-        try:
-            return json.loads(val) if val else []
-        except Exception:
-            return []
+    # ---------------- Multi-select ----------------
+
+    def _toggle_select_mode(self):
+        self.select_mode = not self.select_mode
+        self._selected.clear()
+        self._render()
+
+    def _toggle_selected(self, task_id):
+        self._selected ^= {task_id}
+        # All rows of the task follow; redrawn from memory, no refetch
+        self._render()
+
+    def _select_all(self):
+        self._selected = set(self._visible_task_ids)
+        self._render()
+
+    def _clear_selection(self):
+        self._selected.clear()
+        self._render()
 
-    def _load_users(self):
+    def _bulk_set_status(self, status):
+        if not status or not self._selected:
+            return
+        self.writes.flush()
+        update_tasks(list(self._selected), {"status": status})
+        self._selected.clear()
+        self.bulk_status.value = None
+        self.refresh_table()
+
+    def _bulk_delete_confirm(self):
+        if not self._selected:
+            return
+
+        def close(e):
+            self.dialogs.close(dlg)
+
+        def confirm(e):
+            for tid in self._selected:
+                self.writes.discard(tid)
+            delete_tasks(list(self._selected))
+            self._selected.clear()
+            close(e)
+            self.refresh_table()
+
+        dlg = self.dialogs.show(
+            "table.bulk_delete",
+            title=ft.Text(f"Delete {len(self._selected)} tasks?"),
+            actions=[ft.TextButton("No", on_click=close), ft.ElevatedButton("Yes", on_click=confirm)],
+        )
+
+    def _load_users(self, tasks):
+        # Labels for the assignees on screen only; known ones are reused
+        ids = list(dict.fromkeys(uid for t in tasks for uid in t.assignees))
         try:
-            res = self.supabase.table("profiles").select("id,full_name,email").execute()
-            self.users_map = {
-                u["id"]: (u.get("full_name") or u.get("email") or u["id"][:6])
-                for u in (res.data or [])
-            }
-        except Exception:
-            self.users_map = {}
+            self.users_map = assignee_labels(ids, self.users_map)
+        except Exception as e:
+            print("⚠️ Profile lookup failed:", repr(e))
 
     # ---------------- export ----------------
 
+    def _export_tasks(self):
+        # What the table shows (buffered edits included); fetch only if
+        # nothing is loaded yet
+        if self._tasks_by_id:
+            return list(self._tasks_by_id.values())
+        self.writes.flush()
+        return fetch_tasks_for_user() or []
+
     def export_csv(self, e):
-        tasks = fetch_tasks_for_user() or []
+        tasks = self._export_tasks()
         data = []
         for t in tasks:
-            for s in self._as_list(t.get("subtasks")):
+            for s in t.subtasks:
                 data.append(
                     {
-                        "Task": t.get("title"),
-                        "Status": t.get("status"),
+                        "Task": t.title,
+                        "Status": t.status,
                         "Subtask": s.get("title"),
                         "Done": s.get("done"),
                     }
                 )
+        import pandas as pd  # only needed for exports; slow to import
+
         df = pd.DataFrame(data)
         self.page.launch_url(f"data:text/csv;charset=utf-8,{df.to_csv(index=False)}")
 
     def export_json(self, e):
-        tasks = fetch_tasks_for_user() or []
-        self.page.launch_url(f"data:application/json;charset=utf-8,{json.dumps(tasks)}")
+        tasks = self._export_tasks()
+        self.page.launch_url(f"data:application/json;charset=utf-8,{json.dumps([t.to_dict() for t in tasks])}")